@@ -0,0 +1,99 @@
+"""
+答案检查：同步（Flask）和异步（ASGI）接口共用同一套判定规则
+逐词比对由 answer_diff 完成，正确答案的切分结果按原文缓存，同一句子只切分一次
+"""
+from answer_diff import compare
+
+# 答案的最大字符数（句子最长500个字符，留出余量），超出时接口返回400，比对耗时有上限
+MAX_ANSWER_LENGTH = 1000
+
+def check_answer(user_answer, correct_answer, ignore_punctuation=False):
+    """
+    判定答案（忽略大小写和空白差异）
+    
+    Args:
+        ignore_punctuation: 不比较标点
+    
+    Returns:
+        接口返回的结果字典：is_correct, correct_answer, user_answer, score（0~1的相似度）,
+        diff（逐词编辑操作，见 answer_diff.compare）
+    """
+    correct_answer = correct_answer.strip()
+    is_correct, score, diff = compare(correct_answer, user_answer, ignore_punctuation)
+    return {
+        'is_correct': is_correct,
+        'correct_answer': correct_answer,
+        'user_answer': user_answer,
+        'score': score,
+        'diff': diff
+    }
+
+def parse_sentence_id(value):
+    """请求中的句子ID转为整数，非法时返回None"""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+def parse_answer(value):
+    """
+    请求中的答案去除首尾空白，未传时为空字符串
+    
+    Raises:
+        ValueError: 答案不是字符串，或超过MAX_ANSWER_LENGTH个字符
+    """
+    if value is None:
+        return ''
+    if not isinstance(value, str):
+        raise ValueError('答案必须是字符串')
+    value = value.strip()
+    if len(value) > MAX_ANSWER_LENGTH:
+        raise ValueError(f'答案最多{MAX_ANSWER_LENGTH}个字符')
+    return value
+
+def parse_batch(data, max_items):
+    """
+    解析批量检查请求 {"answers": [{"sentence_id": 1, "answer": "..."}, ...]}
+    
+    Returns:
+        [(句子ID或None, 去除首尾空白的答案), ...]
+    
+    Raises:
+        ValueError: 请求格式错误、条数超出上限或答案不合法
+    """
+    answers = data.get('answers') if isinstance(data, dict) else None
+    if not isinstance(answers, list):
+        raise ValueError('请求格式错误，需要answers列表')
+    if len(answers) > max_items:
+        raise ValueError(f'一次最多检查{max_items}个答案')
+    items = []
+    for entry in answers:
+        if not isinstance(entry, dict):
+            raise ValueError('请求格式错误，answers中的每一项需要sentence_id和answer')
+        items.append((parse_sentence_id(entry.get('sentence_id')), parse_answer(entry.get('answer'))))
+    return items
+
+def check_batch(items, sentences, ignore_punctuation=False):
+    """
+    按请求顺序判定一批答案
+    
+    Args:
+        items: parse_batch的返回值
+        sentences: {句子ID: 句子字典}，不存在的句子不在其中
+        ignore_punctuation: 不比较标点
+    
+    Returns:
+        结果列表，每项在单个检查的结果上增加sentence_id；句子不存在时为 {sentence_id, error}
+    """
+    results = []
+    for sentence_id, user_answer in items:
+        sentence = sentences.get(sentence_id)
+        if sentence is None:
+            results.append({'sentence_id': sentence_id, 'error': '句子不存在'})
+            continue
+        result = check_answer(user_answer, sentence['english'], ignore_punctuation)
+        result['sentence_id'] = sentence_id
+        results.append(result)
+    return results
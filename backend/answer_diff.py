@@ -0,0 +1,209 @@
+"""
+答案比对引擎：把正确答案和用户答案切分为单词/标点，按编辑距离对齐，给出逐词的编辑操作和相似度
+切分规则与前端填空格子一致：空白分隔单词，.,!?;:'"()- 各自单独成为一个标点
+"""
+import re
+from functools import lru_cache
+
+# 标点单独成词，其余非空白字符连续组成单词
+PUNCTUATION = '.,!?;:\'"()-'
+TOKEN_PATTERN = re.compile(r'[' + re.escape(PUNCTUATION) + r']|[^\s' + re.escape(PUNCTUATION) + r']+')
+
+# 对齐时初始的带宽（允许正确答案与用户答案错开的词数），不够时加倍
+MIN_BAND = 4
+# 用户答案中参与对齐的最大词数（超出正确答案长度太多的部分直接视为多余的词）
+MAX_EXTRA_TOKENS = 20
+
+# 计算字符级相似度的最大词长：更长的词（如一长串没有空格的输入）不给部分得分，单词比对的耗时有上限
+MAX_SIMILARITY_LENGTH = 64
+
+# 缓存的正确答案切分结果条数
+REFERENCE_CACHE_SIZE = 10000
+
+# 编辑操作
+EQUAL = 'equal'
+REPLACE = 'replace'
+DELETE = 'delete'  # 正确答案中的词，用户没有写
+INSERT = 'insert'  # 用户多写的词
+
+def tokenize(text, ignore_punctuation=False):
+    """
+    切分为 (原文, 比较用的小写形式, 是否为标点) 三元组的元组
+    
+    Args:
+        ignore_punctuation: 丢弃标点，只比较单词
+    """
+    tokens = []
+    for match in TOKEN_PATTERN.finditer(text):
+        surface = match.group()
+        is_punctuation = surface in PUNCTUATION
+        if is_punctuation and ignore_punctuation:
+            continue
+        tokens.append((surface, surface.lower(), is_punctuation))
+    return tuple(tokens)
+
+@lru_cache(maxsize=REFERENCE_CACHE_SIZE)
+def reference_tokens(text, ignore_punctuation=False):
+    """正确答案的切分结果（同一句子反复检查时只切分一次）"""
+    return tokenize(text, ignore_punctuation)
+
+def align(reference, answer):
+    """
+    按最小编辑距离对齐两个词序列（大小写不敏感）
+    
+    Returns:
+        [(操作, 正确答案中的下标或None, 用户答案中的下标或None), ...]
+    """
+    n, m = len(reference), len(answer)
+    # 公共前缀和后缀直接视为相同，只对中间不同的部分做动态规划
+    prefix = 0
+    while prefix < n and prefix < m and reference[prefix] == answer[prefix]:
+        prefix += 1
+    suffix = 0
+    while suffix < n - prefix and suffix < m - prefix and reference[n - 1 - suffix] == answer[m - 1 - suffix]:
+        suffix += 1
+    
+    ops = [(EQUAL, i, i) for i in range(prefix)]
+    core = _banded_align(reference[prefix:n - suffix], answer[prefix:m - suffix])
+    ops.extend((
+        op,
+        None if i is None else i + prefix,
+        None if j is None else j + prefix
+    ) for op, i, j in core)
+    ops.extend((EQUAL, n - suffix + k, m - suffix + k) for k in range(suffix))
+    return ops
+
+def _banded_align(reference, answer):
+    """
+    带状编辑距离：只计算 |i - j| <= band 的格子，代价为 O(长度 × band)
+    距离超过带宽时加倍带宽重算；距离不超过带宽时，最优路径一定在带内，结果与完整动态规划相同
+    """
+    n, m = len(reference), len(answer)
+    if n == 0:
+        return [(INSERT, None, j) for j in range(m)]
+    if m == 0:
+        return [(DELETE, i, None) for i in range(n)]
+    
+    band = max(MIN_BAND, abs(n - m))
+    while True:
+        rows = _fill_band(reference, answer, band)
+        distance = rows[n][m - max(0, n - band)]
+        if distance <= band or band >= max(n, m):
+            return _backtrace(rows, reference, answer, band)
+        band *= 2
+
+def _fill_band(reference, answer, band):
+    """逐行填写带内的距离，rows[i][j - lo(i)] 为前i个词与前j个词的距离"""
+    n, m = len(reference), len(answer)
+    inf = n + m + 1
+    rows = [list(range(0, min(m, band) + 1))]
+    for i in range(1, n + 1):
+        lo, hi = max(0, i - band), min(m, i + band)
+        prev_lo = max(0, i - 1 - band)
+        prev = rows[i - 1]
+        row = [inf] * (hi - lo + 1)
+        ref_token = reference[i - 1]
+        for j in range(lo, hi + 1):
+            if j == 0:
+                row[0] = i
+                continue
+            best = inf
+            # 上方格子：正确答案中的词被漏写
+            k = j - prev_lo
+            if k < len(prev):
+                best = prev[k] + 1
+            # 左上格子：相同或替换
+            k -= 1
+            if 0 <= k < len(prev):
+                best = min(best, prev[k] + (ref_token != answer[j - 1]))
+            # 左侧格子：用户多写了一个词
+            if j > lo:
+                best = min(best, row[j - 1 - lo] + 1)
+            row[j - lo] = best
+        rows.append(row)
+    return rows
+
+def _backtrace(rows, reference, answer, band):
+    """从终点回溯出编辑操作序列"""
+    def cell(i, j):
+        lo = max(0, i - band)
+        k = j - lo
+        row = rows[i]
+        return row[k] if 0 <= k < len(row) else None
+    
+    ops = []
+    i, j = len(reference), len(answer)
+    while i > 0 or j > 0:
+        current = cell(i, j)
+        if i > 0 and j > 0:
+            diagonal = cell(i - 1, j - 1)
+            same = reference[i - 1] == answer[j - 1]
+            if diagonal is not None and diagonal + (not same) == current:
+                ops.append((EQUAL if same else REPLACE, i - 1, j - 1))
+                i, j = i - 1, j - 1
+                continue
+        if i > 0:
+            up = cell(i - 1, j)
+            if up is not None and up + 1 == current:
+                ops.append((DELETE, i - 1, None))
+                i -= 1
+                continue
+        ops.append((INSERT, None, j - 1))
+        j -= 1
+    ops.reverse()
+    return ops
+
+def char_similarity(a, b):
+    """两个词的字符级相似度（0~1），用于给拼写接近的词部分得分"""
+    if a == b:
+        return 1.0
+    if not a or not b or max(len(a), len(b)) > MAX_SIMILARITY_LENGTH:
+        return 0.0
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return 1.0 - previous[-1] / max(len(a), len(b))
+
+def compare(correct_answer, user_answer, ignore_punctuation=False):
+    """
+    比对答案
+    
+    Returns:
+        (是否完全正确, 相似度0~1, 逐词编辑操作列表)
+        每个操作为 {op, expected, actual, type}，expected/actual为原文，type为 word 或 punctuation
+    """
+    reference = reference_tokens(correct_answer, ignore_punctuation)
+    answer = tokenize(user_answer, ignore_punctuation)
+    
+    # 用户答案远长于正确答案时，超出的部分不参与对齐，直接视为多余的词
+    limit = len(reference) + MAX_EXTRA_TOKENS
+    extra = answer[limit:]
+    answer = answer[:limit]
+    
+    ops = align([token[1] for token in reference], [token[1] for token in answer])
+    ops.extend((INSERT, None, len(answer) + k) for k in range(len(extra)))
+    answer = answer + extra
+    
+    diff = []
+    credit = 0.0
+    for op, i, j in ops:
+        expected = reference[i] if i is not None else None
+        actual = answer[j] if j is not None else None
+        if op == EQUAL:
+            credit += 1
+        elif op == REPLACE:
+            credit += char_similarity(expected[1], actual[1])
+        diff.append({
+            'op': op,
+            'expected': expected[0] if expected else None,
+            'actual': actual[0] if actual else None,
+            'type': 'punctuation' if (expected or actual)[2] else 'word'
+        })
+    
+    longest = max(len(reference), len(answer))
+    score = credit / longest if longest else 1.0
+    is_correct = all(op == EQUAL for op, _, _ in ops)
+    return is_correct, round(score, 4), diff
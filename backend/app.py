@@ -1,101 +1,414 @@
-from flask import Flask, jsonify, request
+from flask import Flask, jsonify, request, Response, stream_with_context
 from flask_cors import CORS
-from database import init_db, get_db
-from models import Sentence
+from database import init_db, get_db, get_read_db, ReadSessionLocal, engine, read_engine
+from models import Sentence, PracticeSession
+from sampler import SentenceSampler
+from cache import SentenceCache
+from sheet_reader import SheetFormatError
+from upload_store import UploadStore, hash_upload, is_valid_set_id, iter_upload_sentences
+from answer_check import check_answer as check_user_answer, check_batch, parse_answer, parse_batch, parse_sentence_id
+from http_cache import (
+    corpus_etag, etag_matches, encoded_etag, choose_encoding, should_compress, compress,
+    SENTENCE_CACHE_CONTROL, LIST_CACHE_CONTROL
+)
+from search_index import search_statement
+from scheduler import is_valid_learner_id, record_reviews, pick_next, review_info
+from practice import (
+    SESSION_MODES, is_valid_session_id, valid_difficulties, new_session, stale_sessions_statement,
+    current_entry, advance, go_back, record_score, progress, history_entries, session_payload
+)
+from corpus_export import EXPORT_FORMATS, EXPORT_MIMETYPES, parquet_available, export_chunks, export_filename
+from metrics import instrument_app, record_exception, SlowRequestProfiler, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from config import (
+    UPLOAD_CACHE_PATH, UPLOAD_CACHE_MAX_ROWS, UPLOAD_PAGE_SIZE,
+    MAX_UPLOAD_BYTES, MAX_UPLOAD_ROWS, MAX_PAGE_SIZE, MAX_CHECK_BATCH,
+    SENTENCE_BATCH_SIZE, MAX_SENTENCE_BATCH, SEARCH_PAGE_SIZE, MAX_SEARCH_QUERY_LENGTH,
+    PROFILE_SLOW_MS, PROFILE_DIR, PROFILE_INTERVAL_MS, CORPUS_SNAPSHOT_PATH
+)
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
+from werkzeug.exceptions import RequestEntityTooLarge
+import json
 import random
-import pandas as pd
 
 app = Flask(__name__)
 CORS(app)  # 允许跨域请求
 
-# 初始化数据库
-init_db()
+# 上传文件大小上限
+app.config['MAX_CONTENT_LENGTH'] = MAX_UPLOAD_BYTES
+
+# 句子读缓存和随机抽样索引（进程内共享，语料版本变化时自动失效/重建）
+cache = SentenceCache(ReadSessionLocal, corpus_snapshot_path=CORPUS_SNAPSHOT_PATH)
+sampler = SentenceSampler(ReadSessionLocal)
+# 解析后的上传句子集缓存（按文件内容哈希寻址）
+upload_store = UploadStore(UPLOAD_CACHE_PATH, max_rows=UPLOAD_CACHE_MAX_ROWS)
+
+# 请求级指标（/metrics）；设置PROFILE_SLOW_MS时对慢请求做调用栈采样
+profiler = SlowRequestProfiler(PROFILE_SLOW_MS, PROFILE_DIR, PROFILE_INTERVAL_MS / 1000) if PROFILE_SLOW_MS > 0 else None
+request_metrics = instrument_app(app, [engine, read_engine], profiler)
+
+# 流式输出时每批从数据库读取的行数
+STREAM_BATCH_SIZE = 500
+
+def parse_id_list(value):
+    """解析逗号分隔的ID列表，忽略非法值"""
+    return [int(v) for v in value.split(',') if v.strip().isdigit()]
+
+def server_error(e, message=None):
+    """处理函数捕获到未预期的异常：记入错误指标并输出调用栈到日志，返回500"""
+    record_exception(e)
+    app.logger.exception('处理请求 %s %s 时出错', request.method, request.path)
+    return jsonify({'error': message or str(e)}), 500
+
+def sync_corpus():
+    """检查语料版本，必要时清空缓存、重建抽样索引（有一致的只读快照时直接使用快照中的ID数组），返回当前语料版本号"""
+    version = cache.sync()
+    snapshot = cache.current_snapshot(version)
+    if snapshot is not None:
+        sampler.load_groups(version, snapshot.difficulty_groups())
+    else:
+        sampler.sync(version)
+    return version
+
+def not_modified(etag, cache_control):
+    """客户端缓存的版本仍是最新时返回304响应，否则返回None"""
+    matched = etag_matches(request.headers.get('If-None-Match'), etag)
+    if matched is None:
+        return None
+    response = Response(status=304)
+    response.headers['ETag'] = matched
+    response.headers['Cache-Control'] = cache_control
+    response.vary.add('Accept-Encoding')
+    return response
+
+def cacheable(response, etag, cache_control):
+    """为句子响应加上ETag和缓存策略"""
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = cache_control
+    return response
+
+@app.after_request
+def compress_response(response):
+    """较大的JSON响应按Accept-Encoding压缩（流式响应不压缩），ETag随编码区分"""
+    if response.is_streamed or response.direct_passthrough or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype != 'application/json':
+        return response
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.headers.get('Accept-Encoding'))
+    if encoding is None or not should_compress(response.status_code, response.mimetype, response.content_length or 0):
+        return response
+    response.set_data(compress(response.get_data(), encoding))
+    response.headers['Content-Encoding'] = encoding
+    if 'ETag' in response.headers:
+        response.headers['ETag'] = encoded_etag(response.headers['ETag'], encoding)
+    return response
 
 @app.route('/api/sentence/random', methods=['GET'])
 def get_random_sentence():
-    """获取随机句子，支持按难度筛选"""
-    db: Session = next(get_db())
+    """获取随机句子，支持按难度筛选、随机种子和排除最近出现的句子"""
     try:
         # 获取难度参数（可以是多个，用逗号分隔）
         difficulties = request.args.get('difficulties', '').split(',')
         difficulties = [d.strip() for d in difficulties if d.strip()]
+        seed = request.args.get('seed', type=int)
+        exclude = parse_id_list(request.args.get('exclude', ''))
         
-        # 构建查询
-        query = db.query(Sentence)
-        if difficulties:
-            query = query.filter(Sentence.difficulty.in_(difficulties))
-        
-        sentences = query.all()
-        if not sentences:
+        # 在ID索引上抽样，只读取被抽中的一行（优先走缓存）
+        sync_corpus()
+        sentence_id = sampler.pick(difficulties, seed=seed, exclude=exclude)
+        sentence = cache.get_sentence(sentence_id) if sentence_id is not None else None
+        if not sentence:
             return jsonify({'error': '没有可用的句子'}), 404
         
-        sentence = random.choice(sentences)
-        return jsonify({
-            'id': sentence.id,
-            'chinese': sentence.chinese,
-            'english': sentence.english,
-            'difficulty': sentence.difficulty
-        })
+        return jsonify(sentence)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
+        return server_error(e)
+
+@app.route('/api/sentences/shuffled', methods=['GET'])
+def get_shuffled_sentence():
+    """
+    乱序播放：所选难度的句子按seed打乱后的第position个（从0开始），同一种子下依次取0~total-1不会重复
+    顺序按位置即时计算，服务端不保存打乱后的列表
+    """
+    try:
+        difficulties = request.args.get('difficulties', '').split(',')
+        difficulties = [d.strip() for d in difficulties if d.strip()]
+        seed = request.args.get('seed', type=int)
+        if seed is None:
+            return jsonify({'error': '缺少随机种子seed'}), 400
+        position = request.args.get('position', 0, type=int)
+        
+        sync_corpus()
+        sentence_id = sampler.shuffled(difficulties, seed, position)
+        sentence = cache.get_sentence(sentence_id) if sentence_id is not None else None
+        if not sentence:
+            return jsonify({'error': '没有该位置的句子'}), 404
+        
+        return jsonify(dict(sentence, position=position, total=sampler.count(difficulties)))
+    except Exception as e:
+        return server_error(e)
+
+@app.route('/api/sentences/batch', methods=['GET'])
+def get_sentences_batch():
+    """
+    批量获取句子：随机抽取n个不重复的句子（前端预取），或传入ids按顺序查询（恢复历史记录）
+    随机模式的参数与 /api/sentence/random 相同
+    """
+    try:
+        ids = request.args.get('ids')
+        if ids is not None:
+            sentence_ids = parse_id_list(ids)
+            if len(sentence_ids) > MAX_SENTENCE_BATCH:
+                return jsonify({'error': f'一次最多获取{MAX_SENTENCE_BATCH}个句子'}), 400
+            sync_corpus()
+        else:
+            difficulties = request.args.get('difficulties', '').split(',')
+            difficulties = [d.strip() for d in difficulties if d.strip()]
+            count = max(1, min(request.args.get('n', SENTENCE_BATCH_SIZE, type=int), MAX_SENTENCE_BATCH))
+            seed = request.args.get('seed', type=int)
+            exclude = parse_id_list(request.args.get('exclude', ''))
+            sync_corpus()
+            sentence_ids = sampler.pick_many(difficulties, count, seed=seed, exclude=exclude)
+        
+        # 一次取出全部句子（优先走缓存），不存在的ID跳过
+        sentences = cache.get_sentences(sentence_ids)
+        return jsonify({'sentences': [sentences[i] for i in sentence_ids if i in sentences]})
+    except Exception as e:
+        return server_error(e)
 
 @app.route('/api/sentences/list', methods=['GET'])
 def get_sentences_list():
-    """获取句子列表，支持按难度筛选和分页"""
-    db: Session = next(get_db())
+    """获取句子列表，支持按难度筛选和游标分页（after_id + limit）"""
     try:
         # 获取难度参数
         difficulties = request.args.get('difficulties', '').split(',')
         difficulties = [d.strip() for d in difficulties if d.strip()]
+        # 分页参数：返回id大于after_id的前limit条，不传limit则返回全部
+        after_id = request.args.get('after_id', type=int)
+        limit = request.args.get('limit', type=int)
+        if limit is not None:
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
         
-        # 构建查询
-        query = db.query(Sentence)
-        if difficulties:
-            query = query.filter(Sentence.difficulty.in_(difficulties))
+        # 语料未变化时客户端缓存的列表仍然有效
+        etag = corpus_etag(sync_corpus())
+        cached = not_modified(etag, LIST_CACHE_CONTROL)
+        if cached:
+            return cached
         
-        sentences = query.order_by(Sentence.id).all()
+        # 总数直接取自ID索引，不再统计查询结果
+        total = sampler.count(difficulties)
         
-        result = [{
-            'id': s.id,
-            'chinese': s.chinese,
-            'english': s.english,
-            'difficulty': s.difficulty
-        } for s in sentences]
+        # 优先从难度快照读取，快照过大时回退到数据库查询
+        # 只为语料中存在的难度建快照，客户端传入的任意难度值不会占用缓存或触发统计查询
+        existing = sampler.difficulties()
+        known = [d for d in difficulties if d in existing] if difficulties else existing
+        result = cache.get_page(known, after_id, limit) if known else []
+        if result is None:
+            result = query_sentences_page(difficulties, after_id, limit)
         
-        return jsonify({
+        response = {
             'sentences': result,
-            'total': len(result)
-        })
+            'total': total
+        }
+        if limit is not None:
+            # 下一页的游标，没有更多数据时为null
+            has_more = len(result) == limit
+            response['next_after_id'] = result[-1]['id'] if has_more else None
+        
+        return cacheable(jsonify(response), etag, LIST_CACHE_CONTROL)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        return server_error(e)
+
+def query_sentences_page(difficulties, after_id, limit):
+    """直接从数据库按id升序查询一页句子"""
+    db: Session = next(get_read_db())
+    try:
+        query = db.query(Sentence)
+        if difficulties:
+            query = query.filter(Sentence.difficulty.in_(difficulties))
+        if after_id is not None:
+            query = query.filter(Sentence.id > after_id)
+        query = query.order_by(Sentence.id)
+        if limit is not None:
+            query = query.limit(limit)
+        return [s.to_dict() for s in query.all()]
     finally:
         db.close()
 
+@app.route('/api/sentences/search', methods=['GET'])
+def search_sentences():
+    """按英文或中文关键词全文检索句子，按相关度排序，支持难度筛选和分页（offset + limit）"""
+    query = request.args.get('q', '').strip()
+    if len(query) > MAX_SEARCH_QUERY_LENGTH:
+        return jsonify({'error': f'检索词不能超过{MAX_SEARCH_QUERY_LENGTH}个字符'}), 400
+    difficulties = request.args.get('difficulties', '').split(',')
+    difficulties = [d.strip() for d in difficulties if d.strip()]
+    offset = max(0, request.args.get('offset', 0, type=int))
+    limit = max(1, min(request.args.get('limit', SEARCH_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+    
+    try:
+        etag = corpus_etag(sync_corpus())
+        cached = not_modified(etag, LIST_CACHE_CONTROL)
+        if cached:
+            return cached
+        
+        db: Session = next(get_read_db())
+        try:
+            # 多取一条用于判断是否还有下一页
+            statement = search_statement(query, difficulties, limit + 1, offset, db.get_bind().dialect.name)
+            if statement is None:
+                return jsonify({'error': '请输入检索关键词'}), 400
+            rows = db.execute(statement).mappings().all()
+        finally:
+            db.close()
+        
+        has_more = len(rows) > limit
+        return cacheable(jsonify({
+            'sentences': [dict(row) for row in rows[:limit]],
+            'next_offset': offset + limit if has_more else None
+        }), etag, LIST_CACHE_CONTROL)
+    except Exception as e:
+        return server_error(e)
+
+@app.route('/api/sentences/stream', methods=['GET'])
+def stream_sentences():
+    """以NDJSON格式流式返回句子列表（每行一个句子），服务端不持有完整结果"""
+    difficulties = request.args.get('difficulties', '').split(',')
+    difficulties = [d.strip() for d in difficulties if d.strip()]
+    after_id = request.args.get('after_id', type=int)
+    
+    try:
+        sync_corpus()
+        total = sampler.count(difficulties)
+    except Exception as e:
+        return server_error(e)
+    
+    def generate():
+        db: Session = next(get_read_db())
+        try:
+            query = db.query(Sentence)
+            if difficulties:
+                query = query.filter(Sentence.difficulty.in_(difficulties))
+            if after_id is not None:
+                query = query.filter(Sentence.id > after_id)
+            for sentence in query.order_by(Sentence.id).yield_per(STREAM_BATCH_SIZE):
+                yield json.dumps(sentence.to_dict(), ensure_ascii=False) + '\n'
+        finally:
+            db.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson',
+        headers={'X-Total-Count': str(total)}
+    )
+
+@app.route('/api/sentences/export', methods=['GET'])
+def export_sentences():
+    """整库导出（备份或复制到其他节点）：gzip压缩的NDJSON或Parquet文件，边读边写，服务端内存占用与语料规模无关"""
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'error': f"format只能是 {', '.join(EXPORT_FORMATS)}"}), 400
+    if fmt == 'parquet' and not parquet_available():
+        return jsonify({'error': '服务器未安装pyarrow，不支持Parquet格式'}), 400
+    
+    try:
+        version = sync_corpus()
+    except Exception as e:
+        return server_error(e)
+    
+    def generate():
+        db: Session = next(get_read_db())
+        try:
+            yield from export_chunks(db, fmt)
+        finally:
+            db.close()
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype=EXPORT_MIMETYPES[fmt],
+        headers={
+            'Content-Disposition': f'attachment; filename="{export_filename(version, fmt)}"',
+            'X-Corpus-Version': str(version)
+        }
+    )
+
+@app.route('/api/sentence/next', methods=['GET'])
+def get_next_sentence():
+    """间隔重复：返回学习者最早到期的句子，没有到期的句子时返回新句子"""
+    learner_id = request.args.get('learner_id', '')
+    if not is_valid_learner_id(learner_id):
+        return jsonify({'error': '学习者ID不合法'}), 400
+    difficulties = request.args.get('difficulties', '').split(',')
+    difficulties = [d.strip() for d in difficulties if d.strip()]
+    
+    try:
+        sync_corpus()
+        # 复习状态刚由检查答案写入，从主库读取
+        db: Session = next(get_db())
+        try:
+            sentence_id, state = pick_next(db, sampler, learner_id, difficulties)
+            review = review_info(state)
+        finally:
+            db.close()
+        sentence = cache.get_sentence(sentence_id) if sentence_id is not None else None
+        if not sentence:
+            return jsonify({'error': '没有可用的句子'}), 404
+        
+        return jsonify(dict(sentence, review=review))
+    except Exception as e:
+        return server_error(e)
+
 @app.route('/api/sentence/<int:sentence_id>', methods=['GET'])
 def get_sentence(sentence_id):
-    """获取指定ID的句子"""
-    db: Session = next(get_db())
+    """获取指定ID的句子（可被浏览器和代理缓存）"""
     try:
-        sentence = db.query(Sentence).filter(Sentence.id == sentence_id).first()
+        etag = corpus_etag(sync_corpus())
+        # 先确认句子存在再比较ETag：已删除或不存在的ID返回404，不能用304延续客户端缓存的旧内容
+        sentence = cache.get_sentence(sentence_id)
         if not sentence:
             return jsonify({'error': '句子不存在'}), 404
+        cached = not_modified(etag, SENTENCE_CACHE_CONTROL)
+        if cached:
+            return cached
         
-        return jsonify({
-            'id': sentence.id,
-            'chinese': sentence.chinese,
-            'english': sentence.english
-        })
+        return cacheable(jsonify({
+            'id': sentence['id'],
+            'chinese': sentence['chinese'],
+            'english': sentence['english']
+        }), etag, SENTENCE_CACHE_CONTROL)
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
+        return server_error(e)
+
+@app.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Prometheus格式的请求指标（当前worker进程）"""
+    return Response(request_metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@app.route('/api/cache/stats', methods=['GET'])
+def get_cache_stats():
+    """句子缓存命中统计"""
+    return jsonify(cache.stats())
+
+@app.errorhandler(413)
+def upload_too_large(e):
+    """上传文件超过大小上限"""
+    return jsonify({'error': f'文件过大，不能超过{MAX_UPLOAD_BYTES // (1024 * 1024)}MB'}), 413
+
+def upload_set_page(set_id, total, offset, limit):
+    """句子集分页响应"""
+    sentences = upload_store.page(set_id, offset, limit)
+    next_offset = offset + len(sentences)
+    return {
+        'set_id': set_id,
+        'sentences': sentences,
+        'total': total,
+        'next_offset': next_offset if next_offset < total else None
+    }
 
 @app.route('/api/upload-excel', methods=['POST'])
 def upload_excel():
-    """上传并解析Excel文件"""
+    """上传并解析Excel/CSV文件，返回句子集ID和第一页句子（相同文件只解析一次）"""
     try:
         if 'file' not in request.files:
             return jsonify({'error': '没有上传文件'}), 400
@@ -104,75 +417,337 @@ def upload_excel():
         if file.filename == '':
             return jsonify({'error': '文件名为空'}), 400
         
-        # 检查文件扩展名
-        if not file.filename.endswith(('.xlsx', '.xls')):
-            return jsonify({'error': '只支持Excel文件(.xlsx, .xls)'}), 400
-        
-        # 读取Excel文件
-        df = pd.read_excel(file, header=None)
+        # 以文件内容哈希作为句子集ID，命中缓存时跳过解析
+        set_id = hash_upload(file.stream)
+        total = upload_store.get_total(set_id)
+        if total is None:
+            # 按块读取，文件类型、列数和行数不合法时尽早拒绝
+            total = upload_store.put(set_id, iter_upload_sentences(file.stream, file.filename, MAX_UPLOAD_ROWS))
         
-        # 检查列数
-        if df.shape[1] < 2:
-            return jsonify({'error': 'Excel文件至少需要2列（中文、英文）'}), 400
+        if total == 0:
+            return jsonify({'error': '文件中没有有效数据'}), 400
         
-        # 提取数据
-        sentences = []
-        for index, row in df.iterrows():
-            chinese = str(df.iloc[index, 0]).strip()
-            english = str(df.iloc[index, 1]).strip()
-            
-            # 跳过空行
-            if not chinese or not english or chinese == 'nan' or english == 'nan':
-                continue
-            
-            sentences.append({
-                'id': index + 1,  # 临时ID
-                'chinese': chinese,
-                'english': english,
-                'difficulty': 'custom'
-            })
+        return jsonify(upload_set_page(set_id, total, 0, UPLOAD_PAGE_SIZE))
+    except SheetFormatError as e:
+        return jsonify({'error': str(e)}), 400
+    except RequestEntityTooLarge:
+        # 交给413错误处理函数返回JSON
+        raise
+    except Exception as e:
+        return server_error(e, f'解析Excel文件失败: {str(e)}')
+
+@app.route('/api/upload-sets/<set_id>/sentences', methods=['GET'])
+def get_upload_set_page(set_id):
+    """按上传顺序分页获取句子集中的句子（offset + limit）"""
+    try:
+        total = upload_store.get_total(set_id) if is_valid_set_id(set_id) else None
+        if total is None:
+            return jsonify({'error': '句子集不存在或已过期，请重新上传'}), 404
         
-        if len(sentences) == 0:
-            return jsonify({'error': 'Excel文件中没有有效数据'}), 400
+        offset = max(0, request.args.get('offset', 0, type=int))
+        limit = max(1, min(request.args.get('limit', UPLOAD_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+        return jsonify(upload_set_page(set_id, total, offset, limit))
+    except Exception as e:
+        return server_error(e)
+
+@app.route('/api/upload-sets/<set_id>/sentence/<int:sentence_id>', methods=['GET'])
+def get_upload_set_sentence(set_id, sentence_id):
+    """获取句子集中指定ID的句子"""
+    try:
+        sentence = upload_store.get_sentence(set_id, sentence_id) if is_valid_set_id(set_id) else None
+        if not sentence:
+            return jsonify({'error': '句子不存在'}), 404
+        return jsonify(sentence)
+    except Exception as e:
+        return server_error(e)
+
+@app.route('/api/upload-sets/<set_id>/random', methods=['GET'])
+def get_upload_set_random(set_id):
+    """从句子集中随机获取句子，支持排除最近出现的句子"""
+    try:
+        total = upload_store.get_total(set_id) if is_valid_set_id(set_id) else None
+        if not total:
+            return jsonify({'error': '句子集不存在或已过期，请重新上传'}), 404
         
-        return jsonify({
-            'sentences': sentences,
-            'total': len(sentences)
-        })
+        exclude = set(parse_id_list(request.args.get('exclude', '')))
+        sentence = None
+        # 与内置句子的随机抽样一致：多次抽中最近出现过的句子时允许重复
+        for _ in range(SentenceSampler.MAX_EXCLUDE_RETRIES):
+            sentence = upload_store.sentence_at(set_id, random.randrange(total))
+            if sentence and sentence['id'] not in exclude:
+                break
+        if not sentence:
+            return jsonify({'error': '句子不存在'}), 404
+        return jsonify(sentence)
     except Exception as e:
-        return jsonify({'error': f'解析Excel文件失败: {str(e)}'}), 500
+        return server_error(e)
+
+def save_reviews(learner_id, results):
+    """记录学习者的答题结果并在结果中附上更新后的复习状态"""
+    db: Session = next(get_db())
+    try:
+        try:
+            states = record_reviews(db, learner_id, results)
+            # 提交后对象会过期，先取出摘要
+            reviews = {sentence_id: review_info(state) for sentence_id, state in states.items()}
+            db.commit()
+        except IntegrityError:
+            # 同一学习者并发提交同一个新句子，另一请求已插入，重新读取后更新
+            db.rollback()
+            states = record_reviews(db, learner_id, results)
+            reviews = {sentence_id: review_info(state) for sentence_id, state in states.items()}
+            db.commit()
+        for result in results:
+            if 'error' not in result:
+                result['review'] = reviews[result['sentence_id']]
+    finally:
+        db.close()
 
 @app.route('/api/check', methods=['POST'])
 def check_answer():
-    """检查用户答案"""
-    data = request.json
-    sentence_id = data.get('sentence_id')
-    user_answer = data.get('answer', '').strip()
+    """
+    检查用户答案，返回是否正确、相似度和逐词比对结果（传入set_id时检查上传句子集中的句子）
+    传入learner_id时记录答题结果，更新该句子的复习状态（上传的句子不参与复习）
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': '请求体必须是JSON对象'}), 400
+    try:
+        user_answer = parse_answer(data.get('answer'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    sentence_id = parse_sentence_id(data.get('sentence_id'))
+    set_id = data.get('set_id')
+    ignore_punctuation = bool(data.get('ignore_punctuation'))
+    learner_id = data.get('learner_id')
+    if learner_id is not None and not is_valid_learner_id(learner_id):
+        return jsonify({'error': '学习者ID不合法'}), 400
     
-    db: Session = next(get_db())
     try:
-        sentence = db.query(Sentence).filter(Sentence.id == sentence_id).first()
+        sentence = None
+        if sentence_id is not None:
+            if set_id:
+                sentence = upload_store.get_sentence(set_id, sentence_id) if is_valid_set_id(set_id) else None
+            else:
+                sync_corpus()
+                sentence = cache.get_sentence(sentence_id)
         if not sentence:
             return jsonify({'error': '句子不存在'}), 404
         
-        correct_answer = sentence.english.strip()
-        # 答案检查：忽略大小写，规范化空格（多个空格合并为一个）
-        # 保留标点符号，但规范化空格
-        import re
-        normalized_user = re.sub(r'\s+', ' ', user_answer.lower().strip())
-        normalized_correct = re.sub(r'\s+', ' ', correct_answer.lower().strip())
-        is_correct = normalized_user == normalized_correct
+        result = check_user_answer(user_answer, sentence['english'], ignore_punctuation)
+        if learner_id and not set_id:
+            result['sentence_id'] = sentence_id
+            save_reviews(learner_id, [result])
+            del result['sentence_id']
+        return jsonify(result)
+    except Exception as e:
+        return server_error(e)
+
+@app.route('/api/check/batch', methods=['POST'])
+def check_answers_batch():
+    """
+    批量检查答案：引用的句子一次取出（优先走缓存），结果按请求顺序返回
+    传入learner_id时在一个事务中记录全部答题结果
+    """
+    data = request.get_json(silent=True)
+    try:
+        items = parse_batch(data, MAX_CHECK_BATCH)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    learner_id = data.get('learner_id')
+    if learner_id is not None and not is_valid_learner_id(learner_id):
+        return jsonify({'error': '学习者ID不合法'}), 400
+    
+    try:
+        sync_corpus()
+        sentences = cache.get_sentences(sentence_id for sentence_id, _ in items if sentence_id is not None)
+        results = check_batch(items, sentences, bool(data.get('ignore_punctuation')))
+        if learner_id:
+            save_reviews(learner_id, results)
+        return jsonify({
+            'results': results,
+            'total': len(results),
+            'correct_count': sum(1 for result in results if result.get('is_correct'))
+        })
+    except Exception as e:
+        return server_error(e)
+
+def sync_session_source(session):
+    """推进会话前的准备：上传句子集的会话返回句子数（已过期时为0），内置句子的会话同步语料版本后返回None"""
+    if session.set_id:
+        return upload_store.get_total(session.set_id) or 0
+    sync_corpus()
+    return None
+
+def session_sentence(session):
+    """会话当前题目的句子字典，句子已被删除时为None"""
+    entry = current_entry(session)
+    if entry is None:
+        return None
+    if session.set_id:
+        return upload_store.sentence_at(session.set_id, entry)
+    return cache.get_sentence(entry)
+
+def session_state(session, total):
+    """会话状态响应内容（在提交前生成，避免提交后重新加载会话）"""
+    return session_payload(session, session_sentence(session), progress(session, sampler, total))
+
+@app.route('/api/sessions', methods=['POST'])
+def create_practice_session():
+    """
+    创建练习会话并出第一题：mode为sequential或random，传入set_id时练习上传的句子集，否则按difficulties筛选内置句子
+    每个学习者只保留最近使用的若干个会话
+    """
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({'error': '请求体必须是JSON对象'}), 400
+    learner_id = data.get('learner_id')
+    if not is_valid_learner_id(learner_id):
+        return jsonify({'error': '学习者ID不合法'}), 400
+    mode = data.get('mode', 'sequential')
+    if mode not in SESSION_MODES:
+        return jsonify({'error': '练习模式不合法'}), 400
+    difficulties = data.get('difficulties') or []
+    if not valid_difficulties(difficulties):
+        return jsonify({'error': '难度参数不合法'}), 400
+    set_id = data.get('set_id') or None
+    if set_id is not None and not (isinstance(set_id, str) and is_valid_set_id(set_id)):
+        return jsonify({'error': '句子集不存在或已过期，请重新上传'}), 404
+    
+    try:
+        session = new_session(learner_id, mode, difficulties, set_id)
+        total = sync_session_source(session)
+        if set_id and not total:
+            return jsonify({'error': '句子集不存在或已过期，请重新上传'}), 404
+        if not advance(session, sampler, total):
+            return jsonify({'error': '没有可用的句子'}), 404
         
+        db: Session = next(get_db())
+        try:
+            db.add(session)
+            db.flush()
+            db.execute(stale_sessions_statement(learner_id))
+            state = session_state(session, total)
+            db.commit()
+        finally:
+            db.close()
+        return jsonify(state)
+    except Exception as e:
+        return server_error(e)
+
+def step_practice_session(session_id, step=None):
+    """读取会话，执行step(会话, 句子集句子数)后保存，返回会话状态；step返回False表示没有可用的句子"""
+    try:
+        db: Session = next(get_db())
+        try:
+            session = db.get(PracticeSession, session_id) if is_valid_session_id(session_id) else None
+            if session is None:
+                return jsonify({'error': '练习会话不存在'}), 404
+            total = sync_session_source(session)
+            if session.set_id and not total:
+                return jsonify({'error': '句子集不存在或已过期，请重新上传'}), 404
+            if step is not None:
+                if not step(session, total):
+                    return jsonify({'error': '没有可用的句子'}), 404
+                state = session_state(session, total)
+                db.commit()
+            else:
+                state = session_state(session, total)
+        finally:
+            db.close()
+        return jsonify(state)
+    except Exception as e:
+        return server_error(e)
+
+@app.route('/api/sessions/<session_id>', methods=['GET'])
+def get_practice_session(session_id):
+    """会话的当前题目和进度（刷新页面后继续练习）"""
+    return step_practice_session(session_id)
+
+@app.route('/api/sessions/<session_id>/next', methods=['POST'])
+def next_practice_sentence(session_id):
+    """下一题：回看过的题目直接前进，否则按会话模式出新题"""
+    return step_practice_session(session_id, lambda session, total: advance(session, sampler, total))
+
+@app.route('/api/sessions/<session_id>/prev', methods=['POST'])
+def previous_practice_sentence(session_id):
+    """上一题（已是最早的一题时保持不变）"""
+    return step_practice_session(session_id, lambda session, total: go_back(session) or True)
+
+@app.route('/api/sessions/<session_id>/answer', methods=['POST'])
+def answer_practice_sentence(session_id):
+    """
+    检查当前题目的答案并记入会话历史，返回结果与 /api/check 相同
+    传入sentence_id时校验是否仍是当前题目；内置句子同时更新学习者的复习状态
+    """
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return jsonify({'error': '请求体必须是JSON对象'}), 400
+    try:
+        user_answer = parse_answer(data.get('answer'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    expected_id = parse_sentence_id(data.get('sentence_id'))
+    ignore_punctuation = bool(data.get('ignore_punctuation'))
+    
+    try:
+        db: Session = next(get_db())
+        try:
+            session = db.get(PracticeSession, session_id) if is_valid_session_id(session_id) else None
+            if session is None:
+                return jsonify({'error': '练习会话不存在'}), 404
+            sync_session_source(session)
+            sentence = session_sentence(session)
+            if not sentence:
+                return jsonify({'error': '句子不存在'}), 404
+            if expected_id is not None and expected_id != sentence['id']:
+                return jsonify({'error': '当前题目已变化，请刷新后重试'}), 409
+            
+            result = check_user_answer(user_answer, sentence['english'], ignore_punctuation)
+            record_score(session, result)
+            learner_id, set_id = session.learner_id, session.set_id
+            db.commit()
+        finally:
+            db.close()
+        if not set_id:
+            result['sentence_id'] = sentence['id']
+            save_reviews(learner_id, [result])
+            del result['sentence_id']
+        return jsonify(result)
+    except Exception as e:
+        return server_error(e)
+
+@app.route('/api/sessions/<session_id>/history', methods=['GET'])
+def get_practice_history(session_id):
+    """会话的答题历史（offset + limit分页，从最早的一题开始）"""
+    try:
+        db: Session = next(get_db())
+        try:
+            session = db.get(PracticeSession, session_id) if is_valid_session_id(session_id) else None
+            if session is None:
+                return jsonify({'error': '练习会话不存在'}), 404
+            offset = max(0, request.args.get('offset', 0, type=int))
+            limit = max(1, min(request.args.get('limit', UPLOAD_PAGE_SIZE, type=int), MAX_PAGE_SIZE))
+            entries = history_entries(session, offset, limit)
+            total = len(session.scores)
+        finally:
+            db.close()
+        next_offset = offset + len(entries)
         return jsonify({
-            'is_correct': is_correct,
-            'correct_answer': correct_answer,
-            'user_answer': user_answer
+            'session_id': session_id,
+            'entries': entries,
+            'total': total,
+            'next_offset': next_offset if next_offset < total else None
         })
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
-    finally:
-        db.close()
+        return server_error(e)
 
 if __name__ == '__main__':
+    # 本地开发用的单进程服务器；生产环境请使用 gunicorn -c gunicorn.conf.py wsgi:app
+    init_db()
     app.run(debug=True, port=5001)
 
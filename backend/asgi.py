@@ -0,0 +1,10 @@
+"""
+异步（ASGI）版本的入口: uvicorn asgi:app --port 5001
+多进程部署时配合gunicorn的preload_app，数据库结构初始化只在主进程执行一次:
+    gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+"""
+from database import init_db
+
+init_db()
+
+from asgi_app import app  # noqa: E402
@@ -0,0 +1,811 @@
+"""
+异步（ASGI）版本的API，接口路径和返回的JSON与 app.py 完全一致，前端无需修改
+数据库访问使用异步驱动（SQLite: aiosqlite，PostgreSQL: asyncpg），Excel解析交给进程池
+
+运行: uvicorn asgi:app --port 5001
+多进程: gunicorn -c gunicorn.conf.py -k uvicorn.workers.UvicornWorker asgi:app
+"""
+import asyncio
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders, UploadFile
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from database import create_async_db_engine, CORPUS_VERSION_KEY
+from models import Sentence, CorpusMeta, PracticeSession
+from sampler import SentenceSampler
+from cache import SentenceCache
+from sheet_reader import SheetFormatError
+from upload_store import UploadStore, hash_upload, is_valid_set_id, parse_upload_file
+from answer_check import check_answer as check_user_answer, check_batch, parse_answer, parse_batch, parse_sentence_id
+from http_cache import (
+    corpus_etag, etag_matches, encoded_etag, choose_encoding, should_compress, compress,
+    SENTENCE_CACHE_CONTROL, LIST_CACHE_CONTROL
+)
+from search_index import search_statement
+from scheduler import (
+    is_valid_learner_id, review_states_query, apply_reviews, review_info,
+    next_review_query, seen_query, new_candidates, first_unseen
+)
+from practice import (
+    SESSION_MODES, is_valid_session_id, valid_difficulties, new_session, stale_sessions_statement,
+    current_entry, advance, go_back, record_score, progress, history_entries, session_payload
+)
+from config import (
+    DATABASE_URL, DATABASE_READ_URL, UPLOAD_CACHE_PATH, UPLOAD_CACHE_MAX_ROWS, UPLOAD_PAGE_SIZE,
+    MAX_UPLOAD_BYTES, MAX_UPLOAD_ROWS, MAX_PAGE_SIZE, MAX_CHECK_BATCH,
+    SENTENCE_BATCH_SIZE, MAX_SENTENCE_BATCH, SEARCH_PAGE_SIZE, MAX_SEARCH_QUERY_LENGTH, CORPUS_SNAPSHOT_PATH
+)
+
+# 解析上传文件的子进程数
+UPLOAD_PARSE_WORKERS = int(os.environ.get('UPLOAD_PARSE_WORKERS', 2))
+
+# 只读异步引擎；缓存和抽样索引与同步版本共用同一实现，未命中时由本模块异步加载
+read_engine = create_async_db_engine(DATABASE_READ_URL, read_only=True)
+AsyncReadSession = async_sessionmaker(read_engine, expire_on_commit=False)
+# 写入复习状态使用主库
+write_engine = create_async_db_engine(DATABASE_URL)
+AsyncSession = async_sessionmaker(write_engine, expire_on_commit=False)
+
+# 不传入同步会话工厂：只使用不访问数据库的方法（lookup/store/load等）
+cache = SentenceCache(None, corpus_snapshot_path=CORPUS_SNAPSHOT_PATH)
+sampler = SentenceSampler(None)
+upload_store = UploadStore(UPLOAD_CACHE_PATH, max_rows=UPLOAD_CACHE_MAX_ROWS)
+
+# 同一时刻只有一个协程检查语料版本，避免版本变化时并发重建索引
+corpus_lock = asyncio.Lock()
+# 解析上传文件的进程池，在应用启动时创建
+parse_pool = None
+
+def error(message, status_code):
+    """错误响应，格式与Flask版本一致"""
+    return JSONResponse({'error': message}, status_code=status_code)
+
+def query_int(request, name, default=None):
+    """读取整数查询参数，缺失或非法时返回默认值"""
+    try:
+        return int(request.query_params[name])
+    except (KeyError, ValueError):
+        return default
+
+def query_list(request, name):
+    """读取逗号分隔的字符串列表参数"""
+    values = request.query_params.get(name, '').split(',')
+    return [v.strip() for v in values if v.strip()]
+
+def parse_id_list(value):
+    """解析逗号分隔的ID列表，忽略非法值"""
+    return [int(v) for v in value.split(',') if v.strip().isdigit()]
+
+async def sync_corpus():
+    """检查语料版本，必要时清空缓存、重建抽样索引，返回当前语料版本号"""
+    if not cache.needs_check():
+        return cache.version
+    async with corpus_lock:
+        if not cache.needs_check():
+            return cache.version
+        async with AsyncReadSession() as db:
+            meta = await db.get(CorpusMeta, CORPUS_VERSION_KEY)
+            version = meta.value if meta else 0
+            snapshot = cache.refresh_snapshot(version)
+            if snapshot is not None:
+                # 有一致的只读快照时直接使用快照中的ID数组
+                sampler.load_groups(version, snapshot.difficulty_groups())
+            elif version != sampler.version:
+                # 绕过ORM直接由驱动执行，读取全部ID的耗时约减半
+                conn = await db.connection()
+                rows = (await conn.exec_driver_sql(SentenceSampler.index_sql(conn.dialect))).all()
+                # 构建索引是纯计算，放到线程中执行，不阻塞事件循环
+                await run_in_threadpool(sampler.load, version, rows)
+        return cache.apply_version(version)
+
+def not_modified(request, etag, cache_control):
+    """客户端缓存的版本仍是最新时返回304响应，否则返回None"""
+    matched = etag_matches(request.headers.get('if-none-match'), etag)
+    if matched is None:
+        return None
+    return Response(status_code=304, headers={
+        'ETag': matched, 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'
+    })
+
+def cacheable(payload, etag, cache_control):
+    """带ETag和缓存策略的JSON响应"""
+    return JSONResponse(payload, headers={'ETag': etag, 'Cache-Control': cache_control})
+
+async def get_cached_sentence(sentence_id):
+    """按ID获取句子字典（优先走缓存），不存在时返回None"""
+    item, version = cache.lookup(sentence_id)
+    if item is not None:
+        return item
+    async with AsyncReadSession() as db:
+        sentence = await db.get(Sentence, sentence_id)
+        item = sentence.to_dict() if sentence else None
+    if item is not None:
+        cache.store(version, item)
+    return item
+
+async def get_cached_sentences(sentence_ids):
+    """按ID批量获取句子字典，未命中的ID用一次IN查询加载"""
+    found = {}
+    missing = []
+    version = None
+    for sentence_id in set(sentence_ids):
+        item, version = cache.lookup(sentence_id)
+        if item is not None:
+            found[sentence_id] = item
+        else:
+            missing.append(sentence_id)
+    if missing:
+        async with AsyncReadSession() as db:
+            rows = (await db.execute(select(Sentence).where(Sentence.id.in_(missing)))).scalars()
+            items = [s.to_dict() for s in rows]
+        for item in items:
+            cache.store(version, item)
+            found[item['id']] = item
+    return found
+
+async def get_random_sentence(request):
+    """获取随机句子，支持按难度筛选、随机种子和排除最近出现的句子"""
+    try:
+        difficulties = query_list(request, 'difficulties')
+        seed = query_int(request, 'seed')
+        exclude = parse_id_list(request.query_params.get('exclude', ''))
+        
+        await sync_corpus()
+        sentence_id = sampler.pick(difficulties, seed=seed, exclude=exclude)
+        sentence = await get_cached_sentence(sentence_id) if sentence_id is not None else None
+        if not sentence:
+            return error('没有可用的句子', 404)
+        
+        return JSONResponse(sentence)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def get_shuffled_sentence(request):
+    """
+    乱序播放：所选难度的句子按seed打乱后的第position个（从0开始），同一种子下依次取0~total-1不会重复
+    顺序按位置即时计算，服务端不保存打乱后的列表
+    """
+    try:
+        difficulties = query_list(request, 'difficulties')
+        seed = query_int(request, 'seed')
+        if seed is None:
+            return error('缺少随机种子seed', 400)
+        position = query_int(request, 'position', 0)
+        
+        await sync_corpus()
+        sentence_id = sampler.shuffled(difficulties, seed, position)
+        sentence = await get_cached_sentence(sentence_id) if sentence_id is not None else None
+        if not sentence:
+            return error('没有该位置的句子', 404)
+        
+        return JSONResponse(dict(sentence, position=position, total=sampler.count(difficulties)))
+    except Exception as e:
+        return error(str(e), 500)
+
+async def get_sentences_batch(request):
+    """
+    批量获取句子：随机抽取n个不重复的句子（前端预取），或传入ids按顺序查询（恢复历史记录）
+    随机模式的参数与 /api/sentence/random 相同
+    """
+    try:
+        ids = request.query_params.get('ids')
+        if ids is not None:
+            sentence_ids = parse_id_list(ids)
+            if len(sentence_ids) > MAX_SENTENCE_BATCH:
+                return error(f'一次最多获取{MAX_SENTENCE_BATCH}个句子', 400)
+            await sync_corpus()
+        else:
+            difficulties = query_list(request, 'difficulties')
+            count = max(1, min(query_int(request, 'n', SENTENCE_BATCH_SIZE), MAX_SENTENCE_BATCH))
+            seed = query_int(request, 'seed')
+            exclude = parse_id_list(request.query_params.get('exclude', ''))
+            await sync_corpus()
+            sentence_ids = sampler.pick_many(difficulties, count, seed=seed, exclude=exclude)
+        
+        sentences = await get_cached_sentences(sentence_ids)
+        return JSONResponse({'sentences': [sentences[i] for i in sentence_ids if i in sentences]})
+    except Exception as e:
+        return error(str(e), 500)
+
+async def get_sentences_list(request):
+    """获取句子列表，支持按难度筛选和游标分页（after_id + limit）"""
+    try:
+        difficulties = query_list(request, 'difficulties')
+        after_id = query_int(request, 'after_id')
+        limit = query_int(request, 'limit')
+        if limit is not None:
+            limit = max(1, min(limit, MAX_PAGE_SIZE))
+        
+        # 语料未变化时客户端缓存的列表仍然有效
+        version = await sync_corpus()
+        etag = corpus_etag(version)
+        cached = not_modified(request, etag, LIST_CACHE_CONTROL)
+        if cached:
+            return cached
+        
+        total = sampler.count(difficulties)
+        
+        snapshot = cache.current_snapshot(version)
+        if snapshot is not None:
+            # 有一致的只读快照时直接从快照分页，不查询数据库
+            result = snapshot.page(difficulties, after_id, limit)
+        else:
+            # 按(difficulty, id)索引的游标查询，不在内存中保留列表快照
+            query = select(Sentence)
+            if difficulties:
+                query = query.where(Sentence.difficulty.in_(difficulties))
+            if after_id is not None:
+                query = query.where(Sentence.id > after_id)
+            query = query.order_by(Sentence.id)
+            if limit is not None:
+                query = query.limit(limit)
+            async with AsyncReadSession() as db:
+                result = [s.to_dict() for s in (await db.execute(query)).scalars()]
+        
+        response = {
+            'sentences': result,
+            'total': total
+        }
+        if limit is not None:
+            has_more = len(result) == limit
+            response['next_after_id'] = result[-1]['id'] if has_more else None
+        
+        return cacheable(response, etag, LIST_CACHE_CONTROL)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def search_sentences(request):
+    """按英文或中文关键词全文检索句子，按相关度排序，支持难度筛选和分页（offset + limit）"""
+    query = request.query_params.get('q', '').strip()
+    if len(query) > MAX_SEARCH_QUERY_LENGTH:
+        return error(f'检索词不能超过{MAX_SEARCH_QUERY_LENGTH}个字符', 400)
+    difficulties = query_list(request, 'difficulties')
+    offset = max(0, query_int(request, 'offset', 0))
+    limit = max(1, min(query_int(request, 'limit', SEARCH_PAGE_SIZE), MAX_PAGE_SIZE))
+    
+    try:
+        etag = corpus_etag(await sync_corpus())
+        cached = not_modified(request, etag, LIST_CACHE_CONTROL)
+        if cached:
+            return cached
+        
+        # 多取一条用于判断是否还有下一页
+        statement = search_statement(query, difficulties, limit + 1, offset, read_engine.dialect.name)
+        if statement is None:
+            return error('请输入检索关键词', 400)
+        async with AsyncReadSession() as db:
+            rows = (await db.execute(statement)).mappings().all()
+        
+        has_more = len(rows) > limit
+        return cacheable({
+            'sentences': [dict(row) for row in rows[:limit]],
+            'next_offset': offset + limit if has_more else None
+        }, etag, LIST_CACHE_CONTROL)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def pick_next(db, learner_id, difficulties):
+    """选择学习者的下一题，规则与 scheduler.pick_next 一致"""
+    now = datetime.now()
+    state = (await db.execute(next_review_query(learner_id, difficulties, now))).scalar()
+    if state is not None:
+        return state.sentence_id, state
+    
+    candidates = new_candidates(sampler, difficulties)
+    if candidates:
+        seen = (await db.execute(seen_query(learner_id, candidates))).scalars()
+        sentence_id = first_unseen(candidates, seen)
+        if sentence_id is not None:
+            return sentence_id, None
+    
+    state = (await db.execute(next_review_query(learner_id, difficulties, now, due=False))).scalar()
+    if state is not None:
+        return state.sentence_id, state
+    return (candidates[0] if candidates else None), None
+
+async def get_next_sentence(request):
+    """间隔重复：返回学习者最早到期的句子，没有到期的句子时返回新句子"""
+    learner_id = request.query_params.get('learner_id', '')
+    if not is_valid_learner_id(learner_id):
+        return error('学习者ID不合法', 400)
+    difficulties = query_list(request, 'difficulties')
+    
+    try:
+        await sync_corpus()
+        # 复习状态刚由检查答案写入，从主库读取
+        async with AsyncSession() as db:
+            sentence_id, state = await pick_next(db, learner_id, difficulties)
+            review = review_info(state)
+        sentence = await get_cached_sentence(sentence_id) if sentence_id is not None else None
+        if not sentence:
+            return error('没有可用的句子', 404)
+        
+        return JSONResponse(dict(sentence, review=review))
+    except Exception as e:
+        return error(str(e), 500)
+
+async def get_sentence(request):
+    """获取指定ID的句子（可被浏览器和代理缓存）"""
+    try:
+        etag = corpus_etag(await sync_corpus())
+        # 先确认句子存在再比较ETag：已删除或不存在的ID返回404，不能用304延续客户端缓存的旧内容
+        sentence = await get_cached_sentence(request.path_params['sentence_id'])
+        if not sentence:
+            return error('句子不存在', 404)
+        cached = not_modified(request, etag, SENTENCE_CACHE_CONTROL)
+        if cached:
+            return cached
+        
+        return cacheable({
+            'id': sentence['id'],
+            'chinese': sentence['chinese'],
+            'english': sentence['english']
+        }, etag, SENTENCE_CACHE_CONTROL)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def record_reviews(db, learner_id, results):
+    """在异步会话中记录一批答题结果（不提交），返回 {句子ID: 复习状态摘要}"""
+    sentence_ids = [result['sentence_id'] for result in results if 'error' not in result]
+    if not sentence_ids:
+        return {}
+    states = (await db.execute(review_states_query(learner_id, sentence_ids))).scalars().all()
+    updated = apply_reviews(states, learner_id, results)
+    db.add_all(updated.values())
+    return {sentence_id: review_info(state) for sentence_id, state in updated.items()}
+
+async def save_reviews(learner_id, results):
+    """记录学习者的答题结果并在结果中附上更新后的复习状态"""
+    async with AsyncSession() as db:
+        try:
+            reviews = await record_reviews(db, learner_id, results)
+            await db.commit()
+        except IntegrityError:
+            # 同一学习者并发提交同一个新句子，另一请求已插入，重新读取后更新
+            await db.rollback()
+            reviews = await record_reviews(db, learner_id, results)
+            await db.commit()
+    for result in results:
+        if 'error' not in result:
+            result['review'] = reviews[result['sentence_id']]
+
+async def check_answer(request):
+    """
+    检查用户答案，返回是否正确、相似度和逐词比对结果（传入set_id时检查上传句子集中的句子）
+    传入learner_id时记录答题结果，更新该句子的复习状态（上传的句子不参与复习）
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return error('请求体必须是JSON对象', 400)
+    try:
+        user_answer = parse_answer(data.get('answer'))
+    except ValueError as e:
+        return error(str(e), 400)
+    sentence_id = parse_sentence_id(data.get('sentence_id'))
+    set_id = data.get('set_id')
+    ignore_punctuation = bool(data.get('ignore_punctuation'))
+    learner_id = data.get('learner_id')
+    if learner_id is not None and not is_valid_learner_id(learner_id):
+        return error('学习者ID不合法', 400)
+    
+    try:
+        sentence = None
+        if sentence_id is not None:
+            if set_id:
+                if is_valid_set_id(set_id):
+                    sentence = await run_in_threadpool(upload_store.get_sentence, set_id, sentence_id)
+            else:
+                await sync_corpus()
+                sentence = await get_cached_sentence(sentence_id)
+        if not sentence:
+            return error('句子不存在', 404)
+        
+        result = check_user_answer(user_answer, sentence['english'], ignore_punctuation)
+        if learner_id and not set_id:
+            result['sentence_id'] = sentence_id
+            await save_reviews(learner_id, [result])
+            del result['sentence_id']
+        return JSONResponse(result)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def check_answers_batch(request):
+    """
+    批量检查答案：引用的句子一次取出（优先走缓存），结果按请求顺序返回
+    传入learner_id时在一个事务中记录全部答题结果
+    """
+    try:
+        data = await request.json()
+        items = parse_batch(data, MAX_CHECK_BATCH)
+    except ValueError as e:
+        return error(str(e), 400)
+    learner_id = data.get('learner_id')
+    if learner_id is not None and not is_valid_learner_id(learner_id):
+        return error('学习者ID不合法', 400)
+    
+    try:
+        await sync_corpus()
+        sentences = await get_cached_sentences(sentence_id for sentence_id, _ in items if sentence_id is not None)
+        results = check_batch(items, sentences, bool(data.get('ignore_punctuation')))
+        if learner_id:
+            await save_reviews(learner_id, results)
+        return JSONResponse({
+            'results': results,
+            'total': len(results),
+            'correct_count': sum(1 for result in results if result.get('is_correct'))
+        })
+    except Exception as e:
+        return error(str(e), 500)
+
+async def sync_session_source(session):
+    """推进会话前的准备：上传句子集的会话返回句子数（已过期时为0），内置句子的会话同步语料版本后返回None"""
+    if session.set_id:
+        return await run_in_threadpool(upload_store.get_total, session.set_id) or 0
+    await sync_corpus()
+    return None
+
+async def session_sentence(session):
+    """会话当前题目的句子字典，句子已被删除时为None"""
+    entry = current_entry(session)
+    if entry is None:
+        return None
+    if session.set_id:
+        return await run_in_threadpool(upload_store.sentence_at, session.set_id, entry)
+    return await get_cached_sentence(entry)
+
+async def session_state(session, total):
+    """会话状态响应内容"""
+    return session_payload(session, await session_sentence(session), progress(session, sampler, total))
+
+async def create_practice_session(request):
+    """
+    创建练习会话并出第一题：mode为sequential或random，传入set_id时练习上传的句子集，否则按difficulties筛选内置句子
+    每个学习者只保留最近使用的若干个会话
+    """
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return error('请求体必须是JSON对象', 400)
+    learner_id = data.get('learner_id')
+    if not is_valid_learner_id(learner_id):
+        return error('学习者ID不合法', 400)
+    mode = data.get('mode', 'sequential')
+    if mode not in SESSION_MODES:
+        return error('练习模式不合法', 400)
+    difficulties = data.get('difficulties') or []
+    if not valid_difficulties(difficulties):
+        return error('难度参数不合法', 400)
+    set_id = data.get('set_id') or None
+    if set_id is not None and not (isinstance(set_id, str) and is_valid_set_id(set_id)):
+        return error('句子集不存在或已过期，请重新上传', 404)
+    
+    try:
+        session = new_session(learner_id, mode, difficulties, set_id)
+        total = await sync_session_source(session)
+        if set_id and not total:
+            return error('句子集不存在或已过期，请重新上传', 404)
+        if not advance(session, sampler, total):
+            return error('没有可用的句子', 404)
+        
+        async with AsyncSession() as db:
+            db.add(session)
+            await db.flush()
+            await db.execute(stale_sessions_statement(learner_id))
+            state = await session_state(session, total)
+            await db.commit()
+        return JSONResponse(state)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def step_practice_session(session_id, step=None):
+    """读取会话，执行step(会话, 句子集句子数)后保存，返回会话状态；step返回False表示没有可用的句子"""
+    try:
+        async with AsyncSession() as db:
+            session = await db.get(PracticeSession, session_id) if is_valid_session_id(session_id) else None
+            if session is None:
+                return error('练习会话不存在', 404)
+            total = await sync_session_source(session)
+            if session.set_id and not total:
+                return error('句子集不存在或已过期，请重新上传', 404)
+            if step is not None:
+                if not step(session, total):
+                    return error('没有可用的句子', 404)
+                state = await session_state(session, total)
+                await db.commit()
+            else:
+                state = await session_state(session, total)
+        return JSONResponse(state)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def get_practice_session(request):
+    """会话的当前题目和进度（刷新页面后继续练习）"""
+    return await step_practice_session(request.path_params['session_id'])
+
+async def next_practice_sentence(request):
+    """下一题：回看过的题目直接前进，否则按会话模式出新题"""
+    return await step_practice_session(
+        request.path_params['session_id'], lambda session, total: advance(session, sampler, total)
+    )
+
+async def previous_practice_sentence(request):
+    """上一题（已是最早的一题时保持不变）"""
+    return await step_practice_session(request.path_params['session_id'], lambda session, total: go_back(session) or True)
+
+async def answer_practice_sentence(request):
+    """
+    检查当前题目的答案并记入会话历史，返回结果与 /api/check 相同
+    传入sentence_id时校验是否仍是当前题目；内置句子同时更新学习者的复习状态
+    """
+    session_id = request.path_params['session_id']
+    try:
+        data = await request.json()
+    except ValueError:
+        data = None
+    if data is None:
+        data = {}
+    if not isinstance(data, dict):
+        return error('请求体必须是JSON对象', 400)
+    try:
+        user_answer = parse_answer(data.get('answer'))
+    except ValueError as e:
+        return error(str(e), 400)
+    expected_id = parse_sentence_id(data.get('sentence_id'))
+    ignore_punctuation = bool(data.get('ignore_punctuation'))
+    
+    try:
+        async with AsyncSession() as db:
+            session = await db.get(PracticeSession, session_id) if is_valid_session_id(session_id) else None
+            if session is None:
+                return error('练习会话不存在', 404)
+            await sync_session_source(session)
+            sentence = await session_sentence(session)
+            if not sentence:
+                return error('句子不存在', 404)
+            if expected_id is not None and expected_id != sentence['id']:
+                return error('当前题目已变化，请刷新后重试', 409)
+            
+            result = check_user_answer(user_answer, sentence['english'], ignore_punctuation)
+            record_score(session, result)
+            learner_id, set_id = session.learner_id, session.set_id
+            await db.commit()
+        if not set_id:
+            result['sentence_id'] = sentence['id']
+            await save_reviews(learner_id, [result])
+            del result['sentence_id']
+        return JSONResponse(result)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def get_practice_history(request):
+    """会话的答题历史（offset + limit分页，从最早的一题开始）"""
+    session_id = request.path_params['session_id']
+    try:
+        async with AsyncSession() as db:
+            session = await db.get(PracticeSession, session_id) if is_valid_session_id(session_id) else None
+            if session is None:
+                return error('练习会话不存在', 404)
+            offset = max(0, query_int(request, 'offset', 0))
+            limit = max(1, min(query_int(request, 'limit', UPLOAD_PAGE_SIZE), MAX_PAGE_SIZE))
+            entries = history_entries(session, offset, limit)
+            total = len(session.scores)
+        next_offset = offset + len(entries)
+        return JSONResponse({
+            'session_id': session_id,
+            'entries': entries,
+            'total': total,
+            'next_offset': next_offset if next_offset < total else None
+        })
+    except Exception as e:
+        return error(str(e), 500)
+
+def save_upload(file):
+    """把上传文件写入临时文件，返回路径（子进程按路径读取）"""
+    suffix = os.path.splitext(file.filename)[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix, delete=False) as target:
+        file.file.seek(0)
+        shutil.copyfileobj(file.file, target)
+    return target.name
+
+def upload_set_page(set_id, total, offset, limit):
+    """句子集分页响应"""
+    sentences = upload_store.page(set_id, offset, limit)
+    next_offset = offset + len(sentences)
+    return {
+        'set_id': set_id,
+        'sentences': sentences,
+        'total': total,
+        'next_offset': next_offset if next_offset < total else None
+    }
+
+def too_large():
+    """上传文件超过大小上限"""
+    return error(f'文件过大，不能超过{MAX_UPLOAD_BYTES // (1024 * 1024)}MB', 413)
+
+async def upload_excel(request):
+    """上传并解析Excel/CSV文件，返回句子集ID和第一页句子（相同文件只解析一次）"""
+    try:
+        if int(request.headers.get('content-length') or 0) > MAX_UPLOAD_BYTES:
+            return too_large()
+        
+        form = await request.form()
+        file = form.get('file')
+        if not isinstance(file, UploadFile):
+            return error('没有上传文件', 400)
+        if not file.filename:
+            return error('文件名为空', 400)
+        if file.size is not None and file.size > MAX_UPLOAD_BYTES:
+            return too_large()
+        
+        # 以文件内容哈希作为句子集ID，命中缓存时跳过解析
+        set_id = await run_in_threadpool(hash_upload, file.file)
+        total = await run_in_threadpool(upload_store.get_total, set_id)
+        if total is None:
+            path = await run_in_threadpool(save_upload, file)
+            try:
+                total = await asyncio.get_running_loop().run_in_executor(
+                    parse_pool, parse_upload_file,
+                    path, file.filename, set_id, UPLOAD_CACHE_PATH, MAX_UPLOAD_ROWS, UPLOAD_CACHE_MAX_ROWS
+                )
+            finally:
+                os.remove(path)
+        
+        if total == 0:
+            return error('文件中没有有效数据', 400)
+        
+        return JSONResponse(await run_in_threadpool(upload_set_page, set_id, total, 0, UPLOAD_PAGE_SIZE))
+    except SheetFormatError as e:
+        return error(str(e), 400)
+    except Exception as e:
+        return error(f'解析Excel文件失败: {str(e)}', 500)
+
+async def get_upload_set_page(request):
+    """按上传顺序分页获取句子集中的句子（offset + limit）"""
+    set_id = request.path_params['set_id']
+    try:
+        total = await run_in_threadpool(upload_store.get_total, set_id) if is_valid_set_id(set_id) else None
+        if total is None:
+            return error('句子集不存在或已过期，请重新上传', 404)
+        
+        offset = max(0, query_int(request, 'offset', 0))
+        limit = max(1, min(query_int(request, 'limit', UPLOAD_PAGE_SIZE), MAX_PAGE_SIZE))
+        return JSONResponse(await run_in_threadpool(upload_set_page, set_id, total, offset, limit))
+    except Exception as e:
+        return error(str(e), 500)
+
+async def get_upload_set_sentence(request):
+    """获取句子集中指定ID的句子"""
+    set_id = request.path_params['set_id']
+    try:
+        sentence = None
+        if is_valid_set_id(set_id):
+            sentence = await run_in_threadpool(upload_store.get_sentence, set_id, request.path_params['sentence_id'])
+        if not sentence:
+            return error('句子不存在', 404)
+        return JSONResponse(sentence)
+    except Exception as e:
+        return error(str(e), 500)
+
+async def get_upload_set_random(request):
+    """从句子集中随机获取句子，支持排除最近出现的句子"""
+    set_id = request.path_params['set_id']
+    try:
+        total = await run_in_threadpool(upload_store.get_total, set_id) if is_valid_set_id(set_id) else None
+        if not total:
+            return error('句子集不存在或已过期，请重新上传', 404)
+        
+        exclude = set(parse_id_list(request.query_params.get('exclude', '')))
+        sentence = None
+        for _ in range(SentenceSampler.MAX_EXCLUDE_RETRIES):
+            sentence = await run_in_threadpool(upload_store.sentence_at, set_id, random.randrange(total))
+            if sentence and sentence['id'] not in exclude:
+                break
+        if not sentence:
+            return error('句子不存在', 404)
+        return JSONResponse(sentence)
+    except Exception as e:
+        return error(str(e), 500)
+
+class CompressionMiddleware:
+    """较大的JSON响应按Accept-Encoding压缩（分块发送的响应不压缩），规则与Flask版本一致"""
+    
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get('accept-encoding'))
+        start = None
+        
+        async def send_compressed(message):
+            nonlocal start
+            if message['type'] == 'http.response.start':
+                # 等到响应体到达后再决定是否压缩
+                start = message
+                return
+            if message['type'] != 'http.response.body' or start is None:
+                await send(message)
+                return
+            response_start, start = start, None
+            headers = MutableHeaders(raw=response_start['headers'])
+            content_type = headers.get('content-type', '')
+            if content_type.startswith('application/json'):
+                headers.add_vary_header('Accept-Encoding')
+            body = message.get('body', b'')
+            if (encoding and not message.get('more_body') and 'content-encoding' not in headers
+                    and should_compress(response_start['status'], content_type, len(body))):
+                body = compress(body, encoding)
+                headers['Content-Encoding'] = encoding
+                headers['Content-Length'] = str(len(body))
+                if 'etag' in headers:
+                    headers['ETag'] = encoded_etag(headers['etag'], encoding)
+                message = dict(message, body=body)
+            await send(response_start)
+            await send(message)
+        
+        await self.app(scope, receive, send_compressed)
+
+@asynccontextmanager
+async def lifespan(app):
+    """启动时创建解析进程池，退出时等待进行中的解析完成并关闭数据库连接"""
+    global parse_pool
+    # spawn方式启动子进程，不继承事件循环和线程池的状态
+    parse_pool = ProcessPoolExecutor(UPLOAD_PARSE_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    try:
+        yield
+    finally:
+        parse_pool.shutdown(wait=True)
+        await read_engine.dispose()
+        await write_engine.dispose()
+
+app = Starlette(
+    routes=[
+        Route('/api/sentence/random', get_random_sentence, methods=['GET']),
+        Route('/api/sentences/shuffled', get_shuffled_sentence, methods=['GET']),
+        Route('/api/sentences/batch', get_sentences_batch, methods=['GET']),
+        Route('/api/sentences/search', search_sentences, methods=['GET']),
+        Route('/api/sentences/list', get_sentences_list, methods=['GET']),
+        Route('/api/sentence/next', get_next_sentence, methods=['GET']),
+        Route('/api/sentence/{sentence_id:int}', get_sentence, methods=['GET']),
+        Route('/api/check', check_answer, methods=['POST']),
+        Route('/api/check/batch', check_answers_batch, methods=['POST']),
+        Route('/api/upload-excel', upload_excel, methods=['POST']),
+        Route('/api/upload-sets/{set_id}/sentences', get_upload_set_page, methods=['GET']),
+        Route('/api/upload-sets/{set_id}/sentence/{sentence_id:int}', get_upload_set_sentence, methods=['GET']),
+        Route('/api/upload-sets/{set_id}/random', get_upload_set_random, methods=['GET']),
+        Route('/api/sessions', create_practice_session, methods=['POST']),
+        Route('/api/sessions/{session_id}', get_practice_session, methods=['GET']),
+        Route('/api/sessions/{session_id}/next', next_practice_sentence, methods=['POST']),
+        Route('/api/sessions/{session_id}/prev', previous_practice_sentence, methods=['POST']),
+        Route('/api/sessions/{session_id}/answer', answer_practice_sentence, methods=['POST']),
+        Route('/api/sessions/{session_id}/history', get_practice_history, methods=['GET']),
+    ],
+    middleware=[
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*']),
+        Middleware(CompressionMiddleware)
+    ],
+    lifespan=lifespan
+)
@@ -0,0 +1,107 @@
+"""
+语料数据迁移：在百万行级别的数据库上，对比逐行读入ORM对象修改难度标记（原update_data.py的做法）
+与data_migrations.py基于集合的迁移（首次执行和重复执行）的耗时
+合成语料中有一部分句子没有难度或难度无效，且没有数据版本号（相当于早期的数据库）
+
+用法: python3 benchmarks/bench_data_migrations.py [--rows 1000000] [--invalid-rate 0.1] [--json results.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from synthetic import populate
+
+def build(path, rows, invalid_rate):
+    """创建并填充测试数据库，把约invalid_rate比例的句子改为没有难度或难度无效"""
+    from sqlalchemy import text
+    from database import create_db_engine
+    from migrations import mark_schema_current
+    from models import Base
+    
+    engine = create_db_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    mark_schema_current(engine)
+    populate(engine, rows)
+    modulus = max(1, round(1 / invalid_rate)) if invalid_rate > 0 else 0
+    if modulus:
+        with engine.begin() as conn:
+            conn.execute(text("UPDATE sentences SET difficulty = NULL WHERE id % :m = 0"), {'m': modulus})
+            conn.execute(text("UPDATE sentences SET difficulty = 'unknown' WHERE id % :m = 1"), {'m': modulus})
+    engine.dispose()
+
+def open_session(path):
+    """打开测试数据库的会话"""
+    from sqlalchemy.orm import sessionmaker
+    from database import create_db_engine
+    
+    engine = create_db_engine(f'sqlite:///{path}')
+    return engine, sessionmaker(bind=engine)()
+
+def legacy_relabel(db):
+    """原update_data.py的做法：把所有句子读成ORM对象，逐行修改难度标记（这里只修改无效的，与迁移步骤1结果相同）"""
+    from models import Sentence, VALID_DIFFICULTIES, DEFAULT_DIFFICULTY
+    
+    changed = 0
+    for sentence in db.query(Sentence).all():
+        if sentence.difficulty not in VALID_DIFFICULTIES:
+            sentence.difficulty = DEFAULT_DIFFICULTY
+            changed += 1
+    db.flush()
+    return changed
+
+def timed(path, action):
+    """在一个事务中执行action并提交，返回(结果, 秒数)"""
+    engine, db = open_session(path)
+    try:
+        started = time.perf_counter()
+        result = action(db)
+        db.commit()
+        return result, round(time.perf_counter() - started, 2)
+    finally:
+        db.close()
+        engine.dispose()
+
+def main():
+    from data_migrations import run_data_migrations
+    
+    parser = argparse.ArgumentParser(description='语料数据迁移基准')
+    parser.add_argument('--rows', type=int, default=1000000, help='合成语料行数')
+    parser.add_argument('--invalid-rate', type=float, default=0.1, help='没有难度或难度无效的句子比例')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    args = parser.parse_args()
+    
+    report = {'rows': args.rows, 'invalid_rate': args.invalid_rate}
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'source.db')
+        print(f"生成 {args.rows} 行合成语料...", flush=True)
+        build(source, args.rows, args.invalid_rate)
+        
+        legacy_path = os.path.join(tmp, 'legacy.db')
+        shutil.copy(source, legacy_path)
+        print("逐行修改...", flush=True)
+        changed, report['row_loop_seconds'] = timed(legacy_path, legacy_relabel)
+        report['row_loop_changed'] = changed
+        
+        print("数据迁移（首次执行）...", flush=True)
+        results, report['migrate_seconds'] = timed(source, run_data_migrations)
+        report['steps'] = [
+            {'version': version, 'description': description, 'changed': changed, 'seconds': round(elapsed, 3)}
+            for version, description, changed, elapsed in results
+        ]
+        print("数据迁移（重新执行全部步骤）...", flush=True)
+        _, report['redo_seconds'] = timed(source, lambda db: run_data_migrations(db, redo=True))
+    
+    print(f"\n逐行修改: {report['row_loop_changed']} 行，{report['row_loop_seconds']}s")
+    print(f"数据迁移首次执行: {report['migrate_seconds']}s（各步骤见上）")
+    print(f"数据迁移重新执行: {report['redo_seconds']}s")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"结果已写入 {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,91 @@
+"""
+全部接口的吞吐和延迟：按语料规模逐级生成合成语料（混合难度），启动服务器后用多个客户端进程依次对app.py的每个接口施压，
+统计吞吐、错误数和延迟百分位（每个接口先预热，冷启动耗时见 bench_startup.py）；结果写入JSON后可用 compare_results.py 与上一次结果比较
+
+用法: python3 benchmarks/bench_endpoints.py [--sizes 10000,100000,1000000] [--server gunicorn] [--endpoints all]
+                                            [--clients 8] [--duration 5] [--warmup 2] [--json results.json]
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from synthetic import populate
+from loadgen import ENDPOINTS, prepare_context, print_table, run_load, start_server, stop_server, wait_ready
+
+def build(path, rows):
+    """创建并填充测试数据库，建立全文索引"""
+    from database import create_db_engine
+    from migrations import mark_schema_current
+    from models import Base
+    from search_index import create_search_index, update_search_index
+    
+    engine = create_db_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    mark_schema_current(engine)
+    populate(engine, rows)
+    with engine.begin() as conn:
+        create_search_index(conn)
+        update_search_index(conn)
+    engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description='全部接口的吞吐和延迟基准')
+    parser.add_argument('--sizes', default='10000,100000', help='逐级测试的语料行数，逗号分隔（可到1000000）')
+    parser.add_argument('--server', choices=('dev', 'gunicorn', 'asgi'), default='gunicorn', help='测试的服务器')
+    parser.add_argument('--endpoints', default='all', help=f"接口，逗号分隔，可选: {','.join(ENDPOINTS)}")
+    parser.add_argument('--clients', type=int, default=8, help='并发客户端进程数')
+    parser.add_argument('--duration', type=float, default=5.0, help='每个接口的测试时长（秒）')
+    parser.add_argument('--warmup', type=float, default=2.0, help='每个接口正式测试前的预热时长（秒，结果不计入）')
+    parser.add_argument('--port', type=int, default=5092, help='测试服务器端口')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    args = parser.parse_args()
+    
+    endpoints = list(ENDPOINTS) if args.endpoints == 'all' else [
+        value.strip() for value in args.endpoints.split(',') if value.strip()
+    ]
+    unknown = [endpoint for endpoint in endpoints if endpoint not in ENDPOINTS]
+    if unknown:
+        parser.error(f"未知的接口: {','.join(unknown)}")
+    
+    report = {'server': args.server, 'clients': args.clients, 'duration': args.duration, 'levels': []}
+    for size in sorted(int(value) for value in args.sizes.split(',') if value.strip()):
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, 'bench.db')
+            print(f"生成 {size} 行合成语料...", flush=True)
+            started = time.perf_counter()
+            build(db_path, size)
+            level = {'rows': size, 'build_s': round(time.perf_counter() - started, 2), 'endpoints': {}}
+            env = dict(
+                os.environ,
+                DATABASE_URL=f'sqlite:///{db_path}',
+                DATABASE_READ_URL=f'sqlite:///{db_path}',
+                UPLOAD_CACHE_PATH=os.path.join(tmp, 'upload_cache.db'),
+                ACCESS_LOG=''
+            )
+            process = start_server(args.server, args.port, env)
+            try:
+                wait_ready(process, args.port, timeout=120)
+                context = prepare_context(args.port, size, endpoints)
+                for endpoint in endpoints:
+                    print(f"[{size}] {endpoint} ...", flush=True)
+                    # 预热：各worker首次请求时建立抽样索引、列表快照等，不计入结果
+                    if args.warmup > 0:
+                        run_load(args.port, endpoint, context, args.clients, args.warmup)
+                    level['endpoints'][endpoint] = run_load(args.port, endpoint, context, args.clients, args.duration)
+            finally:
+                stop_server(process)
+            report['levels'].append(level)
+    
+    for level in report['levels']:
+        print(f"\n语料 {level['rows']} 行（{args.server}，{args.clients} 个客户端）")
+        print_table(level['endpoints'])
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"结果已写入 {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,196 @@
+"""
+导入与上传：import_excel.py 导入Excel/CSV文件的吞吐（行/秒），以及 /api/upload-excel 解析大文件时的峰值内存
+每项测量在新的Python进程中进行（导入的峰值内存为进程的最大常驻内存，上传的峰值内存为上传期间采样到的最大常驻内存）；导入的目标数据库预先写入 --base-rows 条已有句子
+
+用法: python3 benchmarks/bench_import.py [--sizes 10000,100000] [--formats xlsx,csv] [--base-rows 100000]
+                                         [--upload-sizes 10000,50000] [--near-duplicates] [--json results.json]
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from synthetic import BACKEND_DIR, generate_sentences, populate
+
+# 生成文件时使用的随机种子，与已有句子（种子0）不同
+FILE_SEED = 1
+# 上传期间采样常驻内存的间隔（秒）
+RSS_SAMPLE_INTERVAL = 0.005
+
+def build(path, rows):
+    """创建并填充导入目标数据库"""
+    from database import create_db_engine
+    from migrations import mark_schema_current
+    from models import Base
+    from search_index import create_search_index, update_search_index
+    
+    engine = create_db_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    mark_schema_current(engine)
+    populate(engine, rows)
+    with engine.begin() as conn:
+        create_search_index(conn)
+        update_search_index(conn)
+    engine.dispose()
+
+def write_file(path, rows):
+    """生成rows行的导入文件（中文、英文、难度，无表头），格式由扩展名决定"""
+    sentences = ((s['chinese'], s['english'], s['difficulty']) for s in generate_sentences(rows, seed=FILE_SEED))
+    if path.endswith('.xlsx'):
+        from openpyxl import Workbook
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        for row in sentences:
+            sheet.append(row)
+        workbook.save(path)
+    else:
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            csv.writer(f).writerows(sentences)
+
+def peak_rss_mb():
+    """当前进程的最大常驻内存（MB，Linux下ru_maxrss单位为KB）"""
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+def child_import(path, near_duplicates):
+    """子进程：用import_excel导入文件"""
+    from import_excel import import_from_excel
+    
+    started = time.perf_counter()
+    assert import_from_excel(path, near_duplicates='skip' if near_duplicates else None)
+    seconds = time.perf_counter() - started
+    return {'seconds': round(seconds, 2), 'peak_rss_mb': peak_rss_mb()}
+
+def current_rss_mb():
+    """当前进程的常驻内存（MB，读取/proc/self/statm）"""
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+def child_upload(path):
+    """子进程：通过测试客户端上传文件，上传期间每隔几毫秒采样常驻内存，记录相对上传前的最大增量"""
+    from database import init_db
+    init_db()
+    from app import app
+    
+    client = app.test_client()
+    # 先发出一个请求，排除应用首次处理请求的内存
+    client.get('/api/cache/stats')
+    baseline = current_rss_mb()
+    samples = [baseline]
+    done = threading.Event()
+    
+    def sample():
+        while not done.wait(RSS_SAMPLE_INTERVAL):
+            samples.append(current_rss_mb())
+    
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    started = time.perf_counter()
+    with open(path, 'rb') as f:
+        response = client.post('/api/upload-excel', data={'file': (f, os.path.basename(path))})
+    seconds = time.perf_counter() - started
+    done.set()
+    sampler.join()
+    samples.append(current_rss_mb())
+    assert response.status_code == 200, response.get_json()
+    return {
+        'seconds': round(seconds, 2),
+        'total': response.get_json()['total'],
+        'baseline_rss_mb': round(baseline, 1),
+        'peak_rss_mb': round(max(samples), 1),
+        'upload_rss_mb': round(max(samples) - baseline, 1)
+    }
+
+def run_child(args, env):
+    """在新进程中执行一次测量，返回子进程输出的最后一行JSON"""
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child'] + args,
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description='导入吞吐与上传峰值内存基准')
+    parser.add_argument('--sizes', default='10000,100000', help='导入文件的行数，逗号分隔（可到1000000）')
+    parser.add_argument('--formats', default='xlsx,csv', help='导入文件格式，逗号分隔')
+    parser.add_argument('--base-rows', type=int, default=100000, help='导入目标数据库中已有的句子数')
+    parser.add_argument('--near-duplicates', action='store_true', help='导入时检查近似重复（--near-duplicates skip）')
+    parser.add_argument('--upload-sizes', default='10000,50000', help='上传文件的行数，逗号分隔（不超过上传行数上限）')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    parser.add_argument('--child', nargs='+', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        kind, path = args.child[0], args.child[1]
+        result = child_import(path, args.near_duplicates) if kind == 'import' else child_upload(path)
+        print(json.dumps(result))
+        return
+    
+    formats = [value.strip() for value in args.formats.split(',') if value.strip()]
+    report = {'base_rows': args.base_rows, 'near_duplicates': args.near_duplicates, 'import': [], 'upload': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        base_path = os.path.join(tmp, 'base.db')
+        print(f"生成 {args.base_rows} 行已有句子...", flush=True)
+        build(base_path, args.base_rows)
+        
+        for size in sorted(int(value) for value in args.sizes.split(',') if value.strip()):
+            for file_format in formats:
+                file_path = os.path.join(tmp, f'import_{size}.{file_format}')
+                print(f"生成 {size} 行 {file_format} 文件...", flush=True)
+                write_file(file_path, size)
+                db_path = os.path.join(tmp, 'import.db')
+                shutil.copy(base_path, db_path)
+                env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', UPLOAD_CACHE_PATH=os.path.join(tmp, 'upload.db'))
+                env.pop('DATABASE_READ_URL', None)
+                print(f"导入 {size} 行 {file_format} 文件...", flush=True)
+                child_args = ['import', file_path] + (['--near-duplicates'] if args.near_duplicates else [])
+                result = run_child(child_args, env)
+                result.update({
+                    'rows': size, 'format': file_format,
+                    'file_mb': round(os.path.getsize(file_path) / 1024 / 1024, 1),
+                    'rows_per_s': round(size / result['seconds']) if result['seconds'] else 0
+                })
+                report['import'].append(result)
+                os.remove(file_path)
+                os.remove(db_path)
+        
+        for size in sorted(int(value) for value in args.upload_sizes.split(',') if value.strip()):
+            file_path = os.path.join(tmp, f'upload_{size}.xlsx')
+            print(f"上传 {size} 行xlsx文件...", flush=True)
+            write_file(file_path, size)
+            # 每次使用新的句子集缓存，保证文件被完整解析
+            env = dict(
+                os.environ, DATABASE_URL=f'sqlite:///{base_path}',
+                UPLOAD_CACHE_PATH=os.path.join(tmp, f'upload_{size}.db')
+            )
+            env.pop('DATABASE_READ_URL', None)
+            result = run_child(['upload', file_path], env)
+            result.update({'rows': size, 'file_mb': round(os.path.getsize(file_path) / 1024 / 1024, 1)})
+            report['upload'].append(result)
+    
+    print(f"\n{'导入':<16}{'文件(MB)':>10}{'耗时(s)':>10}{'行/秒':>10}{'峰值内存(MB)':>14}")
+    for result in report['import']:
+        print(
+            f"{str(result['rows']) + ' ' + result['format']:<16}{result['file_mb']:>10}{result['seconds']:>10}"
+            f"{result['rows_per_s']:>10}{result['peak_rss_mb']:>14}"
+        )
+    print(f"\n{'上传':<16}{'文件(MB)':>10}{'耗时(s)':>10}{'上传前内存(MB)':>16}{'峰值内存(MB)':>14}{'增加(MB)':>10}")
+    for result in report['upload']:
+        print(
+            f"{str(result['rows']) + ' xlsx':<16}{result['file_mb']:>10}{result['seconds']:>10}"
+            f"{result['baseline_rss_mb']:>16}{result['peak_rss_mb']:>14}{result['upload_rss_mb']:>10}"
+        )
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"结果已写入 {args.json}")
+
+if __name__ == '__main__':
+    main()
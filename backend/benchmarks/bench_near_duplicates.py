@@ -0,0 +1,183 @@
+"""
+近似重复检测：语料规模增长时，整表检查（near_duplicates.py）与导入时逐批匹配的耗时、召回率和误报数
+合成语料使用较大的随机词表（与真实英文句子一样，无关句子之间的相似度很低），并混入已知的近似重复句子
+
+用法: python3 benchmarks/bench_near_duplicates.py [--sizes 10000,100000,300000] [--duplicate-rate 0.02] [--json results.json]
+"""
+import argparse
+import importlib
+import json
+import random
+import string
+import sys
+import time
+
+# 有意只导入不使用：synthetic在导入时把backend加入模块搜索路径，之后才能导入near_duplicates
+importlib.import_module('synthetic')
+
+from near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex, find_clusters, sketch
+
+VOCABULARY_SIZE = 5000
+# 模拟导入时每块的行数（与import_excel.READ_CHUNK_SIZE一致）
+IMPORT_CHUNK_SIZE = 20000
+
+def make_vocabulary(rng):
+    """随机生成的单词表"""
+    return [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 10))) for _ in range(VOCABULARY_SIZE)]
+
+def perturb(sentence, vocabulary, rng):
+    """生成一个近似重复：改变大小写和标点、替换一个词，或拼错一个字母"""
+    words = sentence.rstrip('.').split()
+    kind = rng.randrange(3)
+    if kind == 0:
+        return sentence.upper().rstrip('.') + '!'
+    index = rng.randrange(len(words))
+    if kind == 1:
+        words[index] = rng.choice(vocabulary)
+    else:
+        word = words[index]
+        position = rng.randrange(len(word))
+        words[index] = word[:position] + rng.choice(string.ascii_lowercase) + word[position + 1:]
+    return ' '.join(words) + '.'
+
+def generate(count, duplicate_rate, seed):
+    """
+    生成count条英文句子，其中约duplicate_rate比例是前面某个句子的近似重复
+    
+    Returns:
+        (句子列表, {近似重复的位置: 原句位置})
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    sentences = []
+    sources = {}
+    for index in range(count):
+        if sentences and rng.random() < duplicate_rate:
+            source = rng.randrange(len(sentences))
+            sources[index] = source
+            sentences.append(perturb(sentences[source], vocabulary, rng))
+        else:
+            words = rng.choices(vocabulary, k=rng.randint(8, 20))
+            sentences.append(' '.join(words).capitalize() + '.')
+    return sentences, sources
+
+def root(source, sources):
+    """近似重复链条最初的原句"""
+    while source in sources:
+        source = sources[source]
+    return source
+
+def audit(sentences, sources, threshold):
+    """整表检查：统计召回的近似重复和误报（与原句不在同一簇，或被并入簇的非重复句子）"""
+    started = time.perf_counter()
+    clusters = find_clusters(sentences, threshold)
+    elapsed = time.perf_counter() - started
+    cluster_of = {member: number for number, members in enumerate(clusters) for member in members}
+    found = sum(
+        1 for index, source in sources.items()
+        if index in cluster_of and cluster_of[index] == cluster_of.get(root(source, sources))
+    )
+    injected_roots = {root(source, sources) for source in sources.values()}
+    false_positives = sum(
+        1 for member in cluster_of if member not in sources and member not in injected_roots
+    )
+    return {
+        'seconds': round(elapsed, 2),
+        'clusters': len(clusters),
+        'recall': round(found / len(sources), 4) if sources else 1.0,
+        'false_positives': false_positives
+    }
+
+def chain_check(threshold, length=8, seed=0):
+    """
+    链式近似重复的回归检查：每个句子与前一个只差一个词，首尾两句已经不相似
+    每个簇中的成员与保留的句子（簇中第一个）的相似度都应不低于阈值，否则合并时会误删不相似的句子
+    
+    Returns:
+        {'clusters': 簇数, 'min_keep_similarity': 成员与保留句子的最低相似度, 'passed': 是否通过}
+    """
+    rng = random.Random(seed)
+    vocabulary = make_vocabulary(rng)
+    words = rng.choices(vocabulary, k=14)
+    chain = []
+    for index in range(length):
+        chain.append(' '.join(words).capitalize() + '.')
+        words = list(words)
+        words[index % len(words)] = rng.choice(vocabulary)
+    clusters = find_clusters(chain, threshold)
+    signatures, _ = sketch(chain)
+    similarities = [
+        float((signatures[member] == signatures[members[0]]).mean())
+        for members in clusters for member in members[1:]
+    ]
+    lowest = round(min(similarities), 3) if similarities else None
+    return {
+        'clusters': len(clusters),
+        'min_keep_similarity': lowest,
+        'passed': lowest is None or lowest >= threshold
+    }
+
+def incremental(sentences, sources, threshold):
+    """导入时：前90%作为已有句子建立索引，其余按块匹配"""
+    split = int(len(sentences) * 0.9)
+    index = NearDuplicateIndex(threshold)
+    started = time.perf_counter()
+    index.add(range(split), sentences[:split])
+    built = time.perf_counter() - started
+    started = time.perf_counter()
+    matches = []
+    for start in range(split, len(sentences), IMPORT_CHUNK_SIZE):
+        end = min(start + IMPORT_CHUNK_SIZE, len(sentences))
+        matches.extend(index.match_and_add(range(start, end), sentences[start:end]))
+    matched = time.perf_counter() - started
+    expected = [position for position in range(split, len(sentences)) if position in sources]
+    found = sum(1 for position in expected if matches[position - split] is not None)
+    false_positives = sum(
+        1 for offset, match in enumerate(matches) if match is not None and split + offset not in sources
+    )
+    return {
+        'index_seconds': round(built, 2),
+        'match_seconds': round(matched, 2),
+        'recall': round(found / len(expected), 4) if expected else 1.0,
+        'false_positives': false_positives
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='近似重复检测基准')
+    parser.add_argument('--sizes', default='10000,100000,300000', help='语料行数，逗号分隔')
+    parser.add_argument('--duplicate-rate', type=float, default=0.02, help='混入的近似重复比例')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help='最小相似度')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    args = parser.parse_args()
+    
+    report = {'threshold': args.threshold, 'duplicate_rate': args.duplicate_rate, 'levels': []}
+    report['chain'] = chain_check(args.threshold)
+    chain = report['chain']
+    print(f"链式近似重复检查: {chain['clusters']} 个簇，成员与保留句子的最低相似度 {chain['min_keep_similarity']}，"
+          f"{'通过' if chain['passed'] else '失败'}")
+    for size in sorted(int(value) for value in args.sizes.split(',') if value.strip()):
+        print(f"生成 {size} 条句子...", flush=True)
+        sentences, sources = generate(size, args.duplicate_rate, seed=size)
+        result = {'rows': size, 'injected': len(sources)}
+        result['audit'] = audit(sentences, sources, args.threshold)
+        result['import'] = incremental(sentences, sources, args.threshold)
+        report['levels'].append(result)
+    
+    print(f"\n{'行数':>8}{'混入重复':>10}{'整表检查(s)':>14}{'召回率':>10}{'误报':>8}{'导入建索引(s)':>16}{'导入匹配(s)':>14}{'召回率':>10}{'误报':>8}")
+    for result in report['levels']:
+        audit_result, import_result = result['audit'], result['import']
+        print(
+            f"{result['rows']:>8}{result['injected']:>10}{audit_result['seconds']:>14}{audit_result['recall']:>10}"
+            f"{audit_result['false_positives']:>8}{import_result['index_seconds']:>16}{import_result['match_seconds']:>14}"
+            f"{import_result['recall']:>10}{import_result['false_positives']:>8}"
+        )
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"结果已写入 {args.json}")
+    if not report['chain']['passed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
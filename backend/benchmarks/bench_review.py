@@ -0,0 +1,120 @@
+"""
+间隔重复取下一题的延迟：学习者数量（复习记录总数）增长时，对比有无 (learner_id, due_at) 索引
+
+用法: python3 benchmarks/bench_review.py [--rows 50000] [--learners 100,1000,10000] [--reviews 200] [--json results.json]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from synthetic import populate, percentile
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from database import create_db_engine
+from models import Base, ReviewState
+from sampler import SentenceSampler
+from scheduler import pick_next
+
+# 每批写入的复习记录数
+INSERT_BATCH_SIZE = 20000
+
+def add_reviews(engine, first_learner, learners, reviews, rows, now, seed):
+    """为学习者 [first_learner, first_learner + learners) 各写入reviews条复习记录，到期时间分布在前后30天"""
+    rng = random.Random(seed)
+    table = ReviewState.__table__
+    batch = []
+    with engine.begin() as conn:
+        for learner in range(first_learner, first_learner + learners):
+            for sentence_id in rng.sample(range(1, rows + 1), reviews):
+                batch.append({
+                    'learner_id': f'learner-{learner}',
+                    'sentence_id': sentence_id,
+                    'due_at': now + timedelta(minutes=rng.randint(-30 * 1440, 30 * 1440)),
+                    'ease': 2.5,
+                    'interval_days': 1,
+                    'repetitions': 1,
+                    'lapses': 0
+                })
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    conn.execute(table.insert(), batch)
+                    batch = []
+        if batch:
+            conn.execute(table.insert(), batch)
+
+def measure(engine, sampler, learners, difficulties, repeat, now, seed):
+    """随机选择学习者取下一题repeat次，返回延迟摘要（毫秒）"""
+    rng = random.Random(seed)
+    samples = []
+    with Session(engine) as db:
+        for _ in range(repeat):
+            learner_id = f'learner-{rng.randrange(learners)}'
+            started = time.perf_counter()
+            pick_next(db, sampler, learner_id, difficulties, now)
+            samples.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p99_ms': round(percentile(samples, 99), 3)
+    }
+
+def set_index(engine, enabled):
+    """创建或删除 (learner_id, due_at) 索引"""
+    index = next(iter(ReviewState.__table__.indexes))
+    with engine.begin() as conn:
+        if enabled:
+            index.create(conn, checkfirst=True)
+        else:
+            index.drop(conn, checkfirst=True)
+        conn.execute(text('ANALYZE'))
+
+def main():
+    parser = argparse.ArgumentParser(description='间隔重复取下一题延迟基准')
+    parser.add_argument('--rows', type=int, default=50000, help='合成语料行数')
+    parser.add_argument('--learners', default='100,1000,10000', help='逐级增加的学习者数量，逗号分隔')
+    parser.add_argument('--reviews', type=int, default=200, help='每个学习者的复习记录数')
+    parser.add_argument('--repeat', type=int, default=300, help='每项测试取下一题的次数')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    args = parser.parse_args()
+    
+    levels = sorted(int(value) for value in args.learners.split(',') if value.strip())
+    now = datetime.now()
+    report = {'rows': args.rows, 'reviews_per_learner': args.reviews, 'levels': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        print(f"生成 {args.rows} 行合成语料...")
+        populate(engine, args.rows)
+        sampler = SentenceSampler(lambda: Session(engine))
+        sampler.sync(0)
+        
+        learners = 0
+        for level in levels:
+            print(f"写入复习记录: {level} 个学习者...")
+            set_index(engine, True)
+            add_reviews(engine, learners, level - learners, args.reviews, args.rows, now, seed=level)
+            learners = level
+            result = {'learners': level, 'review_rows': level * args.reviews}
+            for indexed in (True, False):
+                set_index(engine, indexed)
+                name = 'indexed' if indexed else 'no_index'
+                result[name] = measure(engine, sampler, level, [], args.repeat, now, seed=1)
+                result[name + '_difficulty'] = measure(engine, sampler, level, ['cet4'], args.repeat, now, seed=2)
+            report['levels'].append(result)
+        engine.dispose()
+    
+    print(f"\n{'学习者':>8}{'复习记录':>12}{'有索引 p50/p99':>20}{'按难度 p50/p99':>20}{'无索引 p50/p99':>20}")
+    for result in report['levels']:
+        cells = [f"{result[n]['p50_ms']}/{result[n]['p99_ms']}" for n in ('indexed', 'indexed_difficulty', 'no_index')]
+        print(f"{result['learners']:>8}{result['review_rows']:>12}{cells[0]:>20}{cells[1]:>20}{cells[2]:>20}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"结果已写入 {args.json}")
+
+if __name__ == '__main__':
+    main()
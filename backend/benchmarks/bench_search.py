@@ -0,0 +1,134 @@
+"""
+全文检索延迟：语料规模增长时，FTS5检索（英文词、英文前缀、中文二元切分、按难度筛选）与LIKE全表扫描对比
+先做回归检查：合并近似重复（删除ID最大的句子）后再导入的句子能被检索到，不通过时退出码为1
+
+用法: python3 benchmarks/bench_search.py [--sizes 10000,100000,300000] [--repeat 100] [--json results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from synthetic import populate, percentile, ENGLISH_WORDS, CHINESE_CHARS
+
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from database import create_db_engine
+from models import Base, Sentence
+from near_duplicates import merge_cluster
+from search_index import remove_from_search_index, search_statement, update_search_index
+
+# 每类检索的查询生成函数
+QUERIES = {
+    'english_word': lambda rng: rng.choice(ENGLISH_WORDS[20:]),
+    'english_two_words': lambda rng: ' '.join(rng.sample(ENGLISH_WORDS[20:], 2)),
+    'english_prefix': lambda rng: rng.choice(ENGLISH_WORDS[20:])[:4],
+    'chinese_bigram': lambda rng: ''.join(rng.sample(CHINESE_CHARS, 2)),
+    'chinese_char': lambda rng: rng.choice(CHINESE_CHARS),
+    # 没有命中的词：LIKE需要扫描整张表
+    'no_match': lambda rng: f'zzz{rng.randrange(1000)}',
+}
+
+def timed_search(engine, dialect, make_query, repeat, seed, difficulties=None):
+    """执行repeat次检索（取第一页20条），返回延迟摘要（毫秒）"""
+    rng = random.Random(seed)
+    samples = []
+    with Session(engine) as db:
+        for _ in range(repeat):
+            statement = search_statement(make_query(rng), difficulties, 21, 0, dialect)
+            started = time.perf_counter()
+            db.execute(statement).all()
+            samples.append((time.perf_counter() - started) * 1000)
+    return {
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p99_ms': round(percentile(samples, 99), 3)
+    }
+
+def reuse_check(directory):
+    """
+    合并后再导入的回归检查：合并近似重复删除了ID最大的句子，之后导入的句子不能重用该ID，且要能被检索到
+    
+    Returns:
+        {'deleted_id': 合并删除的ID, 'new_id': 新导入句子的ID, 'found': 能否检索到新句子, 'passed': 是否通过}
+    """
+    engine = create_db_engine(f"sqlite:///{os.path.join(directory, 'reuse.db')}")
+    Base.metadata.create_all(engine)
+    populate(engine, 100)
+    with Session(engine) as db:
+        last = db.execute(select(Sentence).order_by(Sentence.id.desc()).limit(1)).scalar_one()
+        db.add(Sentence(chinese=last.chinese + '！', english=last.english.upper(), difficulty=last.difficulty))
+        update_search_index(db)
+        db.commit()
+        deleted = merge_cluster(db, [last.id, last.id + 1])
+        remove_from_search_index(db, deleted)
+        db.commit()
+        # 与import_excel相同：批量写入后增量更新全文索引
+        db.execute(insert(Sentence.__table__), [
+            {'chinese': '斑马线', 'english': 'Quokkas wait at the zebra crossing.', 'difficulty': 'cet4'}
+        ])
+        update_search_index(db)
+        db.commit()
+        new_id = db.execute(select(Sentence.id).where(Sentence.chinese == '斑马线')).scalar_one()
+        found = new_id in {row.id for row in db.execute(search_statement('quokkas', None, 20, 0, 'sqlite'))}
+    engine.dispose()
+    return {
+        'deleted_id': deleted[0],
+        'new_id': new_id,
+        'found': found,
+        'passed': found and new_id not in deleted
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description='全文检索延迟基准')
+    parser.add_argument('--sizes', default='10000,100000,300000', help='逐级增加的语料行数，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=100, help='每类检索的执行次数')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    args = parser.parse_args()
+    
+    sizes = sorted(int(value) for value in args.sizes.split(',') if value.strip())
+    report = {'levels': []}
+    with tempfile.TemporaryDirectory() as tmp:
+        report['reuse'] = reuse_check(tmp)
+        reuse = report['reuse']
+        print(f"合并后导入检查: 删除 #{reuse['deleted_id']}，新句子 #{reuse['new_id']}，"
+              f"{'可以' if reuse['found'] else '不能'}检索到，{'通过' if reuse['passed'] else '失败'}")
+        engine = create_db_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        rows = 0
+        for size in sizes:
+            print(f"生成合成语料到 {size} 行并更新全文索引...")
+            populate(engine, size - rows, seed=size)
+            rows = size
+            started = time.perf_counter()
+            with engine.begin() as conn:
+                update_search_index(conn)
+            result = {'rows': size, 'index_update_s': round(time.perf_counter() - started, 2)}
+            for name, make_query in QUERIES.items():
+                result[name] = timed_search(engine, 'sqlite', make_query, args.repeat, seed=1)
+            result['english_word_cet4'] = timed_search(
+                engine, 'sqlite', QUERIES['english_word'], args.repeat, seed=1, difficulties=['cet4']
+            )
+            # 同样的检索用LIKE扫描（非SQLite数据库的退化路径），命中多时找够一页即停止，没有命中时扫描全表
+            result['like_word'] = timed_search(engine, 'postgresql', QUERIES['english_word'], args.repeat, seed=1)
+            result['like_no_match'] = timed_search(engine, 'postgresql', QUERIES['no_match'], args.repeat, seed=1)
+            report['levels'].append(result)
+        engine.dispose()
+    
+    metrics = list(QUERIES) + ['english_word_cet4', 'like_word', 'like_no_match']
+    print(f"\n{'检索 p50/p99 (ms)':<22}" + ''.join(f"{result['rows']:>18}" for result in report['levels']))
+    for metric in metrics:
+        cells = ''.join(f"{result[metric]['p50_ms']}/{result[metric]['p99_ms']}".rjust(18) for result in report['levels'])
+        print(f"{metric:<22}{cells}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"结果已写入 {args.json}")
+    if not report['reuse']['passed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+服务吞吐对比：Werkzeug开发服务器（app.run(debug=True)）、gunicorn 多进程多线程部署、异步（ASGI）版本
+对 /api/sentence/random 和 /api/check 分别施加并发负载，统计吞吐和延迟
+
+用法: python3 benchmarks/bench_serving.py [--rows 50000] [--clients 16] [--duration 10] [--servers dev,gunicorn,asgi]
+"""
+import argparse
+import json
+import os
+import tempfile
+
+from synthetic import populate
+from loadgen import start_server, wait_ready, stop_server, run_load
+
+def build(path, rows):
+    """创建并填充测试数据库"""
+    from database import create_db_engine
+    from migrations import mark_schema_current
+    from models import Base
+    
+    engine = create_db_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    mark_schema_current(engine)
+    populate(engine, rows)
+    engine.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description='开发服务器、gunicorn与ASGI版本吞吐对比')
+    parser.add_argument('--rows', type=int, default=50000, help='合成语料行数')
+    parser.add_argument('--clients', type=int, default=16, help='并发客户端进程数')
+    parser.add_argument('--duration', type=float, default=10.0, help='每项测试时长（秒）')
+    parser.add_argument('--port', type=int, default=5091, help='测试服务器端口')
+    parser.add_argument('--servers', default='dev,gunicorn,asgi', help='参与对比的服务器，逗号分隔')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    args = parser.parse_args()
+    
+    servers = [kind.strip() for kind in args.servers.split(',') if kind.strip()]
+    report = {'rows': args.rows, 'clients': args.clients, 'duration': args.duration}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        print(f"生成 {args.rows} 行合成语料...")
+        build(db_path, args.rows)
+        env = dict(
+            os.environ,
+            DATABASE_URL=f'sqlite:///{db_path}',
+            DATABASE_READ_URL=f'sqlite:///{db_path}',
+            UPLOAD_CACHE_PATH=os.path.join(tmp, 'upload_cache.db'),
+            ACCESS_LOG=''
+        )
+        
+        for kind in servers:
+            process = start_server(kind, args.port, env)
+            try:
+                wait_ready(process, args.port)
+                report[kind] = {}
+                for endpoint in ('random', 'check'):
+                    print(f"[{kind}] {endpoint} ...")
+                    report[kind][endpoint] = run_load(args.port, endpoint, {'rows': args.rows}, args.clients, args.duration)
+            finally:
+                stop_server(process)
+    
+    print(f"\n{'服务器/接口':<20}{'请求/秒':>12}{'p50 (ms)':>12}{'p99 (ms)':>12}{'错误':>8}")
+    for kind in servers:
+        for endpoint in ('random', 'check'):
+            result = report[kind][endpoint]
+            print(f"{kind + ' ' + endpoint:<20}{result['rps']:>12}{result['p50_ms']:>12}{result['p99_ms']:>12}{result['errors']:>8}")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"结果已写入 {args.json}")
+
+if __name__ == '__main__':
+    main()
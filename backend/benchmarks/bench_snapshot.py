@@ -0,0 +1,167 @@
+"""
+语料只读快照与数据库的读取对比：生成快照的耗时和文件大小、抽样索引构建、按ID取句子和按难度列表分页的耗时
+
+先做回归检查：有句子没有难度（NULL）时，抽样索引和列表分页仍能正常工作，不通过时退出码为1
+
+用法: python3 benchmarks/bench_snapshot.py [--rows 200000] [--lookups 20000] [--pages 2000] [--json results.json]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+from synthetic import DIFFICULTIES, populate
+
+def build(path, rows):
+    """创建并填充测试数据库"""
+    from database import create_db_engine
+    from migrations import mark_schema_current
+    from models import Base
+    
+    engine = create_db_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    mark_schema_current(engine)
+    populate(engine, rows)
+    return engine
+
+def null_difficulty_check(directory):
+    """
+    难度为NULL的句子：抽样索引把它们分为单独一组（None），随机抽样、全部难度的列表分页都要包含这一组
+    分别用数据库和语料只读快照构建抽样索引、读取列表
+    
+    Returns:
+        {'difficulties': 抽样索引中的难度, 'listed': 两种方式的列表分页返回的句子数, 'passed': 是否通过}
+    """
+    from sqlalchemy import insert
+    from sqlalchemy.orm import sessionmaker
+    from cache import SentenceCache
+    from corpus_snapshot import CorpusSnapshot, write_snapshot
+    from models import Sentence
+    from sampler import SentenceSampler
+    
+    engine = build(os.path.join(directory, 'null.db'), 20)
+    with engine.begin() as conn:
+        conn.execute(insert(Sentence.__table__), [
+            {'chinese': '没有难度的句子', 'english': 'This sentence has no difficulty.', 'difficulty': None}
+        ])
+    snapshot_path = os.path.join(directory, 'null.snapshot')
+    with engine.connect() as conn:
+        write_snapshot(conn, snapshot_path)
+    snapshot = CorpusSnapshot(snapshot_path)
+    Session = sessionmaker(bind=engine)
+    
+    db_sampler = SentenceSampler(Session)
+    db_sampler.sync(1)
+    snapshot_sampler = SentenceSampler(Session)
+    snapshot_sampler.load_groups(1, snapshot.difficulty_groups())
+    samplers = (db_sampler, snapshot_sampler)
+    difficulties = [sampler.difficulties() for sampler in samplers]
+    picked = {sampler.pick(seed=seed) for sampler in samplers for seed in range(200)}
+    listed = [
+        len(SentenceCache(Session).get_page(difficulties[0], None, 100)),
+        len(snapshot.page(difficulties[1], None, 100))
+    ]
+    engine.dispose()
+    return {
+        'difficulties': difficulties[0],
+        'listed': listed,
+        'passed': all(names[-1] is None for names in difficulties) and listed == [21, 21] and None not in picked
+    }
+
+def timed(func, runs):
+    """执行runs次，返回每次的平均耗时（微秒）"""
+    started = time.perf_counter()
+    for _ in range(runs):
+        func()
+    return round((time.perf_counter() - started) / runs * 1e6, 2)
+
+def main():
+    parser = argparse.ArgumentParser(description='语料只读快照基准')
+    parser.add_argument('--rows', type=int, default=200000, help='合成语料行数')
+    parser.add_argument('--lookups', type=int, default=20000, help='按ID取句子的次数')
+    parser.add_argument('--pages', type=int, default=2000, help='列表分页的次数')
+    parser.add_argument('--page-size', type=int, default=50, help='每页句子数')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    args = parser.parse_args()
+    
+    from sqlalchemy import select
+    from sqlalchemy.orm import sessionmaker
+    from corpus_snapshot import CorpusSnapshot, write_snapshot
+    from models import Sentence
+    from sampler import SentenceSampler
+    
+    report = {'rows': args.rows, 'page_size': args.page_size}
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        report['null_difficulty'] = null_difficulty_check(tmp)
+        check = report['null_difficulty']
+        print(f"无难度句子检查: 难度 {check['difficulties']}，列表返回 {check['listed']} 条，"
+              f"{'通过' if check['passed'] else '失败'}")
+        print(f"生成 {args.rows} 行合成语料...")
+        engine = build(os.path.join(tmp, 'bench.db'), args.rows)
+        Session = sessionmaker(bind=engine)
+        snapshot_path = os.path.join(tmp, 'corpus.snapshot')
+        
+        started = time.perf_counter()
+        with engine.connect() as conn:
+            write_snapshot(conn, snapshot_path)
+        report['build_s'] = round(time.perf_counter() - started, 3)
+        report['snapshot_mb'] = round(os.path.getsize(snapshot_path) / 1024 / 1024, 2)
+        
+        started = time.perf_counter()
+        snapshot = CorpusSnapshot(snapshot_path)
+        report['open_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        
+        # 抽样索引：从数据库读取 (difficulty, id) 构建，或直接使用快照中的ID数组
+        sampler = SentenceSampler(Session)
+        started = time.perf_counter()
+        sampler.sync(1)
+        report['sampler_db_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        sampler = SentenceSampler(Session)
+        started = time.perf_counter()
+        sampler.load_groups(1, snapshot.difficulty_groups())
+        report['sampler_snapshot_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        
+        ids = [rng.choice(snapshot.ids) for _ in range(args.lookups)]
+        db = Session()
+        try:
+            lookups = iter(ids * 2)
+            report['get_db_us'] = timed(lambda: db.get(Sentence, next(lookups)).to_dict(), args.lookups)
+            db.expunge_all()
+            report['get_snapshot_us'] = timed(lambda: snapshot.get(next(lookups)), args.lookups)
+            
+            def page_db():
+                after_id = rng.randrange(args.rows)
+                query = (
+                    select(Sentence).where(Sentence.difficulty == rng.choice(DIFFICULTIES), Sentence.id > after_id)
+                    .order_by(Sentence.id).limit(args.page_size)
+                )
+                [sentence.to_dict() for sentence in db.execute(query).scalars()]
+                db.expunge_all()
+            
+            def page_snapshot():
+                snapshot.page([rng.choice(DIFFICULTIES)], rng.randrange(args.rows), args.page_size)
+            
+            report['page_db_us'] = timed(page_db, args.pages)
+            report['page_snapshot_us'] = timed(page_snapshot, args.pages)
+        finally:
+            db.close()
+        engine.dispose()
+    
+    print(f"\n快照: 生成 {report['build_s']} s | {report['snapshot_mb']} MB | 打开 {report['open_ms']} ms")
+    print(f"抽样索引: 数据库 {report['sampler_db_ms']} ms | 快照 {report['sampler_snapshot_ms']} ms")
+    print(f"按ID取句子: 数据库 {report['get_db_us']} µs | 快照 {report['get_snapshot_us']} µs")
+    print(f"列表分页（{args.page_size}条）: 数据库 {report['page_db_us']} µs | 快照 {report['page_snapshot_us']} µs")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"结果已写入 {args.json}")
+    if not report['null_difficulty']['passed']:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
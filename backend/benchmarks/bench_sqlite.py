@@ -0,0 +1,165 @@
+"""
+SQLite调优基准：对比默认配置（无索引、回滚日志）与当前配置（索引、WAL等参数）
+
+用法: python3 benchmarks/bench_sqlite.py [--rows 200000] [--json results.json]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from synthetic import generate_sentences, populate, percentile, DIFFICULTIES
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, create_engine, text
+from database import create_sqlite_engine
+from models import Base
+
+# 未调优时的表结构（与最初的模型一致）
+baseline_metadata = MetaData()
+baseline_table = Table(
+    'sentences', baseline_metadata,
+    Column('id', Integer, primary_key=True),
+    Column('chinese', String(500), nullable=False),
+    Column('english', String(500), nullable=False),
+    Column('difficulty', String(20)),
+    Column('created_at', DateTime),
+)
+
+def build(path, rows, tuned):
+    """创建并填充测试数据库，返回引擎"""
+    if tuned:
+        engine = create_sqlite_engine(f'sqlite:///{path}')
+        Base.metadata.create_all(engine)
+        populate(engine, rows)
+    else:
+        engine = create_engine(f'sqlite:///{path}', connect_args={'check_same_thread': False})
+        baseline_metadata.create_all(engine)
+        populate(engine, rows, table=baseline_table)
+    return engine
+
+def timed(func, repeat):
+    """执行repeat次，返回每次耗时（毫秒）"""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return samples
+
+def summarize(samples):
+    return {
+        'p50_ms': round(percentile(samples, 50), 3),
+        'p99_ms': round(percentile(samples, 99), 3),
+        'mean_ms': round(sum(samples) / len(samples), 3)
+    }
+
+def run_queries(engine, rows, repeat):
+    """读接口相关的典型查询"""
+    rng = random.Random(1)
+    samples = list(generate_sentences(rows))[::max(1, rows // 1000)]
+    results = {}
+    with engine.connect() as conn:
+        results['count_by_difficulty'] = summarize(timed(
+            lambda: conn.execute(
+                text('SELECT COUNT(*) FROM sentences WHERE difficulty = :d'),
+                {'d': rng.choice(DIFFICULTIES)}
+            ).scalar(),
+            repeat
+        ))
+        results['page_by_difficulty'] = summarize(timed(
+            lambda: conn.execute(
+                text('SELECT * FROM sentences WHERE difficulty = :d AND id > :after ORDER BY id LIMIT 500'),
+                {'d': rng.choice(DIFFICULTIES), 'after': rng.randrange(rows)}
+            ).all(),
+            repeat
+        ))
+        
+        def dedup_lookup():
+            sentence = rng.choice(samples)
+            conn.execute(
+                text('SELECT id FROM sentences WHERE chinese = :c AND english = :e'),
+                {'c': sentence['chinese'], 'e': sentence['english']}
+            ).first()
+        
+        results['dedup_lookup'] = summarize(timed(dedup_lookup, repeat))
+    return results
+
+def run_concurrent(engine, rows, duration):
+    """写入线程持续批量插入时，读线程按id查询的延迟和失败次数"""
+    stop = threading.Event()
+    latencies = []
+    errors = {'read': 0}
+    
+    def writer():
+        batch_seed = 10**6
+        while not stop.is_set():
+            batch = list(generate_sentences(1000, seed=batch_seed))
+            for i, sentence in enumerate(batch):
+                sentence['english'] += f' w{batch_seed}-{i}'
+                sentence['content_hash'] = None
+            with engine.begin() as conn:
+                conn.execute(text(
+                    'INSERT INTO sentences (chinese, english, difficulty) VALUES (:chinese, :english, :difficulty)'
+                ), [{k: s[k] for k in ('chinese', 'english', 'difficulty')} for s in batch])
+            batch_seed += 1
+    
+    def reader():
+        rng = random.Random(2)
+        with engine.connect() as conn:
+            while not stop.is_set():
+                started = time.perf_counter()
+                try:
+                    conn.execute(text('SELECT * FROM sentences WHERE id = :id'), {'id': rng.randrange(1, rows)}).first()
+                    conn.commit()
+                    latencies.append((time.perf_counter() - started) * 1000)
+                except Exception:
+                    errors['read'] += 1
+                    conn.rollback()
+    
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    result = summarize(latencies) if latencies else {}
+    result['reads'] = len(latencies)
+    result['read_errors'] = errors['read']
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description='SQLite调优基准测试')
+    parser.add_argument('--rows', type=int, default=200000, help='合成语料行数')
+    parser.add_argument('--repeat', type=int, default=200, help='每个查询的执行次数')
+    parser.add_argument('--duration', type=float, default=3.0, help='并发读写测试时长（秒）')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    args = parser.parse_args()
+    
+    report = {'rows': args.rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, tuned in (('baseline', False), ('tuned', True)):
+            print(f"[{name}] 生成 {args.rows} 行合成语料...")
+            engine = build(os.path.join(tmp, f'{name}.db'), args.rows, tuned)
+            report[name] = run_queries(engine, args.rows, args.repeat)
+            report[name]['concurrent_read'] = run_concurrent(engine, args.rows, args.duration)
+            engine.dispose()
+    
+    print(f"\n{'指标':<24}{'baseline p50/p99 (ms)':>26}{'tuned p50/p99 (ms)':>26}")
+    for metric in ('count_by_difficulty', 'page_by_difficulty', 'dedup_lookup', 'concurrent_read'):
+        cells = [f"{report[n][metric].get('p50_ms', '-')}/{report[n][metric].get('p99_ms', '-')}" for n in ('baseline', 'tuned')]
+        print(f"{metric:<24}{cells[0]:>26}{cells[1]:>26}")
+    for name in ('baseline', 'tuned'):
+        concurrent = report[name]['concurrent_read']
+        print(f"[{name}] 并发读: {concurrent['reads']} 次成功，{concurrent['read_errors']} 次失败")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"结果已写入 {args.json}")
+
+if __name__ == '__main__':
+    main()
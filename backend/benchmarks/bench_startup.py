@@ -0,0 +1,167 @@
+"""
+冷启动耗时：每次在新的Python进程中测量 导入database、init_db、导入应用模块、第一个请求（含建立抽样索引）和第二个请求的耗时，
+以及在空数据库上执行init_data.py导入示例数据的耗时；进程总耗时含解释器启动
+
+用法: python3 benchmarks/bench_startup.py [--rows 50000] [--runs 5] [--apps flask,asgi] [--json results.json]
+"""
+import argparse
+import importlib
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from synthetic import BACKEND_DIR, populate
+
+def build(path, rows):
+    """创建并填充测试数据库（已是最新结构）"""
+    from database import create_db_engine
+    from migrations import mark_schema_current
+    from models import Base
+    
+    engine = create_db_engine(f'sqlite:///{path}')
+    Base.metadata.create_all(engine)
+    mark_schema_current(engine)
+    populate(engine, rows)
+    engine.dispose()
+
+def elapsed_ms(started):
+    """距started经过的毫秒数"""
+    return round((time.perf_counter() - started) * 1000, 2)
+
+def child_flask():
+    """子进程：与wsgi.py相同的启动顺序，然后用测试客户端发出请求"""
+    result = {}
+    started = time.perf_counter()
+    from database import init_db
+    result['import_database_ms'] = elapsed_ms(started)
+    started = time.perf_counter()
+    init_db()
+    result['init_db_ms'] = elapsed_ms(started)
+    started = time.perf_counter()
+    from app import app
+    result['import_app_ms'] = elapsed_ms(started)
+    client = app.test_client()
+    started = time.perf_counter()
+    assert client.get('/api/sentence/random').status_code == 200
+    result['first_request_ms'] = elapsed_ms(started)
+    started = time.perf_counter()
+    client.get('/api/sentence/random')
+    result['second_request_ms'] = elapsed_ms(started)
+    return result
+
+def child_asgi():
+    """子进程：与asgi.py相同的启动顺序，启动生命周期后发出请求"""
+    result = {}
+    started = time.perf_counter()
+    from database import init_db
+    result['import_database_ms'] = elapsed_ms(started)
+    started = time.perf_counter()
+    init_db()
+    result['init_db_ms'] = elapsed_ms(started)
+    started = time.perf_counter()
+    from asgi_app import app
+    from starlette.testclient import TestClient
+    result['import_app_ms'] = elapsed_ms(started)
+    with TestClient(app) as client:
+        started = time.perf_counter()
+        assert client.get('/api/sentence/random').status_code == 200
+        result['first_request_ms'] = elapsed_ms(started)
+        started = time.perf_counter()
+        client.get('/api/sentence/random')
+        result['second_request_ms'] = elapsed_ms(started)
+    return result
+
+def child_seed():
+    """子进程：在空数据库上导入示例数据（先导入依赖，只统计init_data模块本身的导入耗时）"""
+    # 有意只导入不使用：提前加载init_data依赖的模块，下面的计时不包含它们的导入耗时
+    for name in ('database', 'search_index'):
+        importlib.import_module(name)
+    result = {}
+    started = time.perf_counter()
+    import init_data
+    result['import_ms'] = elapsed_ms(started)
+    started = time.perf_counter()
+    init_data.init_sample_data()
+    result['seed_ms'] = elapsed_ms(started)
+    return result
+
+CHILDREN = {'flask': child_flask, 'asgi': child_asgi, 'seed': child_seed}
+
+def run_child(kind, env):
+    """在新进程中执行一次测量，返回各项耗时和进程总耗时（毫秒）"""
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), '--child', kind],
+        cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_ms'] = elapsed_ms(started)
+    return result
+
+def median(results):
+    """多次测量中每一项的中位数"""
+    return {key: round(statistics.median(result[key] for result in results), 2) for key in results[0]}
+
+def main():
+    parser = argparse.ArgumentParser(description='冷启动耗时基准')
+    parser.add_argument('--rows', type=int, default=50000, help='合成语料行数')
+    parser.add_argument('--runs', type=int, default=5, help='每项测量的进程数（取中位数）')
+    parser.add_argument('--apps', default='flask,asgi', help='测量的应用，逗号分隔')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    parser.add_argument('--child', choices=sorted(CHILDREN), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        print(json.dumps(CHILDREN[args.child]()))
+        return
+    
+    report = {'rows': args.rows, 'runs': args.runs}
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, 'bench.db')
+        print(f"生成 {args.rows} 行合成语料...")
+        build(db_path, args.rows)
+        env = dict(os.environ, DATABASE_URL=f'sqlite:///{db_path}', UPLOAD_CACHE_PATH=os.path.join(tmp, 'upload.db'))
+        env.pop('DATABASE_READ_URL', None)
+        
+        baseline = []
+        for _ in range(args.runs):
+            started = time.perf_counter()
+            subprocess.run([sys.executable, '-c', 'pass'], check=True)
+            baseline.append({'process_ms': elapsed_ms(started)})
+        report['interpreter'] = median(baseline)
+        
+        for kind in [value.strip() for value in args.apps.split(',') if value.strip()]:
+            print(f"测量 {kind} 冷启动...")
+            report[kind] = median([run_child(kind, env) for _ in range(args.runs)])
+        
+        print("测量示例数据导入...")
+        seeds = []
+        for run in range(args.runs):
+            seed_env = dict(env, DATABASE_URL=f"sqlite:///{os.path.join(tmp, f'seed{run}.db')}")
+            seeds.append(run_child('seed', seed_env))
+        report['seed'] = median(seeds)
+    
+    print(f"\n解释器启动: {report['interpreter']['process_ms']} ms")
+    for kind in ('flask', 'asgi'):
+        if kind in report:
+            result = report[kind]
+            print(
+                f"{kind:<6} 导入database {result['import_database_ms']} ms | init_db {result['init_db_ms']} ms | "
+                f"导入应用 {result['import_app_ms']} ms | "
+                f"第一个请求 {result['first_request_ms']} ms | 第二个请求 {result['second_request_ms']} ms | "
+                f"进程总计 {result['process_ms']} ms"
+            )
+    seed = report['seed']
+    print(f"init_data 导入模块 {seed['import_ms']} ms | 写入示例数据 {seed['seed_ms']} ms | 进程总计 {seed['process_ms']} ms")
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"结果已写入 {args.json}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+比较两次基准结果（各基准脚本 --json 输出的文件）：逐项列出变化，耗时/内存增加或吞吐下降超过阈值时记为退化
+有退化时退出码为1，可在持续集成中使用
+
+用法: python3 benchmarks/compare_results.py baseline.json current.json [--threshold 0.1] [--all]
+"""
+import argparse
+import json
+import sys
+
+# 列表中用来识别同一项测量的字段（如语料规模、文件格式）
+IDENTITY_KEYS = ('rows', 'format', 'version')
+# 越大越好的指标后缀
+HIGHER_IS_BETTER = ('rps', 'rows_per_s', 'recall')
+# 越小越好的指标后缀
+LOWER_IS_BETTER = ('_ms', '_s', 'seconds', '_mb', 'errors', 'false_positives')
+
+def flatten(value, prefix=''):
+    """把嵌套的结果展开为 {路径: 数值}；列表中的字典按识别字段命名"""
+    items = {}
+    if isinstance(value, dict):
+        for key, child in value.items():
+            items.update(flatten(child, f'{prefix}.{key}' if prefix else key))
+    elif isinstance(value, list):
+        for index, child in enumerate(value):
+            if isinstance(child, dict) and any(key in child for key in IDENTITY_KEYS):
+                name = ','.join(f'{key}={child[key]}' for key in IDENTITY_KEYS if key in child)
+            else:
+                name = str(index)
+            items.update(flatten(child, f'{prefix}[{name}]'))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        items[prefix] = value
+    return items
+
+def direction(path):
+    """指标方向：1为越大越好，-1为越小越好，0为不比较（配置项、计数等）"""
+    name = path.rsplit('.', 1)[-1]
+    if name.endswith(HIGHER_IS_BETTER):
+        return 1
+    if name.endswith(LOWER_IS_BETTER):
+        return -1
+    return 0
+
+def compare(baseline, current, threshold):
+    """
+    比较两次结果中都存在的指标
+    
+    Returns:
+        [(路径, 基准值, 当前值, 相对变化, 是否退化), ...]，相对变化为正表示变好
+    """
+    rows = []
+    for path, old in baseline.items():
+        sign = direction(path)
+        if sign == 0 or path not in current:
+            continue
+        new = current[path]
+        if old == 0:
+            change = 0.0 if new == 0 else -sign * float('inf')
+        else:
+            # 避免显示-0.0%
+            change = sign * (new - old) / abs(old) or 0.0
+        rows.append((path, old, new, change, change < -threshold))
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description='比较两次基准结果')
+    parser.add_argument('baseline', help='基准结果JSON')
+    parser.add_argument('current', help='当前结果JSON')
+    parser.add_argument('--threshold', type=float, default=0.1, help='判定为退化的相对变化（默认0.1即10%%）')
+    parser.add_argument('--all', action='store_true', help='列出全部指标（默认只列出变化超过阈值的）')
+    args = parser.parse_args()
+    
+    with open(args.baseline) as f:
+        baseline = flatten(json.load(f))
+    with open(args.current) as f:
+        current = flatten(json.load(f))
+    
+    rows = compare(baseline, current, args.threshold)
+    shown = [row for row in rows if args.all or abs(row[3]) > args.threshold]
+    if shown:
+        width = max(len(row[0]) for row in shown)
+        print(f"{'指标':<{width}}{'基准':>12}{'当前':>12}{'变化':>10}")
+        for path, old, new, change, regressed in shown:
+            mark = '  退化' if regressed else ''
+            print(f"{path:<{width}}{old:>12.6g}{new:>12.6g}{change:>+10.1%}{mark}")
+    
+    regressions = sum(1 for row in rows if row[4])
+    only_baseline = sum(1 for path in baseline if direction(path) and path not in current)
+    print(f"\n比较 {len(rows)} 项指标，{regressions} 项退化（阈值 {args.threshold:.0%}）")
+    if only_baseline:
+        print(f"{only_baseline} 项指标只在基准结果中出现（可能是测试参数不同）")
+    sys.exit(1 if regressions else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,252 @@
+"""
+本地多客户端负载生成：启动/结束测试服务器，多个客户端进程对一个接口持续发送请求，统计吞吐和延迟百分位
+也可单独运行，对已启动的服务器施压
+
+用法: python3 benchmarks/loadgen.py [--port 5001] [--endpoints random,check] [--clients 16] [--duration 10] [--rows 150] [--json results.json]
+"""
+import argparse
+import http.client
+import json
+import multiprocessing
+import os
+import random
+import signal
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+from synthetic import BACKEND_DIR, ENGLISH_WORDS, percentile
+
+DEV_SERVER_CODE = (
+    "from database import init_db; init_db(); from app import app; "
+    "app.run(debug=True, port={port}, use_reloader=False)"
+)
+
+# 流式接口只读取语料末尾的这些行，避免大语料下单个请求耗时过长
+STREAM_TAIL_ROWS = 1000
+# 批量接口每个请求的句子/答案数
+BATCH_ITEMS = 10
+# 记录答题结果时使用的学习者数
+LEARNERS = 100
+# 单个请求的超时（秒），超时计为错误
+REQUEST_TIMEOUT = 30
+
+def start_server(kind, port, env):
+    """启动服务器子进程（独立进程组，便于整体结束）"""
+    if kind == 'dev':
+        command = [sys.executable, '-c', DEV_SERVER_CODE.format(port=port)]
+    elif kind == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'wsgi:app']
+    else:
+        command = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+                   '-k', 'uvicorn.workers.UvicornWorker', 'asgi:app']
+    return subprocess.Popen(
+        command, cwd=BACKEND_DIR, env=env, start_new_session=True,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+def wait_ready(process, port, timeout=30):
+    """等待服务器可以响应请求"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'服务器启动失败，退出码 {process.returncode}')
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/sentence/1')
+            conn.getresponse().read()
+            conn.close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'服务器未在{timeout}秒内启动')
+
+def stop_server(process):
+    """发送SIGTERM（gunicorn会等待进行中的请求完成后退出）"""
+    os.killpg(process.pid, signal.SIGTERM)
+    try:
+        process.wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        os.killpg(process.pid, signal.SIGKILL)
+        process.wait()
+
+def multipart_body(filename, content):
+    """构造只有一个file字段的multipart/form-data请求体，返回(请求体, Content-Type)"""
+    boundary = uuid.uuid4().hex
+    body = (
+        f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+        f'Content-Type: application/octet-stream\r\n\r\n'
+    ).encode() + content + f'\r\n--{boundary}--\r\n'.encode()
+    return body, f'multipart/form-data; boundary={boundary}'
+
+def upload_csv(rows):
+    """上传接口使用的CSV文件内容（rows行，中文、英文、难度）"""
+    lines = [f'中文句子{i}。,{" ".join(ENGLISH_WORDS[i % 50:i % 50 + 8])} {i}.,cet4' for i in range(rows)]
+    return ('\n'.join(lines) + '\n').encode()
+
+def upload(port, content, filename='bench.csv'):
+    """上传一个文件，返回(句子集ID, 句子数)"""
+    body, content_type = multipart_body(filename, content)
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    try:
+        conn.request('POST', '/api/upload-excel', body=body, headers={'Content-Type': content_type})
+        response = conn.getresponse()
+        data = json.loads(response.read())
+        if response.status != 200:
+            raise RuntimeError(f"上传失败: {data.get('error')}")
+        return data['set_id'], data['total']
+    finally:
+        conn.close()
+
+def random_ids(rng, rows, count):
+    """count个随机句子ID"""
+    return [rng.randint(1, rows) for _ in range(count)]
+
+def json_request(path, payload):
+    """POST JSON请求"""
+    return 'POST', path, json.dumps(payload), {'Content-Type': 'application/json'}
+
+# 接口名 -> 请求生成函数(rng, context) -> (方法, 路径, 请求体, 请求头)
+# context: rows=语料行数；set_id/set_total=已上传的句子集；upload_body/upload_type=上传接口的请求体
+ENDPOINTS = {
+    'random': lambda rng, ctx: ('GET', '/api/sentence/random?difficulties=cet4,cet6', None, {}),
+    'batch': lambda rng, ctx: ('GET', f'/api/sentences/batch?n={BATCH_ITEMS}', None, {}),
+    'batch_ids': lambda rng, ctx: (
+        'GET', '/api/sentences/batch?ids=' + ','.join(map(str, random_ids(rng, ctx['rows'], BATCH_ITEMS))), None, {}
+    ),
+    'list': lambda rng, ctx: ('GET', f"/api/sentences/list?limit=50&after_id={rng.randint(0, ctx['rows'])}", None, {}),
+    'search': lambda rng, ctx: ('GET', f'/api/sentences/search?q={rng.choice(ENGLISH_WORDS[20:])}', None, {}),
+    'stream': lambda rng, ctx: (
+        'GET', f"/api/sentences/stream?after_id={max(0, ctx['rows'] - STREAM_TAIL_ROWS)}", None, {}
+    ),
+    'next': lambda rng, ctx: ('GET', f'/api/sentence/next?learner_id=bench{rng.randrange(LEARNERS)}', None, {}),
+    'sentence': lambda rng, ctx: ('GET', f"/api/sentence/{rng.randint(1, ctx['rows'])}", None, {}),
+    'cache_stats': lambda rng, ctx: ('GET', '/api/cache/stats', None, {}),
+    # 相同文件重复上传：每次计算内容哈希后命中句子集缓存
+    'upload_excel': lambda rng, ctx: (
+        'POST', '/api/upload-excel', ctx['upload_body'], {'Content-Type': ctx['upload_type']}
+    ),
+    'upload_page': lambda rng, ctx: (
+        'GET', f"/api/upload-sets/{ctx['set_id']}/sentences?offset={rng.randrange(ctx['set_total'])}&limit=50",
+        None, {}
+    ),
+    'upload_sentence': lambda rng, ctx: (
+        'GET', f"/api/upload-sets/{ctx['set_id']}/sentence/{rng.randint(1, ctx['set_total'])}", None, {}
+    ),
+    'upload_random': lambda rng, ctx: ('GET', f"/api/upload-sets/{ctx['set_id']}/random", None, {}),
+    'check': lambda rng, ctx: json_request(
+        '/api/check', {'sentence_id': rng.randint(1, ctx['rows']), 'answer': 'the answer'}
+    ),
+    # 记录答题结果（写入复习状态）
+    'check_review': lambda rng, ctx: json_request('/api/check', {
+        'sentence_id': rng.randint(1, ctx['rows']), 'answer': 'the answer',
+        'learner_id': f'bench{rng.randrange(LEARNERS)}'
+    }),
+    'check_batch': lambda rng, ctx: json_request('/api/check/batch', {
+        'answers': [{'sentence_id': i, 'answer': 'the answer'} for i in random_ids(rng, ctx['rows'], BATCH_ITEMS)]
+    }),
+}
+
+# 需要先上传句子集的接口
+UPLOAD_ENDPOINTS = ('upload_excel', 'upload_page', 'upload_sentence', 'upload_random')
+
+def prepare_context(port, rows, endpoints, upload_rows=1000):
+    """生成请求所需的上下文；用到句子集的接口先上传一个CSV文件"""
+    context = {'rows': rows}
+    if any(endpoint in UPLOAD_ENDPOINTS for endpoint in endpoints):
+        content = upload_csv(upload_rows)
+        context['upload_body'], context['upload_type'] = multipart_body('bench.csv', content)
+        context['set_id'], context['set_total'] = upload(port, content)
+    return context
+
+def client(args):
+    """单个客户端进程：在duration秒内连续发送请求，返回延迟列表（毫秒）和错误数"""
+    port, endpoint, context, duration, seed = args
+    rng = random.Random(seed)
+    make_request = ENDPOINTS[endpoint]
+    latencies = []
+    errors = 0
+    conn = None
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        if conn is None:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=REQUEST_TIMEOUT)
+        method, path, body, headers = make_request(rng, context)
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors += 1
+            else:
+                latencies.append((time.perf_counter() - started) * 1000)
+            # 开发服务器使用HTTP/1.0，每个请求后关闭连接
+            if response.will_close:
+                conn.close()
+                conn = None
+        except OSError:
+            errors += 1
+            conn.close()
+            conn = None
+    if conn is not None:
+        conn.close()
+    return latencies, errors
+
+def run_load(port, endpoint, context, clients, duration):
+    """用clients个客户端进程并发施压，汇总吞吐和延迟"""
+    with multiprocessing.Pool(clients) as pool:
+        results = pool.map(client, [(port, endpoint, context, duration, seed) for seed in range(clients)])
+    latencies = [value for samples, _ in results for value in samples]
+    return {
+        'requests': len(latencies),
+        'errors': sum(errors for _, errors in results),
+        'rps': round(len(latencies) / duration, 1),
+        'mean_ms': round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        'p50_ms': round(percentile(latencies, 50), 2),
+        'p90_ms': round(percentile(latencies, 90), 2),
+        'p99_ms': round(percentile(latencies, 99), 2),
+        'max_ms': round(max(latencies), 2) if latencies else 0.0
+    }
+
+def print_table(results):
+    """按接口打印吞吐和延迟"""
+    print(f"{'接口':<18}{'请求/秒':>10}{'p50 (ms)':>10}{'p90 (ms)':>10}{'p99 (ms)':>10}{'错误':>8}")
+    for endpoint, result in results.items():
+        print(
+            f"{endpoint:<18}{result['rps']:>10}{result['p50_ms']:>10}{result['p90_ms']:>10}"
+            f"{result['p99_ms']:>10}{result['errors']:>8}"
+        )
+
+def main():
+    parser = argparse.ArgumentParser(description='对已启动的服务器施加并发负载')
+    parser.add_argument('--port', type=int, default=5001, help='服务器端口（本机）')
+    parser.add_argument('--endpoints', default='random,check', help=f"接口，逗号分隔，可选: {','.join(ENDPOINTS)}")
+    parser.add_argument('--clients', type=int, default=16, help='并发客户端进程数')
+    parser.add_argument('--duration', type=float, default=10.0, help='每个接口的测试时长（秒）')
+    parser.add_argument('--rows', type=int, default=150, help='服务器语料的句子数，请求的句子ID在1~rows之间（默认为示例数据的句子数）')
+    parser.add_argument('--json', help='结果写入的JSON文件')
+    args = parser.parse_args()
+    
+    endpoints = [value.strip() for value in args.endpoints.split(',') if value.strip()]
+    unknown = [endpoint for endpoint in endpoints if endpoint not in ENDPOINTS]
+    if unknown:
+        parser.error(f"未知的接口: {','.join(unknown)}")
+    
+    context = prepare_context(args.port, args.rows, endpoints)
+    results = {}
+    for endpoint in endpoints:
+        print(f"{endpoint} ...", flush=True)
+        results[endpoint] = run_load(args.port, endpoint, context, args.clients, args.duration)
+    print()
+    print_table(results)
+    
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'clients': args.clients, 'duration': args.duration, 'endpoints': results}, f, indent=2)
+        print(f"结果已写入 {args.json}")
+
+if __name__ == '__main__':
+    main()
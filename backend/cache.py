@@ -0,0 +1,258 @@
+"""
+句子读缓存：按ID的LRU缓存 + 按难度的列表快照
+导入脚本写入后会递增语料版本号，各进程检测到版本变化即丢弃全部缓存
+配置了语料只读快照文件（corpus_snapshot.py）且版本一致时，按ID取句子和列表分页直接读取快照
+"""
+import heapq
+import threading
+import time
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+from itertools import islice
+from sqlalchemy import func
+from database import get_corpus_version
+from models import Sentence, difficulty_sort_key
+from corpus_snapshot import SnapshotFile
+
+class SentenceCache:
+    """读穿透缓存，缓存的句子为不可变字典（调用方不要修改）"""
+    
+    def __init__(self, session_factory, max_entries=10000, snapshot_max_rows=50000, check_interval=1.0,
+                 corpus_snapshot_path=None, max_snapshots=16):
+        """
+        Args:
+            session_factory: 创建数据库会话的函数，仅在未命中时调用
+            max_entries: 按ID缓存的最大句子数（LRU淘汰）
+            snapshot_max_rows: 单个难度超过该行数时不做列表快照，直接查询数据库
+            max_snapshots: 最多保留的难度快照数（调用方应只传入语料中存在的难度，这里再做一道上限）
+            check_interval: 检查语料版本号的最小间隔（秒）
+            corpus_snapshot_path: 语料只读快照文件，为空表示不使用
+        """
+        self.session_factory = session_factory
+        self.max_entries = max_entries
+        self.snapshot_max_rows = snapshot_max_rows
+        self.max_snapshots = max_snapshots
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._snapshots = {}
+        self._version = None
+        self._checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.snapshot_hits = 0
+        self.snapshot_misses = 0
+        self.corpus_snapshot = SnapshotFile(corpus_snapshot_path) if corpus_snapshot_path else None
+        self.corpus_snapshot_hits = 0
+    
+    @property
+    def version(self):
+        """当前缓存对应的语料版本号，尚未检查时为None"""
+        return self._version
+    
+    def sync(self):
+        """返回当前语料版本号，版本变化时清空缓存；两次查询数据库至少间隔check_interval秒"""
+        if not self.needs_check():
+            return self._version
+        db = self.session_factory()
+        try:
+            version = get_corpus_version(db)
+        finally:
+            db.close()
+        return self.apply_version(version)
+    
+    def needs_check(self):
+        """距上次检查语料版本号是否已超过check_interval秒"""
+        return self._version is None or time.monotonic() - self._checked_at >= self.check_interval
+    
+    def apply_version(self, version):
+        """记录查询到的语料版本号，与缓存的版本不同时清空缓存"""
+        with self._lock:
+            if version != self._version:
+                self._entries.clear()
+                self._snapshots.clear()
+                self._version = version
+            self._checked_at = time.monotonic()
+        self.refresh_snapshot(version)
+        return version
+    
+    def refresh_snapshot(self, version):
+        """语料版本变化后检查只读快照文件是否已重建，返回与该版本一致的快照（没有时为None）"""
+        if self.corpus_snapshot is None:
+            return None
+        self.corpus_snapshot.refresh(version)
+        return self.corpus_snapshot.current(version)
+    
+    def current_snapshot(self, version=None):
+        """与当前（或指定的）语料版本一致的只读快照，没有时返回None"""
+        if self.corpus_snapshot is None:
+            return None
+        return self.corpus_snapshot.current(self._version if version is None else version)
+    
+    def get_sentence(self, sentence_id):
+        """按ID获取句子字典，不存在时返回None"""
+        item, version = self.lookup(sentence_id)
+        if item is not None:
+            return item
+        
+        db = self.session_factory()
+        try:
+            sentence = db.get(Sentence, sentence_id)
+            item = sentence.to_dict() if sentence else None
+        finally:
+            db.close()
+        if item is not None:
+            self.store(version, item)
+        return item
+    
+    def get_sentences(self, sentence_ids):
+        """
+        按ID批量获取句子字典，未命中的ID用一次IN查询加载
+        
+        Returns:
+            {句子ID: 句子字典}，不存在的ID不在结果中
+        """
+        found = {}
+        missing = []
+        version = None
+        for sentence_id in set(sentence_ids):
+            item, version = self.lookup(sentence_id)
+            if item is not None:
+                found[sentence_id] = item
+            else:
+                missing.append(sentence_id)
+        if not missing:
+            return found
+        
+        db = self.session_factory()
+        try:
+            items = [s.to_dict() for s in db.query(Sentence).filter(Sentence.id.in_(missing))]
+        finally:
+            db.close()
+        for item in items:
+            self.store(version, item)
+            found[item['id']] = item
+        return found
+    
+    def lookup(self, sentence_id):
+        """
+        只查缓存，不访问数据库
+        
+        Returns:
+            (句子字典或None, 当前缓存版本号)；未命中时调用方加载后用该版本号调用store
+        """
+        snapshot = self.current_snapshot()
+        if snapshot is not None:
+            item = snapshot.get(sentence_id)
+            if item is not None:
+                # 计数不加锁，偶尔少计不影响统计
+                self.corpus_snapshot_hits += 1
+                return item, snapshot.version
+        with self._lock:
+            item = self._entries.get(sentence_id)
+            if item is not None:
+                self._entries.move_to_end(sentence_id)
+                self.hits += 1
+            else:
+                self.misses += 1
+            return item, self._version
+    
+    def get_page(self, difficulties, after_id=None, limit=None):
+        """
+        从难度快照中按id升序取一页（difficulties应为语料中存在的难度）
+        
+        Returns:
+            句子字典列表；任一难度过大未做快照时返回None，由调用方查询数据库
+        """
+        corpus_snapshot = self.current_snapshot()
+        if corpus_snapshot is not None:
+            self.corpus_snapshot_hits += 1
+            return corpus_snapshot.page(difficulties, after_id, limit)
+        
+        snapshots = []
+        for difficulty in sorted(set(difficulties), key=difficulty_sort_key):
+            snapshot = self._snapshot(difficulty)
+            if snapshot is None:
+                return None
+            snapshots.append(snapshot)
+        
+        iterators = [self._iter_after(ids, items, after_id) for ids, items in snapshots]
+        merged = heapq.merge(*iterators, key=lambda item: item['id'])
+        return list(islice(merged, limit))
+    
+    def stats(self):
+        """缓存命中统计，用于评估缓存大小"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'version': self._version,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None,
+                # JSON的键只能是字符串（Flask还会排序），没有难度的分组记为'null'，与json模块转换None键的结果相同
+                'snapshots': {
+                    'null' if difficulty is None else difficulty: len(snapshot[1]) if snapshot else None
+                    for difficulty, snapshot in self._snapshots.items()
+                },
+                'snapshot_hits': self.snapshot_hits,
+                'snapshot_misses': self.snapshot_misses,
+                'corpus_snapshot': self._corpus_snapshot_stats()
+            }
+    
+    def _corpus_snapshot_stats(self):
+        """只读快照的状态，未配置时为None"""
+        if self.corpus_snapshot is None:
+            return None
+        snapshot = self.current_snapshot()
+        return {
+            'path': self.corpus_snapshot.path,
+            'active': snapshot is not None,
+            'count': snapshot.count if snapshot is not None else None,
+            'hits': self.corpus_snapshot_hits
+        }
+    
+    @staticmethod
+    def _iter_after(ids, items, after_id):
+        """从快照中id大于after_id的位置开始迭代"""
+        start = bisect_right(ids, after_id) if after_id is not None else 0
+        for i in range(start, len(items)):
+            yield items[i]
+    
+    def store(self, version, item):
+        """写入LRU缓存；加载期间语料版本已变化则丢弃"""
+        with self._lock:
+            if version != self._version:
+                return
+            self._entries[item['id']] = item
+            self._entries.move_to_end(item['id'])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def _snapshot(self, difficulty):
+        """获取单个难度的快照 (ids, items)，过大时为None"""
+        with self._lock:
+            if difficulty in self._snapshots:
+                self.snapshot_hits += 1
+                return self._snapshots[difficulty]
+            self.snapshot_misses += 1
+            version = self._version
+        
+        db = self.session_factory()
+        try:
+            query = db.query(Sentence).filter(Sentence.difficulty == difficulty)
+            count = query.with_entities(func.count(Sentence.id)).scalar()
+            if count > self.snapshot_max_rows:
+                snapshot = None
+            else:
+                items = tuple(s.to_dict() for s in query.order_by(Sentence.id))
+                snapshot = (array('q', (item['id'] for item in items)), items)
+        finally:
+            db.close()
+        
+        with self._lock:
+            if version == self._version and len(self._snapshots) < self.max_snapshots:
+                self._snapshots[difficulty] = snapshot
+        return snapshot
@@ -0,0 +1,485 @@
+"""
+整库导出与恢复：把句子表导出为gzip压缩的NDJSON或Parquet文件（备份、复制到其他节点），再批量恢复到数据库
+导出按ID顺序分批读取、边读边压缩写出，内存占用与语料规模无关；HTTP导出接口（/api/sentences/export）与命令行共用同一个生成器
+
+文件格式：
+    NDJSON（.ndjson.gz）：第一行为头部（格式版本、列名、corpus_meta中的语料元数据），之后每行一个句子，最后一行为 {"end": true, "count": 句子数}
+    Parquet（.parquet，需要安装pyarrow）：头部保存在文件元数据中，每批句子写成一个行组
+命令行导出时同时写出 <文件>.sha256（与sha256sum格式相同），恢复前据此校验整个文件；每个句子还会按内容重新计算哈希，与文件中的content_hash比对
+
+用法:
+    python3 corpus_export.py export sentences.ndjson.gz
+    python3 corpus_export.py restore sentences.ndjson.gz [--replace]
+"""
+import argparse
+import gzip
+import hashlib
+import importlib.util
+import json
+import os
+import sys
+import time
+import zlib
+from datetime import datetime
+from sqlalchemy import Column, Index, MetaData, Table, delete, func, insert, select, update
+from database import CORPUS_VERSION_KEY
+from models import Sentence, CorpusMeta, ReviewState, sentence_hash
+from migrations import get_meta, set_meta, SCHEMA_VERSION_KEY
+from search_index import SEARCH_INDEXED_KEY
+
+EXPORT_FORMAT = 'english-corpus'
+EXPORT_FORMAT_VERSION = 1
+EXPORT_FORMATS = ('ndjson', 'parquet')
+EXPORT_MIMETYPES = {'ndjson': 'application/gzip', 'parquet': 'application/vnd.apache.parquet'}
+EXPORT_SUFFIXES = {'ndjson': '.ndjson.gz', 'parquet': '.parquet'}
+EXPORT_COLUMNS = ('id', 'chinese', 'english', 'difficulty', 'content_hash', 'created_at')
+# Parquet文件元数据中保存头部的键
+PARQUET_HEADER_KEY = b'english_corpus'
+
+# 导出时每次从数据库读取的行数（Parquet每个行组的行数）
+EXPORT_BATCH_SIZE = 5000
+# 恢复时每个事务写入暂存表的行数
+RESTORE_TRANSACTION_SIZE = 50000
+# 恢复时先写入的暂存表，整个文件校验通过后再替换句子表
+RESTORE_STAGING_TABLE = 'sentences_restore'
+# 每条INSERT语句批量写入的行数
+INSERT_BATCH_SIZE = 5000
+GZIP_LEVEL = 6
+# 计算文件校验和时每次读取的字节数
+CHECKSUM_CHUNK_SIZE = 1024 * 1024
+
+def parquet_available():
+    """是否安装了pyarrow（只检查，不导入）"""
+    return importlib.util.find_spec('pyarrow') is not None
+
+def guess_format(path):
+    """按文件扩展名判断格式：.parquet为Parquet，其余为gzip压缩的NDJSON"""
+    return 'parquet' if path.endswith('.parquet') else 'ndjson'
+
+def export_filename(version, fmt):
+    """导出文件的默认文件名"""
+    return f'sentences-v{version}{EXPORT_SUFFIXES[fmt]}'
+
+def export_header(conn):
+    """导出文件头部：格式版本、列名和需要随句子一起恢复的语料元数据（结构版本和全文索引进度除外）"""
+    meta = conn.execute(
+        select(CorpusMeta.key, CorpusMeta.value).where(
+            CorpusMeta.key.notin_((SCHEMA_VERSION_KEY, SEARCH_INDEXED_KEY))
+        )
+    ).all()
+    return {
+        'format': EXPORT_FORMAT,
+        'version': EXPORT_FORMAT_VERSION,
+        'columns': list(EXPORT_COLUMNS),
+        'meta': dict(meta),
+        'exported_at': datetime.now().isoformat(timespec='seconds')
+    }
+
+def _row_batches(conn, batch_size, on_batch=None):
+    """按ID顺序分批读取句子（服务端游标，每批batch_size行）"""
+    table = Sentence.__table__
+    result = conn.execute(
+        select(*(table.c[name] for name in EXPORT_COLUMNS)).order_by(table.c.id)
+        .execution_options(yield_per=batch_size)
+    )
+    for rows in result.partitions():
+        if on_batch is not None:
+            on_batch(len(rows))
+        yield rows
+
+def _ndjson_chunks(header, batches):
+    """gzip压缩的NDJSON字节块"""
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    yield compressor.compress((json.dumps(header, ensure_ascii=False) + '\n').encode('utf-8'))
+    count = 0
+    for rows in batches:
+        lines = []
+        for row in rows:
+            record = dict(zip(EXPORT_COLUMNS, row))
+            if record['created_at'] is not None:
+                record['created_at'] = record['created_at'].isoformat()
+            lines.append(json.dumps(record, ensure_ascii=False) + '\n')
+        count += len(rows)
+        data = compressor.compress(''.join(lines).encode('utf-8'))
+        if data:
+            yield data
+    trailer = json.dumps({'end': True, 'count': count}) + '\n'
+    yield compressor.compress(trailer.encode('utf-8')) + compressor.flush()
+
+class _ChunkSink:
+    """供ParquetWriter写入的输出对象：收集写入的字节，由生成器逐块取出（Parquet按行组顺序写入，不需要回退）"""
+    
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.closed = False
+    
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+    
+    def tell(self):
+        return self._position
+    
+    def flush(self):
+        pass
+    
+    def close(self):
+        self.closed = True
+    
+    def drain(self):
+        """取出尚未返回的字节"""
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def _parquet_schema(header):
+    import pyarrow as pa
+    return pa.schema([
+        ('id', pa.int64()),
+        ('chinese', pa.string()),
+        ('english', pa.string()),
+        ('difficulty', pa.string()),
+        ('content_hash', pa.string()),
+        ('created_at', pa.timestamp('us')),
+    ], metadata={PARQUET_HEADER_KEY: json.dumps(header, ensure_ascii=False).encode('utf-8')})
+
+def _parquet_chunks(header, batches):
+    """Parquet文件的字节块，每批句子一个行组"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = _parquet_schema(header)
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)], schema=schema
+            ))
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()
+
+def export_chunks(conn, fmt='ndjson', batch_size=EXPORT_BATCH_SIZE, on_batch=None):
+    """
+    导出整个句子表，逐块返回文件内容（字节）
+    
+    Args:
+        conn: SQLAlchemy连接或会话
+        fmt: ndjson 或 parquet（需要pyarrow）
+        on_batch: 每读取一批句子后以该批行数调用（用于统计进度）
+    """
+    header = export_header(conn)
+    batches = _row_batches(conn, batch_size, on_batch)
+    if fmt == 'parquet':
+        yield from _parquet_chunks(header, batches)
+    else:
+        yield from _ndjson_chunks(header, batches)
+
+def file_sha256(path):
+    """文件的SHA-256（分块读取）"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHECKSUM_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def checksum_path(path):
+    """校验和文件路径"""
+    return f'{path}.sha256'
+
+def export_corpus(path, fmt=None, batch_size=EXPORT_BATCH_SIZE, engine=None):
+    """
+    导出到文件（先写临时文件再原子替换），同时写出校验和文件
+    
+    Returns:
+        (句子数, 文件字节数, SHA-256)
+    """
+    if engine is None:
+        from database import engine
+    fmt = fmt or guess_format(path)
+    digest = hashlib.sha256()
+    temp_path = f'{path}.tmp-{os.getpid()}'
+    started = time.perf_counter()
+    count = 0
+    
+    def report(rows):
+        nonlocal count
+        count += rows
+        elapsed = time.perf_counter() - started
+        print(f"已导出 {count} 条 ({count / elapsed if elapsed > 0 else 0:.0f} 行/秒)")
+    
+    try:
+        with engine.connect() as conn, open(temp_path, 'wb') as f:
+            for chunk in export_chunks(conn, fmt, batch_size, on_batch=report):
+                f.write(chunk)
+                digest.update(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    checksum = digest.hexdigest()
+    with open(checksum_path(path), 'w') as f:
+        f.write(f'{checksum}  {os.path.basename(path)}\n')
+    return count, os.path.getsize(path), checksum
+
+class ExportReader:
+    """
+    读取导出文件：header为文件头部，batches()逐批返回句子字典
+    expected_count为文件记录的句子数（NDJSON在末尾记录，读完后才有值）
+    """
+    
+    def __init__(self, path, fmt=None):
+        self.format = fmt or guess_format(path)
+        self.expected_count = None
+        self._file = None
+        self._parquet = None
+        if self.format == 'parquet':
+            import pyarrow.parquet as pq
+            self._parquet = pq.ParquetFile(path)
+            metadata = self._parquet.schema_arrow.metadata or {}
+            if PARQUET_HEADER_KEY not in metadata:
+                raise ValueError('不是句子库导出文件')
+            self.header = json.loads(metadata[PARQUET_HEADER_KEY])
+            self.expected_count = self._parquet.metadata.num_rows
+        else:
+            self._file = gzip.open(path, 'rt', encoding='utf-8')
+            try:
+                self.header = json.loads(self._file.readline())
+            except (OSError, EOFError, ValueError, zlib.error):
+                self._file.close()
+                raise ValueError('不是句子库导出文件或文件已损坏')
+        if not isinstance(self.header, dict) or self.header.get('format') != EXPORT_FORMAT:
+            self.close()
+            raise ValueError('不是句子库导出文件')
+        if self.header.get('version') != EXPORT_FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"不支持的导出格式版本: {self.header.get('version')}")
+    
+    def batches(self, batch_size):
+        """逐批返回句子字典（created_at为datetime或None）"""
+        if self._parquet is not None:
+            for batch in self._parquet.iter_batches(batch_size=batch_size, columns=list(EXPORT_COLUMNS)):
+                yield batch.to_pylist()
+            return
+        
+        batch = []
+        for line in self._file:
+            record = json.loads(line)
+            if record.get('end'):
+                self.expected_count = record['count']
+                break
+            if record['created_at'] is not None:
+                record['created_at'] = datetime.fromisoformat(record['created_at'])
+            batch.append(record)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+
+def verify_record(record):
+    """按内容重新计算哈希，与文件中的content_hash比对（允许重复导入时写入的句子没有内容哈希）"""
+    expected = record['content_hash']
+    if expected is not None and sentence_hash(record['chinese'], record['english']) != expected:
+        raise ValueError(f"句子 {record['id']} 的内容与内容哈希不一致，文件可能已损坏")
+
+def verify_checksum(path):
+    """
+    按 <文件>.sha256 校验整个文件
+    
+    Returns:
+        True表示校验通过，None表示没有校验和文件；不一致时抛出ValueError
+    """
+    checksum_file = checksum_path(path)
+    if not os.path.exists(checksum_file):
+        return None
+    with open(checksum_file) as f:
+        expected = f.read().split()[0].lower()
+    if file_sha256(path) != expected:
+        raise ValueError(f'文件校验和与 {checksum_file} 不一致，文件可能已损坏或不完整')
+    return True
+
+def staging_table():
+    """恢复时使用的暂存表：列与句子表相同，不带索引和约束"""
+    columns = (Column(column.name, column.type) for column in Sentence.__table__.columns)
+    return Table(RESTORE_STAGING_TABLE, MetaData(), *columns)
+
+def drop_staging_table(db, staging):
+    """删除暂存表（恢复结束或失败后调用，失败不影响恢复结果）"""
+    try:
+        staging.drop(db.connection(), checkfirst=True)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"警告：删除暂存表 {staging.name} 失败: {e}")
+
+def remap_sentence_references(db, staging):
+    """
+    替换句子表之前（同一事务中，不提交）按内容哈希把旧句子ID对应到暂存表中同一句子的ID：
+    复习记录和内置句子练习会话的历史换成新ID，恢复的文件中没有的句子的复习记录删除
+    
+    Returns:
+        (保留的复习记录数, 删除的复习记录数, 修改的练习会话数)
+    """
+    from practice import remap_history
+    
+    table = Sentence.__table__
+    Index(f'ix_{RESTORE_STAGING_TABLE}_content_hash', staging.c.content_hash).create(db.connection())
+    matched = table.join(staging, staging.c.content_hash == table.c.content_hash)
+    new_id = select(staging.c.id).select_from(matched).where(table.c.id == ReviewState.sentence_id)
+    
+    removed = db.execute(delete(ReviewState).where(~new_id.exists())).rowcount
+    # 新旧ID一一对应，先写成负数再取反，更新过程中不会与其他记录的主键冲突
+    kept = db.execute(update(ReviewState).values(sentence_id=-new_id.scalar_subquery())).rowcount
+    db.execute(update(ReviewState).values(sentence_id=-ReviewState.sentence_id))
+    
+    changed = db.execute(select(table.c.id, staging.c.id).select_from(matched).where(table.c.id != staging.c.id))
+    sessions = remap_history(db, {old_id: restored_id for old_id, restored_id in changed})
+    return kept, removed, sessions
+
+def restore_corpus(path, fmt=None, replace=False, batch_size=RESTORE_TRANSACTION_SIZE):
+    """
+    把导出文件恢复到当前配置的数据库（保留句子ID）
+    先每batch_size行一个事务写入暂存表，整个文件读完并校验通过后，再在一个事务中替换句子表、重建全文索引和元数据；
+    中途失败时句子表保持原样。完成后语料版本号取两边较大者加一，并重建只读快照
+    
+    Args:
+        replace: 数据库已有句子时替换（复习记录和练习会话历史按内容哈希对应到恢复后的句子ID）；否则数据库必须没有句子
+    
+    Returns:
+        是否成功
+    """
+    from database import SessionLocal, init_db
+    from copy_corpus import reset_id_sequence
+    from search_index import rebuild_search_index
+    from corpus_snapshot import rebuild_snapshot
+    
+    init_db()
+    started = time.perf_counter()
+    try:
+        verified = verify_checksum(path)
+        reader = ExportReader(path, fmt)
+    except (OSError, ValueError) as e:
+        print(f"错误：{e}")
+        return False
+    if verified:
+        print(f"校验和一致（{checksum_path(path)}），耗时 {time.perf_counter() - started:.2f}s")
+    else:
+        print(f"未找到校验和文件 {checksum_path(path)}，只校验每个句子的内容哈希")
+    
+    table = Sentence.__table__
+    staging = staging_table()
+    db = SessionLocal()
+    restored = 0
+    try:
+        existing = db.execute(select(func.count()).select_from(table)).scalar()
+        if existing and not replace:
+            print(f"错误：数据库已有 {existing} 条句子，如需覆盖请使用 --replace")
+            return False
+        # 上次中断的恢复可能留下暂存表
+        staging.drop(db.connection(), checkfirst=True)
+        staging.create(db.connection())
+        db.commit()
+        
+        for records in reader.batches(batch_size):
+            for record in records:
+                verify_record(record)
+            for i in range(0, len(records), INSERT_BATCH_SIZE):
+                db.execute(insert(staging), records[i:i + INSERT_BATCH_SIZE])
+            db.commit()
+            restored += len(records)
+            elapsed = time.perf_counter() - started
+            print(f"已读取 {restored} 条 ({restored / elapsed if elapsed > 0 else 0:.0f} 行/秒)")
+        if reader.expected_count is None:
+            raise ValueError('文件不完整：缺少结束记录')
+        if restored != reader.expected_count:
+            raise ValueError(f'文件记录了 {reader.expected_count} 条句子，实际读取 {restored} 条')
+        
+        # 整个文件校验通过后，在同一事务中替换句子表、重建全文索引并恢复语料元数据
+        print("替换句子表并重建全文索引...")
+        if existing:
+            kept, removed, sessions = remap_sentence_references(db, staging)
+            print(f"复习记录：保留 {kept} 条（按内容对应到恢复后的句子ID），删除 {removed} 条（句子不在文件中）；"
+                  f"更新 {sessions} 个练习会话的历史")
+            db.execute(delete(table))
+        names = [column.name for column in table.columns]
+        db.execute(insert(table).from_select(names, select(*(staging.c[name] for name in names))))
+        reset_id_sequence(db.connection())
+        rebuild_search_index(db)
+        # 语料版本号取两边较大者加一，让API进程刷新缓存
+        meta = reader.header.get('meta', {})
+        version = max(get_meta(db, CORPUS_VERSION_KEY), meta.get(CORPUS_VERSION_KEY, 0))
+        for key, value in meta.items():
+            set_meta(db, key, value)
+        set_meta(db, CORPUS_VERSION_KEY, version + 1)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        print(f"\n恢复失败: {e}")
+        print("句子表未改动")
+        return False
+    finally:
+        drop_staging_table(db, staging)
+        reader.close()
+        db.close()
+    rebuild_snapshot()
+    
+    elapsed = time.perf_counter() - started
+    size = os.path.getsize(path)
+    print("\n" + "="*50)
+    print("恢复完成！")
+    print(f"句子: {restored} 条（语料版本 {version + 1}）")
+    print(f"耗时: {elapsed:.2f}s，吞吐: {restored / elapsed if elapsed > 0 else 0:.0f} 行/秒，"
+          f"{size / 1024 / 1024 / elapsed if elapsed > 0 else 0:.1f} MB/秒（文件 {size / 1024 / 1024:.1f}MB）")
+    print("="*50)
+    return True
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(
+        description='导出句子库或从导出文件恢复',
+        epilog='示例: python corpus_export.py export sentences.ndjson.gz; python corpus_export.py restore sentences.ndjson.gz --replace'
+    )
+    parser.add_argument('command', choices=('export', 'restore'), help='export: 导出；restore: 恢复')
+    parser.add_argument('path', help='导出文件（.ndjson.gz 或 .parquet）')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, help='文件格式（默认按扩展名判断）')
+    parser.add_argument('--batch-size', type=int, help='导出时每批读取的行数 / 恢复时每个事务写入暂存表的行数')
+    parser.add_argument('--replace', action='store_true', help='恢复时清空数据库中已有的句子')
+    args = parser.parse_args()
+    
+    fmt = args.format or guess_format(args.path)
+    if fmt == 'parquet' and not parquet_available():
+        print("错误：Parquet格式需要安装pyarrow（pip3 install pyarrow）")
+        sys.exit(1)
+    
+    if args.command == 'restore':
+        success = restore_corpus(args.path, fmt, replace=args.replace,
+                                 batch_size=args.batch_size or RESTORE_TRANSACTION_SIZE)
+        sys.exit(0 if success else 1)
+    
+    from database import init_db
+    init_db()
+    started = time.perf_counter()
+    try:
+        count, size, checksum = export_corpus(args.path, fmt, batch_size=args.batch_size or EXPORT_BATCH_SIZE)
+    except OSError as e:
+        print(f"错误：{e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+    print(f"\n已导出 {count} 条句子到 {args.path}（{size / 1024 / 1024:.1f}MB）")
+    print(f"SHA-256: {checksum}（已写入 {checksum_path(args.path)}）")
+    print(f"耗时: {elapsed:.2f}s，吞吐: {count / elapsed if elapsed > 0 else 0:.0f} 行/秒")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+"""
+语料只读快照：把句子表导出为一个列式二进制文件，各worker进程以mmap只读映射，文件页在操作系统页缓存中只有一份
+按ID取句子、随机抽样的ID索引和按难度的列表分页直接从快照读取，不访问数据库、不构造ORM对象
+快照记录导出时的语料版本号，与数据库当前版本不一致时不使用（回退到数据库）；导入脚本提交后重建并原子替换快照文件
+
+文件格式（本机字节序，写入头部；各段按8字节对齐）：
+    8字节魔数 + 8字节头部长度 + JSON头部（语料版本号、句子数、难度列表、各段相对数据区的偏移和长度）
+    ids                 int64[n]    全部句子ID，升序
+    difficulty_ids      int64[n]    按难度分组的句子ID（难度按名称排序，组内ID升序），直接作为抽样索引
+    difficulty_offsets  int64[k+1]  各难度在difficulty_ids中的起止位置
+    chinese_offsets     int64[n+1]  第i个句子的中文在chinese段中的字节范围
+    english_offsets     int64[n+1]  同上，英文
+    difficulty          uint8[n]    第i个句子的难度在难度列表中的下标
+    chinese / english   UTF-8文本，依次拼接
+
+用法: python3 corpus_snapshot.py [build|info] [--path 快照文件]
+"""
+import argparse
+import heapq
+import json
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from sqlalchemy import select
+from config import CORPUS_SNAPSHOT_PATH, BASE_DIR
+from database import CORPUS_VERSION_KEY
+from models import Sentence, difficulty_sort_key
+from migrations import get_meta
+
+MAGIC = b'ENSNAP01'
+# 魔数之后的头部长度字段
+HEADER_LENGTH = struct.Struct('<Q')
+# 导出时每次从数据库读取的行数
+BUILD_BATCH_SIZE = 10000
+
+def _aligned(size):
+    """向上取整到8字节"""
+    return (size + 7) // 8 * 8
+
+def write_snapshot(conn, path):
+    """
+    导出句子表并原子替换快照文件（先写临时文件，再rename）
+    先读取语料版本号再读取句子：导出期间有新的提交时快照版本号偏旧，只会被当作过期快照，不会把旧数据当成新版本
+    内存占用约为每个句子33字节（ID、偏移和难度数组），文本先写入临时文件
+    
+    Args:
+        conn: SQLAlchemy连接或会话
+    
+    Returns:
+        快照头部字典
+    """
+    version = get_meta(conn, CORPUS_VERSION_KEY)
+    
+    ids = array('q')
+    codes = bytearray()
+    chinese_offsets = array('q', [0])
+    english_offsets = array('q', [0])
+    groups = {}
+    names = []
+    code_of = {}
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.TemporaryFile(dir=directory) as chinese, tempfile.TemporaryFile(dir=directory) as english:
+        rows = conn.execute(
+            select(Sentence.id, Sentence.difficulty, Sentence.chinese, Sentence.english).order_by(Sentence.id)
+            .execution_options(yield_per=BUILD_BATCH_SIZE)
+        )
+        for sentence_id, difficulty, chinese_text, english_text in rows:
+            # 难度为空的句子以空字符串保存，读取时还原为None
+            name = difficulty or ''
+            code = code_of.get(name)
+            if code is None:
+                if len(names) == 256:
+                    raise ValueError('难度种类超过256个，无法生成快照')
+                code = code_of[name] = len(names)
+                names.append(name)
+                groups[name] = array('q')
+            ids.append(sentence_id)
+            codes.append(code)
+            groups[name].append(sentence_id)
+            chinese_offsets.append(chinese_offsets[-1] + chinese.write(chinese_text.encode('utf-8')))
+            english_offsets.append(english_offsets[-1] + english.write(english_text.encode('utf-8')))
+        
+        # 难度下标按名称排序重新编号，与difficulty_ids的分组顺序一致
+        ordered = sorted(names)
+        codes = codes.translate(bytes(ordered.index(name) for name in names).ljust(256, b'\0'))
+        difficulty_ids = array('q')
+        difficulty_offsets = array('q', [0])
+        for name in ordered:
+            difficulty_ids.extend(groups[name])
+            difficulty_offsets.append(len(difficulty_ids))
+        
+        sections = [
+            ('ids', ids.tobytes()),
+            ('difficulty_ids', difficulty_ids.tobytes()),
+            ('difficulty_offsets', difficulty_offsets.tobytes()),
+            ('chinese_offsets', chinese_offsets.tobytes()),
+            ('english_offsets', english_offsets.tobytes()),
+            ('difficulty', bytes(codes)),
+            ('chinese', chinese),
+            ('english', english),
+        ]
+        layout = {}
+        offset = 0
+        for name, data in sections:
+            size = len(data) if isinstance(data, bytes) else data.tell()
+            layout[name] = [offset, size]
+            offset = _aligned(offset + size)
+        header = {
+            'corpus_version': version,
+            'count': len(ids),
+            'difficulties': ordered,
+            'byteorder': sys.byteorder,
+            'created_at': time.time(),
+            'sections': layout
+        }
+        header_bytes = json.dumps(header).encode('utf-8')
+        header_bytes += b' ' * (_aligned(len(MAGIC) + HEADER_LENGTH.size + len(header_bytes)) - len(MAGIC) - HEADER_LENGTH.size - len(header_bytes))
+        
+        temp_path = f'{path}.tmp-{os.getpid()}'
+        try:
+            with open(temp_path, 'wb') as target:
+                target.write(MAGIC + HEADER_LENGTH.pack(len(header_bytes)) + header_bytes)
+                for name, data in sections:
+                    start = target.tell()
+                    if isinstance(data, bytes):
+                        target.write(data)
+                    else:
+                        data.seek(0)
+                        shutil.copyfileobj(data, target)
+                    target.write(b'\0' * (_aligned(target.tell() - start) - (target.tell() - start)))
+                target.flush()
+                os.fsync(target.fileno())
+            # 正在读取旧文件的进程仍持有旧文件的映射，不受影响
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return header
+
+class CorpusSnapshot:
+    """
+    mmap映射的只读快照；取出的数组都是映射上的memoryview，不复制数据
+    不主动关闭映射：替换为新文件后，旧映射在没有引用时随对象回收
+    """
+    
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        buffer = memoryview(self._mmap)
+        if bytes(buffer[:len(MAGIC)]) != MAGIC:
+            raise ValueError(f'不是语料快照文件: {path}')
+        header_length, = HEADER_LENGTH.unpack_from(buffer, len(MAGIC))
+        data_start = len(MAGIC) + HEADER_LENGTH.size
+        header = json.loads(bytes(buffer[data_start:data_start + header_length]))
+        if header['byteorder'] != sys.byteorder:
+            raise ValueError('快照文件由不同字节序的机器生成，请重新生成')
+        data_start += header_length
+        
+        def section(name, fmt=None):
+            offset, size = header['sections'][name]
+            view = buffer[data_start + offset:data_start + offset + size]
+            return view.cast(fmt) if fmt else view
+        
+        self.header = header
+        self.version = header['corpus_version']
+        self.count = header['count']
+        self.difficulties = header['difficulties']
+        self.ids = section('ids', 'q')
+        self._difficulty_ids = section('difficulty_ids', 'q')
+        self._difficulty_offsets = section('difficulty_offsets', 'q')
+        self._chinese_offsets = section('chinese_offsets', 'q')
+        self._english_offsets = section('english_offsets', 'q')
+        self._codes = section('difficulty')
+        self._chinese = section('chinese')
+        self._english = section('english')
+        # 难度为空的句子（旧数据）还原为None
+        self._names = [name or None for name in self.difficulties]
+        self._groups = {
+            self._names[i]: self._difficulty_ids[self._difficulty_offsets[i]:self._difficulty_offsets[i + 1]]
+            for i in range(len(self._names))
+        }
+    
+    def difficulty_groups(self):
+        """{难度: 该难度的ID数组（升序）}，供抽样索引直接使用"""
+        return self._groups
+    
+    def _item(self, row):
+        """第row个句子的字典（字段顺序与Sentence.to_dict一致）"""
+        return {
+            'id': self.ids[row],
+            'chinese': str(self._chinese[self._chinese_offsets[row]:self._chinese_offsets[row + 1]], 'utf-8'),
+            'english': str(self._english[self._english_offsets[row]:self._english_offsets[row + 1]], 'utf-8'),
+            'difficulty': self._names[self._codes[row]]
+        }
+    
+    def get(self, sentence_id):
+        """按ID取句子字典（二分查找），不存在时返回None"""
+        row = bisect_left(self.ids, sentence_id)
+        if row == self.count or self.ids[row] != sentence_id:
+            return None
+        return self._item(row)
+    
+    def page(self, difficulties, after_id=None, limit=None):
+        """所选难度（为空表示全部）中id大于after_id的句子，按id升序最多limit条"""
+        if not difficulties:
+            start = bisect_right(self.ids, after_id) if after_id is not None else 0
+            end = self.count if limit is None else min(self.count, start + limit)
+            return [self._item(row) for row in range(start, end)]
+        
+        groups = self.difficulty_groups()
+        iterators = []
+        for difficulty in sorted(set(difficulties), key=difficulty_sort_key):
+            ids = groups.get(difficulty)
+            if ids is not None:
+                start = bisect_right(ids, after_id) if after_id is not None else 0
+                iterators.append(iter(ids[start:]))
+        return [self.get(sentence_id) for sentence_id in islice(heapq.merge(*iterators), limit)]
+    
+    def info(self):
+        """快照摘要"""
+        return {
+            'version': self.version,
+            'count': self.count,
+            'bytes': len(self._mmap),
+            'difficulties': {name or None: len(ids) for name, ids in self.difficulty_groups().items()}
+        }
+
+class SnapshotFile:
+    """
+    快照文件的加载状态：语料版本变化时检查文件是否已被替换，必要时重新映射
+    只返回与当前语料版本一致的快照，文件不存在、损坏或过期时返回None（调用方回退到数据库）
+    """
+    
+    def __init__(self, path):
+        self.path = path
+        self._snapshot = None
+        self._file_id = None
+    
+    def refresh(self, version):
+        """当前快照与语料版本不一致时，若文件已更换则重新加载"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._snapshot, self._file_id = None, None
+            return
+        file_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        if file_id == self._file_id:
+            return
+        try:
+            self._snapshot = CorpusSnapshot(self.path)
+        except (OSError, ValueError, KeyError) as e:
+            print(f"加载语料快照失败，改为从数据库读取: {e}", file=sys.stderr)
+            self._snapshot = None
+        self._file_id = file_id
+    
+    def current(self, version):
+        """与语料版本version一致的快照，没有时返回None"""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.version == version:
+            return snapshot
+        return None
+
+def rebuild_snapshot(engine=None):
+    """
+    配置了CORPUS_SNAPSHOT_PATH时重新生成快照（导入脚本在提交后调用），否则什么也不做
+    
+    Returns:
+        快照头部字典，未配置时为None
+    """
+    if not CORPUS_SNAPSHOT_PATH:
+        return None
+    if engine is None:
+        from database import engine
+    started = time.perf_counter()
+    try:
+        with engine.connect() as conn:
+            header = write_snapshot(conn, CORPUS_SNAPSHOT_PATH)
+    except (OSError, ValueError) as e:
+        # 数据已提交，快照版本落后时API进程会回退到数据库
+        print(f"更新语料快照失败: {e}，可稍后运行 python3 corpus_snapshot.py build 重试")
+        return None
+    print(f"语料快照已更新: {header['count']} 条句子（版本 {header['corpus_version']}），耗时 {time.perf_counter() - started:.2f}s")
+    return header
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='生成或查看语料只读快照')
+    parser.add_argument('command', nargs='?', choices=('build', 'info'), default='build', help='build: 生成快照；info: 查看快照')
+    parser.add_argument('--path', default=CORPUS_SNAPSHOT_PATH or os.path.join(BASE_DIR, 'corpus.snapshot'),
+                        help='快照文件（默认为CORPUS_SNAPSHOT_PATH）')
+    args = parser.parse_args()
+    
+    if args.command == 'info':
+        if not os.path.exists(args.path):
+            print(f"快照文件不存在: {args.path}")
+            sys.exit(1)
+        info = CorpusSnapshot(args.path).info()
+        print(f"文件: {args.path}（{info['bytes'] / 1024 / 1024:.1f}MB）")
+        print(f"语料版本: {info['version']}，句子数: {info['count']}")
+        for difficulty, count in info['difficulties'].items():
+            print(f"  - {difficulty}: {count} 条")
+        return
+    
+    from database import engine, init_db
+    init_db()
+    started = time.perf_counter()
+    with engine.connect() as conn:
+        header = write_snapshot(conn, args.path)
+    size = os.path.getsize(args.path)
+    print(f"已生成快照 {args.path}: {header['count']} 条句子（版本 {header['corpus_version']}），"
+          f"{size / 1024 / 1024:.1f}MB，耗时 {time.perf_counter() - started:.2f}s")
+    if not CORPUS_SNAPSHOT_PATH:
+        print("设置环境变量 CORPUS_SNAPSHOT_PATH 指向该文件后，API进程从快照读取句子，导入脚本会自动重建快照")
+
+if __name__ == '__main__':
+    main()
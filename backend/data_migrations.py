@@ -0,0 +1,107 @@
+"""
+语料数据迁移：每个步骤有一个版本号，由少数几条基于集合的SQL语句完成（不把句子逐行读入内存），步骤本身可重复执行
+待执行的步骤在同一个事务中完成，任一步骤失败时全部回滚；已执行到的版本记录在corpus_meta表中
+数据库结构的升级见 migrations.py
+"""
+import time
+from sqlalchemy import func, insert, or_, select, update
+from models import Sentence, sentence_hash, VALID_DIFFICULTIES, DEFAULT_DIFFICULTY
+from migrations import get_meta, set_meta
+
+# 数据版本号在corpus_meta表中的键
+DATA_VERSION_KEY = 'data_version'
+
+# 按内容哈希查询已有示例句子时每条语句的哈希数
+HASH_BATCH_SIZE = 500
+
+def label_unknown_difficulty(db):
+    """没有难度或难度无效的句子标记为默认难度（早期数据库的句子都是六级）"""
+    return db.execute(
+        update(Sentence)
+        .where(or_(Sentence.difficulty.is_(None), Sentence.difficulty.not_in(VALID_DIFFICULTIES)))
+        .values(difficulty=DEFAULT_DIFFICULTY)
+    ).rowcount
+
+def add_seed_sentences(db, difficulties):
+    """
+    补充示例句子：已存在的（按内容哈希）恢复难度标记，缺少的一次批量插入
+    
+    Returns:
+        修改和插入的行数
+    """
+    # init_data依赖database模块，在函数内导入
+    from init_data import load_seed_sentences
+    seeds = [
+        dict(item, content_hash=sentence_hash(item['chinese'], item['english']))
+        for item in load_seed_sentences() if item['difficulty'] in difficulties
+    ]
+    hashes = [seed['content_hash'] for seed in seeds]
+    existing = set()
+    for start in range(0, len(hashes), HASH_BATCH_SIZE):
+        existing.update(db.execute(
+            select(Sentence.content_hash).where(Sentence.content_hash.in_(hashes[start:start + HASH_BATCH_SIZE]))
+        ).scalars())
+    
+    changed = 0
+    for difficulty in difficulties:
+        found = [seed['content_hash'] for seed in seeds if seed['difficulty'] == difficulty and seed['content_hash'] in existing]
+        if found:
+            changed += db.execute(
+                update(Sentence)
+                .where(Sentence.content_hash.in_(found), Sentence.difficulty != difficulty)
+                .values(difficulty=difficulty)
+            ).rowcount
+    missing = [seed for seed in seeds if seed['content_hash'] not in existing]
+    if missing:
+        db.execute(insert(Sentence.__table__), missing)
+    return changed + len(missing)
+
+def add_cet4_seed(db):
+    """CET4示例句子"""
+    return add_seed_sentences(db, ('cet4',))
+
+def add_ielts_seed(db):
+    """IELTS示例句子"""
+    return add_seed_sentences(db, ('ielts',))
+
+# (版本号, 说明, 迁移函数)，只能在末尾追加；迁移函数返回修改的行数
+DATA_MIGRATIONS = [
+    (1, '没有难度或难度无效的句子标记为cet6', label_unknown_difficulty),
+    (2, '添加CET4示例句子', add_cet4_seed),
+    (3, '添加IELTS示例句子', add_ielts_seed),
+]
+
+def mark_data_current(db):
+    """刚导入示例数据的数据库不需要执行数据迁移，直接记录最新版本号（不提交）"""
+    set_meta(db, DATA_VERSION_KEY, DATA_MIGRATIONS[-1][0])
+
+def difficulty_counts(db):
+    """各难度的句子数（一次GROUP BY，走难度索引）"""
+    rows = db.execute(
+        select(Sentence.difficulty, func.count()).group_by(Sentence.difficulty).order_by(Sentence.difficulty)
+    ).all()
+    return {difficulty: count for difficulty, count in rows}
+
+def run_data_migrations(db, redo=False):
+    """
+    在一个事务中依次执行尚未执行的数据迁移（不提交），打印每个步骤修改的行数和耗时
+    
+    Args:
+        redo: 重新执行全部步骤（步骤可重复执行）
+    
+    Returns:
+        [(版本号, 说明, 修改的行数, 耗时秒数), ...]
+    """
+    current = 0 if redo else get_meta(db, DATA_VERSION_KEY)
+    results = []
+    for version, description, step in DATA_MIGRATIONS:
+        if version <= current:
+            continue
+        started = time.perf_counter()
+        changed = step(db)
+        elapsed = time.perf_counter() - started
+        print(f"[v{version}] {description}: 修改 {changed} 行，耗时 {elapsed:.2f}s")
+        results.append((version, description, changed, elapsed))
+    if results:
+        set_meta(db, DATA_VERSION_KEY, max(get_meta(db, DATA_VERSION_KEY), DATA_MIGRATIONS[-1][0]))
+    return results
@@ -1,21 +1,138 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
-from models import Base, Sentence
-import os
+from models import Base, Sentence, CorpusMeta
+from migrations import upgrade_schema, mark_schema_current, schema_is_current
+from config import DATABASE_URL, DATABASE_READ_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW
 
-# 数据库文件路径
-DB_PATH = os.path.join(os.path.dirname(__file__), 'sentences.db')
-DATABASE_URL = f'sqlite:///{DB_PATH}'
+# 语料版本号在corpus_meta表中的键
+CORPUS_VERSION_KEY = 'corpus_version'
 
-# 创建数据库引擎
-engine = create_engine(DATABASE_URL, echo=False)
+# SQLite连接参数：WAL模式下读不阻塞写，synchronous=NORMAL在WAL下不会损坏数据
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # 负数表示KB，即64MB
+    'temp_store': 'MEMORY',
+    'busy_timeout': 5000,
+}
+
+# 各数据库对应的异步驱动（ASGI接口使用）
+ASYNC_DRIVERS = {'sqlite': 'aiosqlite', 'postgresql': 'asyncpg'}
+
+def create_db_engine(url, read_only=False, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW):
+    """
+    根据URL创建数据库引擎（SQLite或PostgreSQL等服务端数据库）
+    
+    Args:
+        read_only: 为True时连接拒绝一切写操作
+        pool_size: 连接池大小
+        max_overflow: 连接池允许临时超出的连接数
+    """
+    if make_url(url).get_backend_name() == 'sqlite':
+        return create_sqlite_engine(url, read_only, pool_size, max_overflow)
+    
+    connect_args = {}
+    if read_only:
+        # PostgreSQL：会话内的事务默认只读
+        connect_args['options'] = '-c default_transaction_read_only=on'
+    return create_engine(
+        url,
+        echo=False,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        connect_args=connect_args
+    )
+
+def create_sqlite_engine(url, read_only=False, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW):
+    """创建带性能参数的SQLite引擎"""
+    engine = create_engine(
+        url,
+        echo=False,
+        connect_args={'check_same_thread': False, 'timeout': 30},
+        **_sqlite_pool_args(url, pool_size, max_overflow)
+    )
+    _apply_sqlite_pragmas(engine, read_only)
+    return engine
+
+def create_async_db_engine(url, read_only=False, pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW):
+    """
+    创建异步引擎（供ASGI接口使用），URL中的同步驱动自动替换为对应的异步驱动
+    SQLite使用aiosqlite，PostgreSQL使用asyncpg
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from sqlalchemy.pool import AsyncAdaptedQueuePool
+    
+    url = to_async_url(url)
+    if url.get_backend_name() == 'sqlite':
+        pool_args = _sqlite_pool_args(url, pool_size, max_overflow)
+        if pool_args:
+            # aiosqlite默认每次新建连接，文件数据库改为复用连接
+            pool_args['poolclass'] = AsyncAdaptedQueuePool
+        engine = create_async_engine(url, echo=False, connect_args={'timeout': 30}, **pool_args)
+        _apply_sqlite_pragmas(engine.sync_engine, read_only)
+        return engine
+    
+    connect_args = {}
+    if read_only:
+        connect_args['server_settings'] = {'default_transaction_read_only': 'on'}
+    return create_async_engine(
+        url,
+        echo=False,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_pre_ping=True,
+        connect_args=connect_args
+    )
+
+def to_async_url(url):
+    """把数据库URL的驱动替换为异步驱动"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'不支持异步访问的数据库: {backend}')
+    return url.set(drivername=f'{backend}+{ASYNC_DRIVERS[backend]}')
+
+def _sqlite_pool_args(url, pool_size, max_overflow):
+    """文件数据库使用连接池；内存数据库使用SQLAlchemy默认的单连接池"""
+    database = make_url(url).database
+    if database and database != ':memory:':
+        return {'pool_size': pool_size, 'max_overflow': max_overflow}
+    return {}
+
+def _apply_sqlite_pragmas(engine, read_only):
+    """每个新连接执行性能参数，只读引擎额外禁止写操作"""
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        if read_only:
+            cursor.execute('PRAGMA query_only=ON')
+        cursor.close()
+
+# 创建数据库引擎（读写）和只读引擎（供读接口使用）
+engine = create_db_engine(DATABASE_URL)
+read_engine = create_db_engine(DATABASE_READ_URL, read_only=True)
 
 # 创建会话
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
 
 def init_db():
-    """初始化数据库，创建表"""
+    """
+    初始化数据库：创建表，并把已有数据库升级到最新结构（可重复调用）
+    已是最新结构时只查询一次结构版本号，不再逐表检查（每个进程启动和每个数据脚本都会调用）
+    """
+    if schema_is_current(engine):
+        return
+    is_new = not inspect(engine).has_table(Sentence.__tablename__)
     Base.metadata.create_all(bind=engine)
+    if is_new:
+        mark_schema_current(engine)
+    upgrade_schema(engine)
 
 def get_db():
     """获取数据库会话"""
@@ -25,3 +142,23 @@ def get_db():
     finally:
         db.close()
 
+def get_read_db():
+    """获取只读数据库会话"""
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+def get_corpus_version(db):
+    """读取语料版本号，句子表每次被修改后递增"""
+    meta = db.get(CorpusMeta, CORPUS_VERSION_KEY)
+    return meta.value if meta else 0
+
+def bump_corpus_version(db):
+    """递增语料版本号，需与修改句子表的操作在同一事务中提交"""
+    updated = db.query(CorpusMeta).filter(
+        CorpusMeta.key == CORPUS_VERSION_KEY
+    ).update({CorpusMeta.value: CorpusMeta.value + 1}, synchronize_session=False)
+    if not updated:
+        db.add(CorpusMeta(key=CORPUS_VERSION_KEY, value=1))
@@ -0,0 +1,42 @@
+"""
+gunicorn配置: gunicorn -c gunicorn.conf.py wsgi:app
+各项均可通过环境变量覆盖
+"""
+import multiprocessing
+import os
+
+# 监听地址，与开发服务器端口一致，前端代理无需修改
+bind = os.environ.get('BIND', '0.0.0.0:5001')
+
+# 多进程 + 每进程多线程：同步的数据库查询在线程中并发执行
+workers = int(os.environ.get('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8)))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 4))
+
+# 主进程先导入应用（执行一次init_db），worker通过fork共享已加载的代码
+preload_app = True
+
+# 收到SIGTERM后停止接收新连接，等待进行中的请求完成的最长时间（秒）
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+timeout = int(os.environ.get('WORKER_TIMEOUT', 60))
+keepalive = 5
+
+# 处理一定数量的请求后重启worker，防止内存缓慢增长
+max_requests = int(os.environ.get('MAX_REQUESTS', 10000))
+max_requests_jitter = 1000
+
+# 访问日志输出位置，'-'为标准输出，设为空字符串时关闭
+accesslog = os.environ.get('ACCESS_LOG', '-') or None
+errorlog = '-'
+
+def post_fork(server, worker):
+    """主进程中init_db打开的连接不能跨进程共用，worker中丢弃继承的连接池（不关闭父进程的连接）"""
+    from database import engine, read_engine
+    engine.dispose(close=False)
+    read_engine.dispose(close=False)
+
+def worker_exit(server, worker):
+    """worker退出时关闭数据库连接"""
+    from database import engine, read_engine
+    engine.dispose()
+    read_engine.dispose()
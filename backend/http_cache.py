@@ -0,0 +1,91 @@
+"""
+HTTP缓存与压缩：以语料版本号作为句子接口的强ETag，支持条件请求（304）；较大的JSON响应按Accept-Encoding压缩
+与框架无关，同步（Flask）和异步（ASGI）接口共用
+"""
+import gzip
+
+try:
+    import brotli
+except ImportError:  # 可选依赖，未安装时只使用gzip
+    brotli = None
+
+# 小于该字节数的响应不压缩（压缩收益抵不上开销）
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+# 按ID获取的句子内容基本不变，允许浏览器和代理缓存；列表每次向服务端确认（未变化时返回304）
+SENTENCE_CACHE_CONTROL = 'public, max-age=86400'
+LIST_CACHE_CONTROL = 'no-cache'
+
+def corpus_etag(version):
+    """语料版本号对应的强ETag，句子表每次修改后版本号递增，ETag随之变化"""
+    return f'"corpus-{version}"'
+
+def _opaque_tag(tag):
+    """去掉弱校验前缀和压缩后缀，得到用于比较的标识"""
+    tag = tag.strip()
+    if tag.startswith('W/'):
+        tag = tag[2:]
+    for encoding in ('gzip', 'br'):
+        suffix = f'-{encoding}"'
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)] + '"'
+    return tag
+
+def etag_matches(if_none_match, etag):
+    """
+    If-None-Match是否命中当前ETag（弱比较：反向代理自行压缩时常把ETag改为W/前缀的弱ETag）
+    
+    Returns:
+        命中的客户端标签（304响应原样返回），未命中时为None
+    """
+    if not if_none_match:
+        return None
+    if if_none_match.strip() == '*':
+        return etag
+    current = _opaque_tag(etag)
+    for tag in if_none_match.split(','):
+        if _opaque_tag(tag) == current:
+            return tag.strip()
+    return None
+
+def encoded_etag(etag, encoding):
+    """压缩后的表示使用不同的ETag（同一URL的不同编码不能共用强ETag）"""
+    if not encoding or not etag.endswith('"'):
+        return etag
+    return f'{etag[:-1]}-{encoding}"'
+
+def choose_encoding(accept_encoding):
+    """按Accept-Encoding选择压缩方式：br（已安装brotli时）优先于gzip，都不接受时返回None"""
+    accepted = {}
+    for part in (accept_encoding or '').split(','):
+        name, _, params = part.strip().partition(';')
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if name:
+            accepted[name.strip().lower()] = quality
+    if brotli is not None and accepted.get('br', 0) > 0:
+        return 'br'
+    if accepted.get('gzip', accepted.get('*', 0)) > 0:
+        return 'gzip'
+    return None
+
+def should_compress(status_code, content_type, length):
+    """只压缩成功的、足够大的JSON响应"""
+    return (
+        status_code == 200
+        and (content_type or '').startswith('application/json')
+        and length >= COMPRESS_MIN_BYTES
+    )
+
+def compress(body, encoding):
+    """按指定方式压缩响应体"""
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
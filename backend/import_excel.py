@@ -1,20 +1,106 @@
 """
-从Excel文件导入句子数据
-Excel格式：第一列=中文，第二列=英文，第三列=难度（可选）
+从Excel/CSV文件导入句子数据
+文件格式：第一列=中文，第二列=英文，第三列=难度（可选）
 """
+import argparse
+import json
 import sys
 import os
+import time
 import pandas as pd
-from database import SessionLocal, init_db
-from models import Sentence
+from sqlalchemy import insert, select
+from database import SessionLocal, init_db, bump_corpus_version
+from models import Sentence, sentence_hash, VALID_DIFFICULTIES, DEFAULT_DIFFICULTY
+from sheet_reader import iter_row_chunks, SheetFormatError
+from search_index import update_search_index
+from near_duplicates import DEFAULT_THRESHOLD, NearDuplicateIndex
+from corpus_snapshot import rebuild_snapshot
 
-def import_from_excel(excel_path, skip_duplicates=True):
+# 每次从文件读取的行数
+READ_CHUNK_SIZE = 20000
+# 每条INSERT语句批量写入的行数
+INSERT_BATCH_SIZE = 5000
+# 每个事务写入的行数
+TRANSACTION_SIZE = 50000
+
+# 近似重复的处理方式：skip=不导入，flag=照常导入并在报告中列出
+NEAR_DUPLICATE_ACTIONS = ('skip', 'flag')
+# 终端中列出的近似重复条数（其余写入报告文件）
+NEAR_DUPLICATE_PREVIEW = 10
+
+def normalize_frame(df):
+    """
+    规范化原始表格：去除首尾空白、过滤空行、校验难度、计算内容哈希
+    
+    Returns:
+        包含 chinese, english, difficulty, content_hash 列的DataFrame
     """
-    从Excel文件导入数据
+    chinese = df.iloc[:, 0].fillna('').astype(str).str.strip()
+    english = df.iloc[:, 1].fillna('').astype(str).str.strip()
+    
+    # 跳过空行
+    valid = (chinese != '') & (english != '') & (chinese != 'nan') & (english != 'nan')
+    
+    if df.shape[1] >= 3:
+        difficulty = df.iloc[:, 2].fillna('').astype(str).str.strip().str.lower()
+        difficulty = difficulty.where(difficulty.isin(VALID_DIFFICULTIES), DEFAULT_DIFFICULTY)
+    else:
+        difficulty = pd.Series(DEFAULT_DIFFICULTY, index=df.index)
+    
+    rows = pd.DataFrame({
+        'chinese': chinese[valid],
+        'english': english[valid],
+        'difficulty': difficulty[valid]
+    })
+    rows['content_hash'] = [sentence_hash(c, e) for c, e in zip(rows['chinese'], rows['english'])]
+    return rows
+
+def load_existing_hashes(db):
+    """一次查询读取数据库中全部句子的内容哈希（走content_hash唯一索引）"""
+    result = db.execute(select(Sentence.content_hash).where(Sentence.content_hash.isnot(None)))
+    return set(result.scalars())
+
+def build_near_duplicate_index(db, threshold):
+    """用数据库中已有的句子建立近似重复索引"""
+    index = NearDuplicateIndex(threshold)
+    existing = db.execute(select(Sentence.id, Sentence.english).order_by(Sentence.id)).all()
+    index.add([('id', row.id) for row in existing], [row.english for row in existing])
+    return index
+
+def bulk_insert(db, rows, keep_hash=True):
+    """
+    按批次执行多行INSERT（不提交）
     
     Args:
-        excel_path: Excel文件路径
+        keep_hash: 是否写入内容哈希；允许重复导入时不写入，以免违反唯一索引
+    """
+    records = rows[['chinese', 'english', 'difficulty', 'content_hash']].to_dict('records')
+    if not keep_hash:
+        for record in records:
+            record['content_hash'] = None
+    for start in range(0, len(records), INSERT_BATCH_SIZE):
+        db.execute(insert(Sentence.__table__), records[start:start + INSERT_BATCH_SIZE])
+    return len(records)
+
+def commit_import(db):
+    """提交事务：新句子加入全文索引，并递增语料版本号通知API进程刷新缓存"""
+    update_search_index(db)
+    bump_corpus_version(db)
+    db.commit()
+
+def import_from_excel(excel_path, skip_duplicates=True, dry_run=False, max_rows=None,
+                      near_duplicates=None, similarity=DEFAULT_THRESHOLD, report_path=None):
+    """
+    从Excel/CSV文件导入数据（按块流式读取，内存占用与文件大小无关）
+    
+    Args:
+        excel_path: Excel/CSV文件路径
         skip_duplicates: 是否跳过重复的句子（基于中文和英文）
+        dry_run: 只解析和判重，不写入数据库
+        max_rows: 文件最大行数，超出时中止导入
+        near_duplicates: 英文近似重复（大小写、标点或个别词不同）的处理方式，skip或flag，None为不检查
+        similarity: 判定为近似重复的最小相似度
+        report_path: 近似重复报告（JSON）的输出路径
     """
     # 检查文件是否存在
     if not os.path.exists(excel_path):
@@ -26,92 +112,94 @@ def import_from_excel(excel_path, skip_duplicates=True):
     db = SessionLocal()
     
     try:
-        # 读取Excel文件
-        print(f"正在读取Excel文件: {excel_path}")
-        df = pd.read_excel(excel_path, header=None)
-        
-        # 检查列数
-        if df.shape[1] < 2:
-            print("错误：Excel文件至少需要2列（中文、英文）")
-            return False
-        
-        # 提取数据
-        # 第一列：中文，第二列：英文，第三列：难度（可选）
-        chinese_col = df.iloc[:, 0]
-        english_col = df.iloc[:, 1]
-        difficulty_col = df.iloc[:, 2] if df.shape[1] >= 3 else None
+        started = time.perf_counter()
         
         # 统计信息
-        total_rows = len(df)
+        total_rows = 0
         imported_count = 0
-        skipped_count = 0
-        error_count = 0
+        pending_count = 0
+        empty_count = 0
+        duplicate_count = 0
+        near_report = []
+        
+        # 与数据库判重只需一次查询，之后新导入的哈希也加入该集合
+        seen_hashes = load_existing_hashes(db) if skip_duplicates else set()
         
-        print(f"\n开始导入，共 {total_rows} 行数据...")
+        # 近似重复：已有句子建立一次索引，之后每块新句子与索引比较，没有近似重复的句子加入索引
+        near_index = None
+        if near_duplicates:
+            near_index = build_near_duplicate_index(db, similarity)
+            print(f"已为 {len(near_index)} 条已有句子建立近似重复索引")
         
-        # 遍历每一行
-        for index, row in df.iterrows():
-            try:
-                chinese = str(chinese_col.iloc[index]).strip()
-                english = str(english_col.iloc[index]).strip()
-                
-                # 跳过空行
-                if not chinese or not english or chinese == 'nan' or english == 'nan':
-                    skipped_count += 1
-                    continue
-                
-                # 获取难度（如果有第三列）
-                if difficulty_col is not None:
-                    difficulty = str(difficulty_col.iloc[index]).strip().lower()
-                    # 验证难度值
-                    if difficulty not in ['cet4', 'cet6', 'ielts']:
-                        difficulty = 'cet6'  # 默认值
-                else:
-                    difficulty = 'cet6'  # 默认值
-                
-                # 检查是否重复
-                if skip_duplicates:
-                    existing = db.query(Sentence).filter(
-                        Sentence.chinese == chinese,
-                        Sentence.english == english
-                    ).first()
-                    if existing:
-                        skipped_count += 1
-                        continue
-                
-                # 创建新记录
-                sentence = Sentence(
-                    chinese=chinese,
-                    english=english,
-                    difficulty=difficulty
+        print(f"正在读取文件: {excel_path}")
+        for chunk in iter_row_chunks(excel_path, chunk_size=READ_CHUNK_SIZE, max_rows=max_rows):
+            first_row = total_rows + 1
+            total_rows += len(chunk)
+            
+            # 1. 规范化并过滤空行
+            rows = normalize_frame(pd.DataFrame(chunk))
+            empty_count += len(chunk) - len(rows)
+            
+            # 2. 文件内判重，3. 与数据库判重
+            if skip_duplicates:
+                before = len(rows)
+                rows = rows.drop_duplicates(subset='content_hash')
+                rows = rows[~rows['content_hash'].isin(seen_hashes)]
+                seen_hashes.update(rows['content_hash'])
+                duplicate_count += before - len(rows)
+            
+            # 英文近似重复：与已有句子和文件中更靠前的行比较
+            if near_index is not None and len(rows):
+                row_numbers = [first_row + position for position in rows.index]
+                matches = near_index.match_and_add([('row', n) for n in row_numbers], rows['english'].tolist())
+                near_report.extend(
+                    {'row': n, 'english': english, 'similar_to': dict([match[0]]), 'similarity': match[1]}
+                    for n, english, match in zip(row_numbers, rows['english'], matches) if match is not None
                 )
-                db.add(sentence)
-                imported_count += 1
-                
-                # 每100条提交一次
-                if imported_count % 100 == 0:
-                    db.commit()
-                    print(f"已导入 {imported_count} 条...")
-                    
-            except Exception as e:
-                error_count += 1
-                print(f"第 {index + 1} 行导入失败: {e}")
+                if near_duplicates == 'skip':
+                    rows = rows[[match is None for match in matches]]
+            
+            # 4. 批量写入，累计满一个事务再提交
+            if dry_run:
+                imported_count += len(rows)
                 continue
+            pending_count += bulk_insert(db, rows, keep_hash=skip_duplicates)
+            if pending_count >= TRANSACTION_SIZE:
+                commit_import(db)
+                imported_count += pending_count
+                pending_count = 0
+                print(f"已导入 {imported_count} 条...")
         
         # 提交剩余的数据
-        db.commit()
+        if pending_count > 0:
+            commit_import(db)
+            imported_count += pending_count
+        if imported_count and not dry_run:
+            rebuild_snapshot()
         
         # 显示统计信息
+        elapsed = time.perf_counter() - started
         print("\n" + "="*50)
-        print("导入完成！")
+        print("试运行完成（未写入数据库）！" if dry_run else "导入完成！")
         print(f"总计: {total_rows} 行")
-        print(f"成功导入: {imported_count} 条")
-        print(f"跳过: {skipped_count} 条（空行或重复）")
-        print(f"错误: {error_count} 条")
+        print(f"{'可导入' if dry_run else '成功导入'}: {imported_count} 条")
+        print(f"跳过: {empty_count} 条空行，{duplicate_count} 条重复")
+        if near_index is not None:
+            action = '跳过' if near_duplicates == 'skip' else '已导入并标记'
+            print(f"近似重复: {len(near_report)} 条（{action}）")
+        print(f"耗时: {elapsed:.2f}s，吞吐: {total_rows / elapsed if elapsed > 0 else 0:.0f} 行/秒")
         print("="*50)
         
-        return True
+        if near_report:
+            report_near_duplicates(near_report, report_path)
         
+        return True
+    
+    except SheetFormatError as e:
+        # 已提交的批次保留，未提交的部分回滚
+        db.rollback()
+        print(f"错误：{e}")
+        return False
     except Exception as e:
         db.rollback()
         print(f"导入过程中出错: {e}")
@@ -121,21 +209,44 @@ def import_from_excel(excel_path, skip_duplicates=True):
     finally:
         db.close()
 
+def report_near_duplicates(report, report_path=None):
+    """打印前几条近似重复，完整列表写入JSON文件"""
+    for entry in report[:NEAR_DUPLICATE_PREVIEW]:
+        similar_to = f"第{entry['similar_to']['row']}行" if 'row' in entry['similar_to'] else f"句子#{entry['similar_to']['id']}"
+        print(f"第{entry['row']}行 与{similar_to}相似({entry['similarity']}): {entry['english']}")
+    if report_path:
+        with open(report_path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"近似重复报告已写入 {report_path}")
+    elif len(report) > NEAR_DUPLICATE_PREVIEW:
+        print(f"... 共 {len(report)} 条，使用 --report 输出完整列表")
+
 def main():
     """主函数"""
-    if len(sys.argv) < 2:
-        print("用法: python import_excel.py <excel_file_path>")
-        print("\n示例:")
-        print("  python import_excel.py data.xlsx")
-        print("  python import_excel.py /path/to/data.xlsx")
-        print("\nExcel格式:")
-        print("  第一列: 中文")
-        print("  第二列: 英文")
-        print("  第三列: 难度 (可选: cet4, cet6, ielts)")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description='从Excel/CSV文件导入句子数据',
+        epilog='文件格式(.xlsx/.xls/.csv/.tsv): 第一列中文，第二列英文，第三列难度 (可选: cet4, cet6, ielts)'
+    )
+    parser.add_argument('excel_path', help='Excel/CSV文件路径')
+    parser.add_argument('--dry-run', action='store_true', help='只解析和判重，不写入数据库')
+    parser.add_argument('--keep-duplicates', action='store_true', help='不跳过重复的句子')
+    parser.add_argument('--max-rows', type=int, default=None, help='文件最大行数，超出时中止导入')
+    parser.add_argument('--near-duplicates', choices=NEAR_DUPLICATE_ACTIONS,
+                        help='英文近似重复的处理方式：skip=不导入，flag=导入并列出（默认不检查）')
+    parser.add_argument('--similarity', type=float, default=DEFAULT_THRESHOLD,
+                        help=f'判定为近似重复的最小相似度（默认{DEFAULT_THRESHOLD}）')
+    parser.add_argument('--report', help='近似重复报告（JSON）的输出路径')
+    args = parser.parse_args()
     
-    excel_path = sys.argv[1]
-    success = import_from_excel(excel_path)
+    success = import_from_excel(
+        args.excel_path,
+        skip_duplicates=not args.keep_duplicates,
+        dry_run=args.dry_run,
+        max_rows=args.max_rows,
+        near_duplicates=args.near_duplicates,
+        similarity=args.similarity,
+        report_path=args.report
+    )
     
     if success:
         sys.exit(0)
@@ -144,4 +255,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,308 @@
+"""
+请求级指标：按路由统计请求数、延迟直方图和错误数，以及每个请求的数据库查询次数和耗时（SQLAlchemy事件），以Prometheus文本格式输出
+可选的采样分析器定时采集处理中请求的调用栈，慢请求的采样以折叠栈格式（flamegraph.pl、speedscope可直接读取）写入文件
+指标保存在进程内，gunicorn多worker部署时每个worker各自统计，以worker标签（进程号）区分
+"""
+import itertools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+
+# Prometheus文本格式的Content-Type
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# 请求延迟和数据库耗时的直方图分桶（秒）
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# 每个请求的数据库查询次数分桶
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# 没有匹配到路由的请求（404等）统一记为该路由，避免标签数量随URL增长
+UNMATCHED_ROUTE = 'unmatched'
+
+class Histogram:
+    """累计分桶直方图（非线程安全，由RequestMetrics加锁）"""
+    
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        """记录一个观测值"""
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        self.sum += value
+        self.count += 1
+    
+    def samples(self):
+        """(le, 累计数) 列表，最后一项为+Inf"""
+        cumulative = 0
+        result = []
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            result.append((_format_value(bound), cumulative))
+        result.append(('+Inf', self.count))
+        return result
+
+class RequestStats:
+    """单个请求处理期间累计的数据"""
+    
+    __slots__ = ('started', 'queries', 'query_seconds', 'status', 'exception')
+    
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.status = None
+        self.exception = None
+
+# 当前请求的统计（Flask每个请求在独立的线程/上下文中处理）
+_current = ContextVar('request_stats', default=None)
+
+def record_exception(exc):
+    """记录请求处理中被捕获的异常（处理函数自行返回500时，错误计数按异常类型区分）"""
+    stats = _current.get()
+    if stats is not None:
+        stats.exception = type(exc).__name__
+
+class RequestMetrics:
+    """进程内的请求指标"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.errors = Counter()
+        self.latency = {}
+        self.db_queries = {}
+        self.db_seconds = {}
+        self.started_at = time.time()
+    
+    def observe(self, method, route, status, seconds, queries, query_seconds, exception=None):
+        """记录一个处理完成的请求"""
+        with self._lock:
+            self.requests[(method, route, str(status))] += 1
+            if status >= 500:
+                self.errors[(route, exception or 'none')] += 1
+            self._histogram(self.latency, (method, route), LATENCY_BUCKETS).observe(seconds)
+            self._histogram(self.db_queries, (route,), QUERY_COUNT_BUCKETS).observe(queries)
+            self._histogram(self.db_seconds, (route,), LATENCY_BUCKETS).observe(query_seconds)
+    
+    @staticmethod
+    def _histogram(histograms, key, buckets):
+        """按标签取直方图，不存在时创建"""
+        histogram = histograms.get(key)
+        if histogram is None:
+            histogram = histograms[key] = Histogram(buckets)
+        return histogram
+    
+    def render(self):
+        """Prometheus文本格式"""
+        worker = str(os.getpid())
+        lines = []
+        with self._lock:
+            lines += _header('http_requests_total', 'counter', '按路由、方法和状态码统计的请求数')
+            for (method, route, status), count in sorted(self.requests.items()):
+                labels = {'method': method, 'route': route, 'status': status, 'worker': worker}
+                lines.append(_sample('http_requests_total', labels, count))
+            
+            lines += _header('http_request_errors_total', 'counter', '返回5xx的请求数，按被捕获的异常类型区分')
+            for (route, exception), count in sorted(self.errors.items()):
+                labels = {'route': route, 'exception': exception, 'worker': worker}
+                lines.append(_sample('http_request_errors_total', labels, count))
+            
+            lines += _render_histograms(
+                'http_request_duration_seconds', '请求处理耗时', self.latency, ('method', 'route'), worker
+            )
+            lines += _render_histograms(
+                'db_queries_per_request', '每个请求执行的数据库查询次数', self.db_queries, ('route',), worker
+            )
+            lines += _render_histograms(
+                'db_query_seconds_per_request', '每个请求的数据库查询总耗时', self.db_seconds, ('route',), worker
+            )
+        
+        lines += _header('process_start_time_seconds', 'gauge', '进程（worker）启动时间')
+        lines.append(_sample('process_start_time_seconds', {'worker': worker}, self.started_at))
+        return '\n'.join(lines) + '\n'
+
+def _format_value(value):
+    """数值的文本表示（整数不带小数点）"""
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+def _escape(value):
+    """标签值转义"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+def _sample(name, labels, value):
+    """一行样本"""
+    label_text = ','.join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+    return f'{name}{{{label_text}}} {_format_value(value)}'
+
+def _header(name, kind, description):
+    """HELP和TYPE行"""
+    return [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+
+def _render_histograms(name, description, histograms, label_names, worker):
+    """一组直方图的样本行"""
+    lines = _header(name, 'histogram', description)
+    for key, histogram in sorted(histograms.items()):
+        labels = dict(zip(label_names, key), worker=worker)
+        for bound, count in histogram.samples():
+            lines.append(_sample(f'{name}_bucket', dict(labels, le=bound), count))
+        lines.append(_sample(f'{name}_sum', labels, histogram.sum))
+        lines.append(_sample(f'{name}_count', labels, histogram.count))
+    return lines
+
+def instrument_engine(engine):
+    """在引擎上注册查询计时事件，查询次数和耗时计入当前请求"""
+    @event.listens_for(engine, 'before_cursor_execute')
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+    
+    @event.listens_for(engine, 'after_cursor_execute')
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info['query_started'].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += time.perf_counter() - started
+
+class SlowRequestProfiler:
+    """
+    采样分析器：后台线程每隔interval秒采集处理中请求所在线程的调用栈，
+    请求耗时超过阈值时把采样结果以折叠栈格式（每行"函数;函数;... 次数"）写入output_dir
+    """
+    
+    def __init__(self, threshold_ms, output_dir, interval=0.005):
+        self.threshold = threshold_ms / 1000
+        self.output_dir = output_dir
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._active = {}
+        self._thread = None
+        self._pid = None
+        # 文件名中的序号，同一秒内的多个慢请求不会互相覆盖
+        self._sequence = itertools.count(1)
+    
+    def start(self, thread_id):
+        """开始采集线程thread_id（当前请求）的调用栈"""
+        self._ensure_thread()
+        with self._lock:
+            self._active[thread_id] = Counter()
+    
+    def stop(self, thread_id, route, seconds):
+        """
+        停止采集；请求耗时超过阈值时写入火焰图数据
+        
+        Returns:
+            写入的文件路径，未写入时为None
+        """
+        with self._lock:
+            samples = self._active.pop(thread_id, None)
+        if not samples or seconds < self.threshold:
+            return None
+        os.makedirs(self.output_dir, exist_ok=True)
+        name = re.sub(r'[^A-Za-z0-9_-]+', '_', route).strip('_') or 'root'
+        path = os.path.join(
+            self.output_dir, f'{time.strftime("%Y%m%d-%H%M%S")}-{os.getpid()}-{next(self._sequence)}-{name}-{int(seconds * 1000)}ms.folded'
+        )
+        with open(path, 'w') as f:
+            for stack, count in samples.most_common():
+                f.write(f'{stack} {count}\n')
+        return path
+    
+    def _ensure_thread(self):
+        """启动采样线程；gunicorn预加载应用时线程不会随fork复制，每个worker各自启动"""
+        pid = os.getpid()
+        if self._pid == pid and self._thread is not None:
+            return
+        with self._lock:
+            if self._pid == pid and self._thread is not None:
+                return
+            self._pid = pid
+            self._active = {}
+            self._thread = threading.Thread(target=self._run, name='slow-request-profiler', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        """采样循环"""
+        while True:
+            time.sleep(self.interval)
+            with self._lock:
+                if not self._active:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, samples in self._active.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        samples[_fold(frame)] += 1
+
+def _fold(frame):
+    """调用栈的折叠表示：从最外层到最内层，以分号连接"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f'{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})')
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+def instrument_app(app, engines, profiler=None):
+    """
+    为Flask应用注册请求计时和数据库查询统计
+    
+    Args:
+        engines: 需要统计查询的SQLAlchemy引擎（同一引擎只注册一次）
+        profiler: 可选的SlowRequestProfiler
+    
+    Returns:
+        RequestMetrics，用于输出/metrics
+    """
+    from flask import request
+    
+    metrics = RequestMetrics()
+    for engine in {id(engine): engine for engine in engines}.values():
+        instrument_engine(engine)
+    
+    @app.before_request
+    def begin_request_metrics():
+        _current.set(RequestStats())
+        if profiler is not None:
+            profiler.start(threading.get_ident())
+    
+    @app.after_request
+    def record_response_status(response):
+        stats = _current.get()
+        if stats is not None:
+            stats.status = response.status_code
+        return response
+    
+    @app.teardown_request
+    def end_request_metrics(exc):
+        stats = _current.get()
+        if stats is None:
+            return
+        _current.set(None)
+        seconds = time.perf_counter() - stats.started
+        route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+        status = stats.status
+        if exc is not None:
+            status = 500
+            stats.exception = type(exc).__name__
+        metrics.observe(
+            request.method, route, status or 500, seconds, stats.queries, stats.query_seconds, stats.exception
+        )
+        if profiler is not None:
+            path = profiler.stop(threading.get_ident(), route, seconds)
+            if path:
+                app.logger.warning('慢请求 %s %s 耗时 %.0fms，调用栈采样已写入 %s', request.method, route, seconds * 1000, path)
+    
+    return metrics
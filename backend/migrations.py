@@ -0,0 +1,153 @@
+"""
+数据库结构升级
+每个步骤有一个版本号，已执行到的版本记录在corpus_meta表中；步骤本身可重复执行
+"""
+from sqlalchemy import inspect, select, text, update
+from sqlalchemy.exc import DBAPIError
+from models import Sentence, CorpusMeta, ReviewState, PracticeSession, sentence_hash
+
+# 结构版本号在corpus_meta表中的键
+SCHEMA_VERSION_KEY = 'schema_version'
+
+# 回填内容哈希时每批处理的行数
+BACKFILL_BATCH_SIZE = 5000
+
+def get_meta(conn, key):
+    """读取corpus_meta中的值，不存在时为0"""
+    value = conn.execute(select(CorpusMeta.value).where(CorpusMeta.key == key)).scalar()
+    return value or 0
+
+def set_meta(conn, key, value):
+    """写入corpus_meta中的值"""
+    updated = conn.execute(
+        update(CorpusMeta).where(CorpusMeta.key == key).values(value=value)
+    ).rowcount
+    if not updated:
+        conn.execute(CorpusMeta.__table__.insert().values(key=key, value=value))
+
+def _sentence_index(name):
+    return next(index for index in Sentence.__table__.indexes if index.name == name)
+
+def add_sentence_indexes(conn):
+    """难度索引和(中文, 英文)索引"""
+    _sentence_index('ix_sentences_difficulty_id').create(conn, checkfirst=True)
+    _sentence_index('ix_sentences_chinese_english').create(conn, checkfirst=True)
+
+def add_content_hash(conn):
+    """添加内容哈希列、回填已有数据并建立唯一索引"""
+    columns = {column['name'] for column in inspect(conn).get_columns('sentences')}
+    if 'content_hash' not in columns:
+        conn.execute(text('ALTER TABLE sentences ADD COLUMN content_hash VARCHAR(40)'))
+    
+    # 按id分批回填
+    table = Sentence.__table__
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            select(table.c.id, table.c.chinese, table.c.english)
+            .where(table.c.content_hash.is_(None), table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BACKFILL_BATCH_SIZE)
+        ).all()
+        if not rows:
+            break
+        conn.execute(
+            text('UPDATE sentences SET content_hash = :hash WHERE id = :id'),
+            [{'id': row.id, 'hash': sentence_hash(row.chinese, row.english)} for row in rows]
+        )
+        last_id = rows[-1].id
+    
+    # 已有的重复句子只保留最早一条的哈希，其余置空（不删除数据）
+    duplicates = conn.execute(text('''
+        UPDATE sentences SET content_hash = NULL
+        WHERE content_hash IS NOT NULL AND id NOT IN (
+            SELECT MIN(id) FROM sentences WHERE content_hash IS NOT NULL GROUP BY content_hash
+        )
+    ''')).rowcount
+    if duplicates:
+        print(f"发现 {duplicates} 条重复句子，已保留数据但不参与判重")
+    
+    _sentence_index('ux_sentences_content_hash').create(conn, checkfirst=True)
+
+def add_review_states(conn):
+    """复习状态表及 (学习者, 到期时间) 索引"""
+    ReviewState.__table__.create(conn, checkfirst=True)
+    for index in ReviewState.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+def add_search_index(conn):
+    """句子全文索引（仅SQLite），并索引已有的句子"""
+    # search_index依赖本模块的get_meta/set_meta，在函数内导入
+    from search_index import create_search_index, update_search_index
+    create_search_index(conn)
+    update_search_index(conn)
+
+def add_practice_sessions(conn):
+    """练习会话表及 (学习者, 最近使用时间) 索引"""
+    PracticeSession.__table__.create(conn, checkfirst=True)
+    for index in PracticeSession.__table__.indexes:
+        index.create(conn, checkfirst=True)
+
+def _begin_sqlite_transaction(conn):
+    """pysqlite只在DML前自动开始事务，重建表的DDL需要显式开始事务，失败时才能整体回滚"""
+    if not conn.connection.dbapi_connection.in_transaction:
+        conn.exec_driver_sql('BEGIN')
+
+def add_sentence_autoincrement(conn):
+    """句子表改为AUTOINCREMENT（仅SQLite），删除的句子ID不再分配给新句子；并补建此前因ID重用而漏掉的全文索引"""
+    if conn.dialect.name != 'sqlite':
+        # PostgreSQL的序列本身不会重用ID
+        return
+    from search_index import index_missing_sentences
+    _begin_sqlite_transaction(conn)
+    table_sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'sentences'")
+    ).scalar()
+    if 'AUTOINCREMENT' not in table_sql.upper():
+        # SQLite不能修改主键属性：重命名旧表，按模型建新表（含索引）后复制数据，ID保持不变
+        for index in Sentence.__table__.indexes:
+            conn.execute(text(f'DROP INDEX IF EXISTS {index.name}'))
+        conn.execute(text('ALTER TABLE sentences RENAME TO sentences_old'))
+        Sentence.__table__.create(conn)
+        columns = ', '.join(column.name for column in Sentence.__table__.columns)
+        conn.execute(text(f'INSERT INTO sentences ({columns}) SELECT {columns} FROM sentences_old'))
+        conn.execute(text('DROP TABLE sentences_old'))
+    indexed = index_missing_sentences(conn)
+    if indexed:
+        print(f"补建 {indexed} 条句子的全文索引")
+
+# (版本号, 说明, 升级函数)，只能在末尾追加
+MIGRATIONS = [
+    (1, '添加难度索引和(中文, 英文)索引', add_sentence_indexes),
+    (2, '添加内容哈希唯一索引', add_content_hash),
+    (3, '添加复习状态表', add_review_states),
+    (4, '添加句子全文索引', add_search_index),
+    (5, '添加练习会话表', add_practice_sessions),
+    (6, '句子表改为AUTOINCREMENT，不再重用删除的句子ID', add_sentence_autoincrement),
+]
+
+def schema_is_current(engine):
+    """数据库是否已是最新结构（只查询一次版本号；corpus_meta表还不存在时为False）"""
+    try:
+        with engine.connect() as conn:
+            return get_meta(conn, SCHEMA_VERSION_KEY) >= MIGRATIONS[-1][0]
+    except DBAPIError:
+        return False
+
+def mark_schema_current(engine):
+    """新建的数据库已是最新结构，直接记录最新版本号"""
+    with engine.begin() as conn:
+        set_meta(conn, SCHEMA_VERSION_KEY, MIGRATIONS[-1][0])
+
+def upgrade_schema(engine):
+    """依次执行尚未执行的升级步骤，每个步骤在单独的事务中完成"""
+    with engine.begin() as conn:
+        current = get_meta(conn, SCHEMA_VERSION_KEY)
+    
+    for version, description, step in MIGRATIONS:
+        if version <= current:
+            continue
+        with engine.begin() as conn:
+            step(conn)
+            set_meta(conn, SCHEMA_VERSION_KEY, version)
+        print(f"数据库结构已升级到 v{version}: {description}")
@@ -1,16 +1,111 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime
+from sqlalchemy import create_engine, event, Column, DDL, Integer, String, DateTime, Float, Index, LargeBinary
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from datetime import datetime
+import hashlib
 
 Base = declarative_base()
 
+# 合法的难度值，其他值一律视为默认难度
+VALID_DIFFICULTIES = ('cet4', 'cet6', 'ielts')
+DEFAULT_DIFFICULTY = 'cet6'
+
+def difficulty_sort_key(difficulty):
+    """难度的排序键：难度列可以为空，没有难度（None）的分组排在最后"""
+    return (difficulty is None, difficulty or '')
+
+def sentence_hash(chinese, english):
+    """句子内容哈希（基于中文和英文），用于判重"""
+    return hashlib.sha1(f'{chinese}\x1f{english}'.encode('utf-8')).hexdigest()
+
+def _default_content_hash(context):
+    """插入时未指定content_hash则根据中文和英文计算"""
+    params = context.get_current_parameters()
+    return sentence_hash(params['chinese'], params['english'])
+
 class Sentence(Base):
     __tablename__ = 'sentences'
+    __table_args__ = (
+        # 按难度筛选并按id排序/分页
+        Index('ix_sentences_difficulty_id', 'difficulty', 'id'),
+        Index('ix_sentences_chinese_english', 'chinese', 'english'),
+        # 内容哈希唯一，导入时据此判重
+        Index('ux_sentences_content_hash', 'content_hash', unique=True),
+        # 删除的句子ID不再分配给新句子：全文索引按已索引的最大ID增量维护，按ID的HTTP缓存、复习记录和练习历史也以ID为键
+        {'sqlite_autoincrement': True},
+    )
     
     id = Column(Integer, primary_key=True)
     chinese = Column(String(500), nullable=False)
     english = Column(String(500), nullable=False)
-    difficulty = Column(String(20), default='cet6')
+    difficulty = Column(String(20), default=DEFAULT_DIFFICULTY)
     created_at = Column(DateTime, default=datetime.now)
+    content_hash = Column(String(40), default=_default_content_hash)
+    
+    def to_dict(self):
+        """转为接口返回的字典"""
+        return {
+            'id': self.id,
+            'chinese': self.chinese,
+            'english': self.english,
+            'difficulty': self.difficulty
+        }
+
+# 句子全文索引（SQLite FTS5，仅SQLite）：英文按porter词干切分，中文列存放的是二元切分后的文本（见search_index.py）
+SEARCH_TABLE = 'sentences_fts'
+CREATE_SEARCH_TABLE = DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+    "english, chinese, tokenize = 'porter unicode61 remove_diacritics 2', prefix = '2 3')"
+).execute_if(dialect='sqlite')
+# 新建句子表时一并创建全文索引表；已有数据库由结构升级创建
+event.listen(Sentence.__table__, 'after_create', CREATE_SEARCH_TABLE)
 
+class CorpusMeta(Base):
+    """语料库元数据（键值对），例如语料版本号"""
+    __tablename__ = 'corpus_meta'
+    
+    key = Column(String(50), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+
+class ReviewState(Base):
+    """学习者对单个句子的复习状态（间隔重复调度）"""
+    __tablename__ = 'review_states'
+    __table_args__ = (
+        # 按学习者取最早到期的句子
+        Index('ix_review_states_learner_due', 'learner_id', 'due_at'),
+    )
+    
+    learner_id = Column(String(64), primary_key=True)
+    sentence_id = Column(Integer, primary_key=True)
+    due_at = Column(DateTime, nullable=False)
+    ease = Column(Float, nullable=False, default=2.5)
+    interval_days = Column(Float, nullable=False, default=0)
+    repetitions = Column(Integer, nullable=False, default=0)
+    lapses = Column(Integer, nullable=False, default=0)
+    last_score = Column(Float)
+    last_reviewed_at = Column(DateTime)
+
+class PracticeSession(Base):
+    """
+    练习会话：句子范围（难度或上传的句子集）、顺序练习的游标和答题历史（见 practice.py）
+    history为4字节小端整数序列，scores每题1字节，与history一一对应
+    """
+    __tablename__ = 'practice_sessions'
+    __table_args__ = (
+        # 按学习者清理最久未使用的会话
+        Index('ix_practice_sessions_learner_updated', 'learner_id', 'updated_at'),
+    )
+    
+    id = Column(String(32), primary_key=True)
+    learner_id = Column(String(64), nullable=False)
+    mode = Column(String(20), nullable=False)
+    difficulties = Column(String(100), nullable=False, default='')
+    set_id = Column(String(64))
+    # 顺序练习最近出过的一题（内置句子为句子ID，上传句子集为位置），乱序练习为打乱后顺序中的位置；-1表示还没有出题
+    cursor = Column(Integer, nullable=False, default=-1)
+    history = Column(LargeBinary, nullable=False, default=b'')
+    scores = Column(LargeBinary, nullable=False, default=b'')
+    # 当前题目在history中的下标（回看上一题时小于末尾）
+    history_index = Column(Integer, nullable=False, default=-1)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+    updated_at = Column(DateTime, nullable=False, default=datetime.now)
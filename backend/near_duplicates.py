@@ -0,0 +1,356 @@
+"""
+近似重复句子检测：英文规范化（忽略大小写、标点）后取字符4-gram，计算MinHash签名，用LSH分桶找出候选对
+候选对按签名估计的Jaccard相似度确认，耗时随句子数近似线性增长（不做两两比较）
+可作为导入步骤（import_excel.py --near-duplicates），也可单独检查已有的句子表
+
+用法: python3 near_duplicates.py [--threshold 0.7] [--difficulties cet4,cet6] [--report clusters.json] [--merge]
+"""
+import argparse
+import json
+import re
+import sys
+import time
+import unicodedata
+from datetime import datetime
+import numpy as np
+from sqlalchemy import delete, select, update
+from models import ReviewState, Sentence
+
+# 判定为近似重复的最小相似度（规范化英文字符4-gram集合的Jaccard相似度）
+DEFAULT_THRESHOLD = 0.7
+
+NGRAM = 4
+NUM_PERM = 128
+# LSH分为BANDS段，每段ROWS个签名值；两句相似度为s时至少一段完全相同的概率为 1-(1-s^ROWS)^BANDS
+# 32x4：s=0.7时约99.9%，s=0.3时约23%（误报的候选对由签名确认排除）
+BANDS = 32
+ROWS = NUM_PERM // BANDS
+# 每批计算签名的句子数（控制中间数组的内存）
+SIGNATURE_BATCH = 2000
+# 每批确认的候选对数
+VERIFY_BATCH = 100000
+
+# 哈希参数固定，同一句子在不同进程中的签名相同
+_rng = np.random.default_rng(20240601)
+PERM_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+PERM_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+BAND_MULTIPLIERS = _rng.integers(1, 2 ** 63, ROWS, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+GRAM_MULTIPLIERS = [np.uint64(0x100000001B3 ** power % 2 ** 64) for power in range(NGRAM - 1, -1, -1)]
+
+APOSTROPHES = re.compile("['’‘`]")
+NON_WORD = re.compile(r'[\W_]+')
+
+def normalize_english(text):
+    """规范化英文：全角转半角、小写、去掉撇号，其他标点和连续空白合并为一个空格"""
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    return NON_WORD.sub(' ', APOSTROPHES.sub('', text)).strip()
+
+def _shingle_hashes(texts):
+    """
+    一批句子的字符4-gram哈希
+    
+    Returns:
+        (grams, starts)：按句子依次排列的32位哈希值（uint64），以及每个句子第一个4-gram的位置
+    """
+    normalized = [normalize_english(text).ljust(NGRAM) for text in texts]
+    lengths = np.fromiter((len(text) for text in normalized), dtype=np.int64, count=len(normalized))
+    codes = np.frombuffer(''.join(normalized).encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    hashed = codes[:len(codes) - NGRAM + 1] * GRAM_MULTIPLIERS[0]
+    for offset in range(1, NGRAM):
+        hashed += codes[offset:len(codes) - NGRAM + 1 + offset] * GRAM_MULTIPLIERS[offset]
+    hashed = (hashed >> np.uint64(32)) ^ (hashed & np.uint64(0xFFFFFFFF))
+    
+    # 跨越两个句子的4-gram不计入
+    counts = lengths - NGRAM + 1
+    starts = np.cumsum(counts) - counts
+    positions = np.repeat(np.cumsum(lengths) - lengths - starts, counts) + np.arange(counts.sum())
+    return hashed[positions], starts
+
+def sketch(texts):
+    """
+    计算一批句子的MinHash签名和LSH分段键
+    
+    Returns:
+        (signatures, keys)：签名取低16位保存（n, NUM_PERM）uint16；每段合并后的键（n, BANDS）uint64
+    """
+    count = len(texts)
+    signatures = np.empty((count, NUM_PERM), dtype=np.uint16)
+    keys = np.empty((count, BANDS), dtype=np.uint64)
+    for start in range(0, count, SIGNATURE_BATCH):
+        grams, starts = _shingle_hashes(texts[start:start + SIGNATURE_BATCH])
+        batch = np.empty((len(starts), NUM_PERM), dtype=np.uint64)
+        for perm in range(NUM_PERM):
+            # multiply-shift哈希，取高32位
+            batch[:, perm] = np.minimum.reduceat((grams * PERM_A[perm] + PERM_B[perm]) >> np.uint64(32), starts)
+        end = start + len(starts)
+        signatures[start:end] = batch
+        keys[start:end] = (batch.reshape(-1, BANDS, ROWS) * BAND_MULTIPLIERS).sum(axis=2)
+    return signatures, keys
+
+def estimate_similarity(signatures, left, right):
+    """按签名相同的比例估计每个候选对的Jaccard相似度"""
+    similarity = np.empty(len(left))
+    for start in range(0, len(left), VERIFY_BATCH):
+        end = start + VERIFY_BATCH
+        similarity[start:end] = (signatures[left[start:end]] == signatures[right[start:end]]).mean(axis=1)
+    return similarity
+
+def candidate_pairs(keys):
+    """
+    同一段键相同的句子构成候选对：每个桶内的句子都与桶中位置最靠前的句子配对（不做桶内两两比较）
+    
+    Returns:
+        (n, 2) 数组，每行为 (靠前的位置, 靠后的位置)
+    """
+    pairs = [np.empty((0, 2), dtype=np.int64)]
+    for band in range(keys.shape[1]):
+        order = np.argsort(keys[:, band], kind='stable')
+        ordered = keys[order, band]
+        same = np.concatenate(([False], ordered[1:] == ordered[:-1]))
+        head = np.maximum.accumulate(np.where(same, 0, np.arange(len(order))))
+        pairs.append(np.stack([order[head[same]], order[same]], axis=1))
+    return np.unique(np.concatenate(pairs), axis=0)
+
+def _find(parent, node):
+    """并查集查找（路径减半）"""
+    while parent[node] != node:
+        parent[node] = parent[parent[node]]
+        node = parent[node]
+    return node
+
+def find_clusters(texts, threshold=DEFAULT_THRESHOLD):
+    """
+    把一组句子按近似重复聚类：每个簇以其中位置最靠前的句子为保留的句子，其余成员与它的相似度都不低于阈值
+    候选对先按并查集连成连通分量（A像B、B像C时A、B、C在同一分量），再在每个分量内依次取最靠前的句子，
+    只把与它本身足够相似的句子归入它的簇，剩下的句子继续分簇；合并时只删除与保留句子相似的句子，不会沿链条误删
+    
+    Returns:
+        簇列表，每个簇为位置列表（升序，第一个为保留的句子），只含两个以上句子的簇
+    """
+    if len(texts) < 2:
+        return []
+    signatures, keys = sketch(texts)
+    pairs = candidate_pairs(keys)
+    pairs = pairs[estimate_similarity(signatures, pairs[:, 0], pairs[:, 1]) >= threshold]
+    
+    parent = {}
+    for left, right in pairs.tolist():
+        parent.setdefault(left, left)
+        parent.setdefault(right, right)
+        left, right = _find(parent, left), _find(parent, right)
+        if left != right:
+            parent[max(left, right)] = min(left, right)
+    components = {}
+    for node in parent:
+        components.setdefault(_find(parent, node), []).append(node)
+    
+    clusters = []
+    for members in components.values():
+        remaining = np.array(sorted(members), dtype=np.int64)
+        while len(remaining) > 1:
+            keep, rest = remaining[0], remaining[1:]
+            similar = (signatures[rest] == signatures[keep]).mean(axis=1) >= threshold
+            if similar.any():
+                clusters.append([int(keep)] + rest[similar].tolist())
+            remaining = rest[~similar]
+    return sorted(clusters)
+
+class NearDuplicateIndex:
+    """
+    可逐批加入句子的近似重复索引（导入时使用）：每段的键排好序，查询用二分查找
+    只保存签名和键，不保存句子文本，30万句约占用90MB内存
+    """
+    
+    def __init__(self, threshold=DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self.labels = []
+        self.signatures = np.empty((0, NUM_PERM), dtype=np.uint16)
+        self.band_keys = [np.empty(0, dtype=np.uint64) for _ in range(BANDS)]
+        self.band_positions = [np.empty(0, dtype=np.int64) for _ in range(BANDS)]
+    
+    def __len__(self):
+        return len(self.labels)
+    
+    def _add(self, labels, signatures, keys):
+        """加入已计算签名的句子"""
+        first = len(self.labels)
+        self.labels.extend(labels)
+        self.signatures = np.concatenate([self.signatures, signatures])
+        positions = np.arange(first, first + len(labels))
+        for band in range(BANDS):
+            band_keys = np.concatenate([self.band_keys[band], keys[:, band]])
+            band_positions = np.concatenate([self.band_positions[band], positions])
+            # 稳定排序：键相同时先加入的句子在前，查询总是匹配到最早的句子
+            order = np.argsort(band_keys, kind='stable')
+            self.band_keys[band] = band_keys[order]
+            self.band_positions[band] = band_positions[order]
+    
+    def add(self, labels, texts):
+        """加入句子，labels为调用方用来标识句子的值（如句子ID）"""
+        if len(labels):
+            self._add(list(labels), *sketch(list(texts)))
+    
+    def _match_index(self, signatures, keys):
+        """与索引中已有句子比较，返回每个句子最相似的 (索引位置, 相似度)，没有达到阈值时位置为-1"""
+        count = len(keys)
+        best = np.full(count, -1, dtype=np.int64)
+        best_similarity = np.zeros(count)
+        if not self.labels:
+            return best, best_similarity
+        queries, candidates = [], []
+        for band in range(BANDS):
+            band_keys = self.band_keys[band]
+            found = np.searchsorted(band_keys, keys[:, band])
+            found = np.minimum(found, len(band_keys) - 1)
+            hit = band_keys[found] == keys[:, band]
+            queries.append(np.nonzero(hit)[0])
+            candidates.append(self.band_positions[band][found[hit]])
+        pairs = np.unique(np.stack([np.concatenate(queries), np.concatenate(candidates)], axis=1), axis=0)
+        if len(pairs):
+            similarity = (signatures[pairs[:, 0]] == self.signatures[pairs[:, 1]]).mean(axis=1)
+            for (query, candidate), value in zip(pairs.tolist(), similarity.tolist()):
+                if value >= self.threshold and value > best_similarity[query]:
+                    best[query] = candidate
+                    best_similarity[query] = value
+        return best, best_similarity
+    
+    def match_and_add(self, labels, texts):
+        """
+        查找每个句子的近似重复（索引中已有的句子，或同一批中更靠前的句子），没有近似重复的句子加入索引
+        
+        Returns:
+            与texts对应的列表，每项为 (近似重复句子的label, 相似度)，没有近似重复时为None
+        """
+        texts = list(texts)
+        labels = list(labels)
+        if not texts:
+            return []
+        signatures, keys = sketch(texts)
+        best, best_similarity = self._match_index(signatures, keys)
+        matches = [
+            (self.labels[position], round(value, 3)) if position >= 0 else None
+            for position, value in zip(best.tolist(), best_similarity.tolist())
+        ]
+        
+        # 同一批内：与更靠前的句子比较
+        pairs = candidate_pairs(keys)
+        if len(pairs):
+            similarity = estimate_similarity(signatures, pairs[:, 0], pairs[:, 1])
+            for (earlier, later), value in zip(pairs.tolist(), similarity.tolist()):
+                if matches[later] is None and value >= self.threshold:
+                    matches[later] = (labels[earlier], round(value, 3))
+        
+        unique = [index for index, match in enumerate(matches) if match is None]
+        if unique:
+            self._add([labels[index] for index in unique], signatures[unique], keys[unique])
+        return matches
+
+def load_sentences(db, difficulties=None):
+    """按ID顺序读取句子的 (id, chinese, english, difficulty)"""
+    query = select(Sentence.id, Sentence.chinese, Sentence.english, Sentence.difficulty).order_by(Sentence.id)
+    if difficulties:
+        query = query.where(Sentence.difficulty.in_(difficulties))
+    return db.execute(query).all()
+
+def merge_cluster(db, sentence_ids):
+    """
+    把一个簇合并到其中ID最小的句子（不提交）：学习者的复习记录转到保留的句子上，其余句子删除
+    学习者在保留的句子上已有复习记录时保留该记录；否则保留最近复习的那条
+    
+    Returns:
+        删除的句子ID列表
+    """
+    canonical, duplicates = sentence_ids[0], list(sentence_ids[1:])
+    states = db.execute(
+        select(ReviewState.learner_id, ReviewState.sentence_id, ReviewState.last_reviewed_at)
+        .where(ReviewState.sentence_id.in_(sentence_ids))
+    ).all()
+    kept = {}
+    for state in states:
+        current = kept.get(state.learner_id)
+        if current is not None and (
+            current.sentence_id == canonical
+            or (state.sentence_id != canonical
+                and (state.last_reviewed_at or datetime.min) <= (current.last_reviewed_at or datetime.min))
+        ):
+            continue
+        kept[state.learner_id] = state
+    moved = [state for state in kept.values() if state.sentence_id != canonical]
+    for state in moved:
+        db.execute(
+            update(ReviewState)
+            .where(ReviewState.learner_id == state.learner_id, ReviewState.sentence_id == state.sentence_id)
+            .values(sentence_id=canonical)
+        )
+    db.execute(delete(ReviewState).where(ReviewState.sentence_id.in_(duplicates)))
+    db.execute(delete(Sentence).where(Sentence.id.in_(duplicates)))
+    return duplicates
+
+def describe_cluster(rows, members):
+    """报告中的一个簇"""
+    return {
+        'keep': rows[members[0]].id,
+        'sentences': [
+            {'id': rows[m].id, 'english': rows[m].english, 'chinese': rows[m].chinese, 'difficulty': rows[m].difficulty}
+            for m in members
+        ]
+    }
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='检查句子表中的近似重复句子')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD, help=f'最小相似度（默认{DEFAULT_THRESHOLD}）')
+    parser.add_argument('--difficulties', default='', help='只检查这些难度的句子，逗号分隔')
+    parser.add_argument('--report', help='把全部重复簇写入JSON文件')
+    parser.add_argument('--show', type=int, default=10, help='打印的重复簇数量')
+    parser.add_argument('--merge', action='store_true', help='合并重复簇：每簇保留ID最小的句子，复习记录和练习历史转到该句子上')
+    args = parser.parse_args()
+    
+    from database import SessionLocal, init_db, bump_corpus_version
+    from search_index import remove_from_search_index
+    from corpus_snapshot import rebuild_snapshot
+    from practice import remap_history
+    init_db()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        difficulties = [value.strip() for value in args.difficulties.split(',') if value.strip()]
+        rows = load_sentences(db, difficulties)
+        clusters = find_clusters([row.english for row in rows], args.threshold)
+        elapsed = time.perf_counter() - started
+        duplicate_count = sum(len(members) - 1 for members in clusters)
+        print(f"检查 {len(rows)} 条句子，耗时 {elapsed:.2f}s")
+        print(f"发现 {len(clusters)} 个近似重复簇，共 {duplicate_count} 条可合并的句子")
+        
+        report = [describe_cluster(rows, members) for members in clusters]
+        for cluster in report[:args.show]:
+            print(f"\n保留 #{cluster['keep']}")
+            for sentence in cluster['sentences']:
+                print(f"  #{sentence['id']} [{sentence['difficulty']}] {sentence['english']}")
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"\n重复簇已写入 {args.report}")
+        
+        if args.merge and clusters:
+            # 删除的句子ID对应到保留的句子，练习历史中的题目替换为保留的句子
+            merged_into = {}
+            for cluster in report:
+                for sentence_id in merge_cluster(db, [sentence['id'] for sentence in cluster['sentences']]):
+                    merged_into[sentence_id] = cluster['keep']
+            removed = list(merged_into)
+            remove_from_search_index(db, removed)
+            sessions = remap_history(db, merged_into)
+            bump_corpus_version(db)
+            db.commit()
+            rebuild_snapshot()
+            print(f"\n已合并：删除 {len(removed)} 条句子，更新 {sessions} 个练习会话的历史")
+    except Exception as e:
+        db.rollback()
+        print(f"检查过程中出错: {e}")
+        sys.exit(1)
+    finally:
+        db.close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+"""
+由种子决定的伪随机排列：把 [0, size) 中的位置一一映射为打乱后的位置，不生成也不保存打乱后的列表
+实现为平衡Feistel网络（对2的偶数次幂大小的定义域是双射）加循环行走（cycle walking）：
+结果落在 [0, size) 之外时继续映射，定义域不超过size的4倍，平均映射不到4次，正向和反向都是O(1)
+"""
+import hashlib
+
+# Feistel轮数，4轮足以让相邻位置的结果看不出规律（这里只需要打乱顺序，不需要密码学强度）
+ROUNDS = 4
+
+_MASK64 = (1 << 64) - 1
+
+def _mix(value, key):
+    """轮函数：64位整数混合（splitmix64的终结函数）"""
+    x = (value ^ key) & _MASK64
+    x = ((x ^ (x >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    x = ((x ^ (x >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return x ^ (x >> 31)
+
+class SeededPermutation:
+    """[0, size) 上的伪随机排列，相同的size和种子得到相同的顺序"""
+    
+    def __init__(self, size, seed):
+        self.size = size
+        # 定义域为2的偶数次幂，分成位数相同的左右两半
+        bits = max(2, (size - 1).bit_length())
+        bits += bits % 2
+        self._half_bits = bits // 2
+        self._half_mask = (1 << self._half_bits) - 1
+        digest = hashlib.blake2b(str(seed).encode('utf-8'), digest_size=8 * ROUNDS).digest()
+        self._keys = [int.from_bytes(digest[i * 8:(i + 1) * 8], 'little') for i in range(ROUNDS)]
+    
+    def __len__(self):
+        return self.size
+    
+    def _encrypt(self, value):
+        """Feistel正向映射（定义域内的双射）"""
+        left, right = value >> self._half_bits, value & self._half_mask
+        for key in self._keys:
+            left, right = right, left ^ (_mix(right, key) & self._half_mask)
+        return (left << self._half_bits) | right
+    
+    def _decrypt(self, value):
+        """Feistel反向映射"""
+        left, right = value >> self._half_bits, value & self._half_mask
+        for key in reversed(self._keys):
+            left, right = right ^ (_mix(left, key) & self._half_mask), left
+        return (left << self._half_bits) | right
+    
+    def __getitem__(self, position):
+        """打乱后第position个位置对应的原始位置"""
+        if not 0 <= position < self.size:
+            raise IndexError(position)
+        value = self._encrypt(position)
+        while value >= self.size:
+            value = self._encrypt(value)
+        return value
+    
+    def index(self, value):
+        """原始位置value在打乱后的顺序中排第几（__getitem__的逆映射）"""
+        if not 0 <= value < self.size:
+            raise ValueError(value)
+        position = self._decrypt(value)
+        while position >= self.size:
+            position = self._decrypt(position)
+        return position
@@ -0,0 +1,270 @@
+"""
+练习会话：服务端保存一次练习的句子范围（内置句子的难度，或上传的句子集）、顺序练习的游标和答题历史，
+客户端只需请求下一题/上一题，刷新页面或换设备后可以从上次的位置继续
+历史以紧凑的二进制保存：每题4字节（内置句子为句子ID，上传句子集为句子在集合中的位置）加1字节得分，不复制句子内容
+会话的推进只做内存计算，不访问数据库，同步（Flask）和异步（ASGI）接口共用
+"""
+import random
+import re
+import secrets
+import sys
+from array import array
+from bisect import bisect_right
+from datetime import datetime
+from sqlalchemy import delete, select
+from models import PracticeSession
+from sampler import SentenceSampler
+from permutation import SeededPermutation
+
+# 练习模式：按顺序、随机（可能重复）或乱序（按会话的种子打乱，一轮内不重复）
+SESSION_MODES = ('sequential', 'random', 'shuffle')
+
+# 会话ID：32位十六进制
+SESSION_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+# 每个会话保留的历史题数，超出时丢弃最早的记录（约5KB）
+MAX_SESSION_HISTORY = 1000
+# 每个学习者保留的会话数，创建新会话时删除最久未使用的
+MAX_SESSIONS_PER_LEARNER = 20
+# 随机模式下尽量避开最近出现过的题数
+RECENT_EXCLUDE_SIZE = 20
+# 得分字节：0~100为得分百分比（100表示完全正确），该值表示尚未作答
+NOT_ANSWERED = 255
+
+def is_valid_session_id(value):
+    """会话ID是否合法"""
+    return isinstance(value, str) and bool(SESSION_ID_PATTERN.match(value))
+
+def _decode(blob):
+    """4字节小端整数序列"""
+    values = array('i')
+    values.frombytes(blob or b'')
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+def _encode(values):
+    """_decode的逆操作"""
+    if sys.byteorder == 'big':
+        values = array('i', values)
+        values.byteswap()
+    return values.tobytes()
+
+def new_session(learner_id, mode, difficulties=(), set_id=None):
+    """创建会话对象（尚未出题，也未加入数据库会话）"""
+    now = datetime.now()
+    return PracticeSession(
+        id=secrets.token_hex(16),
+        learner_id=learner_id,
+        mode=mode,
+        difficulties=','.join(sorted(set(difficulties))) if not set_id else '',
+        set_id=set_id,
+        cursor=-1,
+        history=b'',
+        scores=b'',
+        history_index=-1,
+        created_at=now,
+        updated_at=now
+    )
+
+def stale_sessions_statement(learner_id):
+    """删除学习者最久未使用的会话，只保留最近的MAX_SESSIONS_PER_LEARNER个"""
+    recent = (
+        select(PracticeSession.id)
+        .where(PracticeSession.learner_id == learner_id)
+        .order_by(PracticeSession.updated_at.desc())
+        .limit(MAX_SESSIONS_PER_LEARNER)
+    )
+    return delete(PracticeSession).where(
+        PracticeSession.learner_id == learner_id,
+        PracticeSession.id.not_in(recent)
+    )
+
+def remap_history(db, mapping):
+    """
+    把内置句子会话历史中的句子ID按mapping替换（合并近似重复删除句子后调用，不提交）
+    顺序练习的游标不需要替换：下一题取ID大于游标的句子，游标对应的句子不存在也不影响
+    
+    Returns:
+        修改的会话数
+    """
+    if not mapping:
+        return 0
+    changed = 0
+    sessions = db.execute(select(PracticeSession).where(PracticeSession.set_id.is_(None))).scalars()
+    for session in sessions:
+        history = _decode(session.history)
+        if not any(sentence_id in mapping for sentence_id in history):
+            continue
+        session.history = _encode(array('i', (mapping.get(sentence_id, sentence_id) for sentence_id in history)))
+        changed += 1
+    return changed
+
+def valid_difficulties(difficulties):
+    """创建会话时的难度参数是否合法：字符串列表，拼接后能存入difficulties列"""
+    if not isinstance(difficulties, list) or not all(isinstance(d, str) for d in difficulties):
+        return False
+    return len(','.join(set(difficulties))) <= PracticeSession.difficulties.type.length
+
+def session_difficulties(session):
+    """会话所选的难度列表，为空表示全部"""
+    return [d for d in session.difficulties.split(',') if d] if session.difficulties else []
+
+def current_entry(session):
+    """当前题目：内置句子为句子ID，上传句子集为位置；还没有出题时为None"""
+    if session.history_index < 0:
+        return None
+    return _decode(session.history)[session.history_index]
+
+def _next_sequential_id(groups, cursor):
+    """所选难度中ID大于cursor的最小ID，已到末尾时回到第一个"""
+    candidates = [ids[bisect_right(ids, cursor)] for ids in groups if bisect_right(ids, cursor) < len(ids)]
+    if candidates:
+        return min(candidates)
+    firsts = [ids[0] for ids in groups if len(ids)]
+    return min(firsts) if firsts else None
+
+def shuffle_seed(session):
+    """乱序练习的种子：由会话ID得到，不需要另外保存"""
+    return int(session.id[:16], 16)
+
+def _next_entry(session, sampler, total):
+    """
+    按会话模式选出下一题
+    
+    Returns:
+        (题目, 新的游标)，随机模式的游标不变；没有可选句子时题目为None
+    """
+    history = _decode(session.history)
+    recent = history[-RECENT_EXCLUDE_SIZE:]
+    difficulties = session_difficulties(session)
+    if session.mode == 'shuffle':
+        # 游标为打乱后顺序中的位置，取完一轮后从头开始（同一种子顺序不变）
+        if not session.set_id:
+            total = sampler.count(difficulties)
+        if not total:
+            return None, session.cursor
+        position = (session.cursor + 1) % total
+        if session.set_id:
+            return SeededPermutation(total, shuffle_seed(session))[position], position
+        return sampler.shuffled(difficulties, shuffle_seed(session), position), position
+    
+    if session.set_id:
+        if not total:
+            return None, session.cursor
+        if session.mode == 'sequential':
+            position = (session.cursor + 1) % total
+            return position, position
+        # 与句子集随机接口一致：多次抽中最近出现过的位置时允许重复
+        excluded = set(recent)
+        position = None
+        for _ in range(SentenceSampler.MAX_EXCLUDE_RETRIES):
+            position = random.randrange(total)
+            if position not in excluded:
+                break
+        return position, session.cursor
+    
+    if session.mode == 'sequential':
+        sentence_id = _next_sequential_id(sampler.groups(difficulties), session.cursor)
+        return sentence_id, sentence_id
+    return sampler.pick(difficulties, exclude=recent), session.cursor
+
+def advance(session, sampler, total=None):
+    """
+    前进一题：回看过的题目直接前进，否则按模式选出新题并追加到历史
+    
+    Args:
+        sampler: 已同步到当前语料版本的SentenceSampler（内置句子）
+        total: 上传句子集的句子数（上传句子集的会话必须传入）
+    
+    Returns:
+        是否有可用的题目
+    """
+    history = _decode(session.history)
+    if session.history_index < len(history) - 1:
+        session.history_index += 1
+        session.updated_at = datetime.now()
+        return True
+    
+    entry, cursor = _next_entry(session, sampler, total)
+    if entry is None:
+        return False
+    scores = bytearray(session.scores or b'')
+    history.append(entry)
+    scores.append(NOT_ANSWERED)
+    if len(history) > MAX_SESSION_HISTORY:
+        del history[:len(history) - MAX_SESSION_HISTORY]
+        del scores[:len(scores) - MAX_SESSION_HISTORY]
+    session.history = _encode(history)
+    session.scores = bytes(scores)
+    session.history_index = len(history) - 1
+    session.cursor = cursor
+    session.updated_at = datetime.now()
+    return True
+
+def go_back(session):
+    """回到上一题，已是最早的一题时返回False"""
+    if session.history_index <= 0:
+        return False
+    session.history_index -= 1
+    session.updated_at = datetime.now()
+    return True
+
+def record_score(session, result):
+    """记录当前题目的答案检查结果：完全正确记100分，否则按相似度记0~99分"""
+    if session.history_index < 0:
+        return
+    scores = bytearray(session.scores)
+    scores[session.history_index] = 100 if result['is_correct'] else max(0, min(99, round(result['score'] * 100)))
+    session.scores = bytes(scores)
+    session.updated_at = datetime.now()
+
+def progress(session, sampler, total=None):
+    """
+    顺序和乱序练习的进度 {'current': 当前是第几题, 'total': 总题数}，随机练习或还没有出题时为None
+    内置句子的位置由各难度ID数组二分查找得到，乱序练习再做一次反向映射，都不需要保存完整顺序
+    """
+    entry = current_entry(session)
+    if session.mode not in ('sequential', 'shuffle') or entry is None:
+        return None
+    if session.set_id:
+        position = entry
+    else:
+        groups = sampler.groups(session_difficulties(session))
+        total = sum(len(ids) for ids in groups)
+        if session.mode == 'sequential':
+            # 按ID顺序：不大于当前ID的句子数
+            return {'current': sum(bisect_right(ids, entry) for ids in groups), 'total': total}
+        position = sampler.position_of(groups, entry)
+        if position is None:
+            # 当前题目已从语料中删除，按游标显示
+            return {'current': min(session.cursor + 1, total), 'total': total}
+    if session.mode == 'shuffle':
+        position = SeededPermutation(total, shuffle_seed(session)).index(position)
+    return {'current': position + 1, 'total': total}
+
+def history_entries(session, offset=0, limit=100):
+    """答题历史的一页（从最早的一题开始），得分为0~1，未作答为None"""
+    history = _decode(session.history)
+    key = 'position' if session.set_id else 'sentence_id'
+    return [
+        {key: history[i], 'score': None if session.scores[i] == NOT_ANSWERED else session.scores[i] / 100}
+        for i in range(offset, min(len(history), offset + limit))
+    ]
+
+def session_payload(session, sentence, session_progress):
+    """接口返回的会话状态"""
+    scores = session.scores or b''
+    answered = [score for score in scores if score != NOT_ANSWERED]
+    return {
+        'session_id': session.id,
+        'mode': session.mode,
+        'difficulties': session_difficulties(session),
+        'set_id': session.set_id,
+        'sentence': sentence,
+        'progress': session_progress,
+        'has_previous': session.history_index > 0,
+        'history_length': len(scores),
+        'answered': len(answered),
+        'correct': sum(1 for score in answered if score == 100)
+    }
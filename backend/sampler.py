@@ -0,0 +1,198 @@
+"""
+随机抽样引擎：维护按难度分组的句子ID索引，抽样时不加载整张表
+"""
+import random
+import threading
+from array import array
+from bisect import bisect_left
+from sqlalchemy import select
+from models import Sentence, difficulty_sort_key
+from permutation import SeededPermutation
+
+class SentenceSampler:
+    """按难度分组的句子ID索引，语料版本变化时自动重建"""
+    
+    # 抽中最近出现过的句子时的最大重抽次数
+    MAX_EXCLUDE_RETRIES = 8
+    
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self._lock = threading.Lock()
+        self._version = None
+        self._ids_by_difficulty = {}
+    
+    @property
+    def version(self):
+        """当前索引对应的语料版本号，尚未构建时为None"""
+        return self._version
+    
+    def sync(self, version):
+        """语料版本变化时重建索引（只读取id和difficulty两列）"""
+        if version == self._version:
+            return
+        with self._lock:
+            if version == self._version:
+                return
+            db = self.session_factory()
+            try:
+                # 直接用DBAPI游标逐行读取，省去为每行构造结果对象的开销（冷启动后第一个请求需要构建索引）
+                cursor = db.connection().connection.cursor()
+                try:
+                    cursor.execute(self.index_sql(db.get_bind().dialect))
+                    self._build(version, cursor)
+                finally:
+                    cursor.close()
+            finally:
+                db.close()
+    
+    def load(self, version, rows):
+        """用已查询出的 (difficulty, id) 行重建索引（供异步接口使用，查询由调用方完成）"""
+        with self._lock:
+            if version != self._version:
+                self._build(version, rows)
+    
+    def load_groups(self, version, groups):
+        """
+        直接使用已按难度分组的ID数组作为索引（例如语料只读快照中的数组，不复制）
+        
+        Args:
+            groups: {难度: 升序的ID数组}，数组需支持len、下标和二分查找
+        """
+        if version == self._version:
+            return
+        with self._lock:
+            if version != self._version:
+                self._ids_by_difficulty = dict(groups)
+                self._version = version
+    
+    @staticmethod
+    def index_query():
+        """构建索引所需的查询：按 (difficulty, id) 排序，只扫描难度索引，不读取句子内容"""
+        return select(Sentence.difficulty, Sentence.id).order_by(Sentence.difficulty, Sentence.id)
+    
+    @classmethod
+    def index_sql(cls, dialect):
+        """构建索引的SQL语句（不含参数），可直接交给驱动执行"""
+        return str(cls.index_query().compile(dialect=dialect))
+    
+    def _build(self, version, rows):
+        """按 (difficulty, id) 行构建索引，调用方需持有锁"""
+        index = {}
+        for difficulty, sentence_id in rows:
+            index.setdefault(difficulty, array('q')).append(sentence_id)
+        # 整体替换引用，读线程不会看到构建到一半的索引
+        self._ids_by_difficulty = index
+        self._version = version
+    
+    def difficulties(self):
+        """当前语料中存在的全部难度（没有难度的句子为None）"""
+        return sorted(self._ids_by_difficulty, key=difficulty_sort_key)
+    
+    def groups(self, difficulties=None):
+        """返回所选难度对应的ID数组列表（每个数组按id升序）"""
+        index = self._ids_by_difficulty
+        if not difficulties:
+            return [index[d] for d in sorted(index, key=difficulty_sort_key)]
+        return [index[d] for d in sorted(set(difficulties), key=difficulty_sort_key) if d in index]
+    
+    def count(self, difficulties=None):
+        """所选难度的句子总数"""
+        return sum(len(ids) for ids in self.groups(difficulties))
+    
+    def pick(self, difficulties=None, seed=None, exclude=()):
+        """
+        在所选难度的全部句子中均匀随机选取一个ID
+        
+        Args:
+            difficulties: 难度列表，为空表示全部
+            seed: 随机种子（可选），相同种子得到相同结果
+            exclude: 最近出现过的句子ID，尽量避免重复抽中
+        
+        Returns:
+            句子ID，没有可选句子时返回None
+        """
+        groups = self.groups(difficulties)
+        total = sum(len(ids) for ids in groups)
+        if total == 0:
+            return None
+        
+        rng = random.Random(seed) if seed is not None else random
+        excluded = set(exclude)
+        sentence_id = None
+        # 可选句子几乎都被排除时，放弃排除，允许重复
+        for _ in range(self.MAX_EXCLUDE_RETRIES):
+            sentence_id = self._nth(groups, rng.randrange(total))
+            if sentence_id not in excluded:
+                break
+        return sentence_id
+    
+    def pick_many(self, difficulties=None, count=1, seed=None, exclude=()):
+        """
+        在所选难度中随机选取最多count个不重复的ID（用于前端预取）
+        
+        Args:
+            exclude: 最近出现过或客户端已缓存的句子ID，可选句子不足时才会选中
+        
+        Returns:
+            句子ID列表，长度为 min(count, 所选难度的句子总数)
+        """
+        groups = self.groups(difficulties)
+        total = sum(len(ids) for ids in groups)
+        wanted = min(count, total)
+        if wanted <= 0:
+            return []
+        
+        rng = random.Random(seed) if seed is not None else random
+        excluded = set(exclude)
+        if total <= wanted * self.MAX_EXCLUDE_RETRIES:
+            # 可选句子很少时直接打乱全部位置，未被排除的排在前面
+            ids = [self._nth(groups, position) for position in rng.sample(range(total), total)]
+            ids.sort(key=lambda sentence_id: sentence_id in excluded)
+            return ids[:wanted]
+        
+        chosen = []
+        taken = set()
+        for allow_excluded in (False, True):
+            for _ in range(wanted * self.MAX_EXCLUDE_RETRIES):
+                if len(chosen) == wanted:
+                    return chosen
+                sentence_id = self._nth(groups, rng.randrange(total))
+                if sentence_id in taken or (sentence_id in excluded and not allow_excluded):
+                    continue
+                taken.add(sentence_id)
+                chosen.append(sentence_id)
+        return chosen
+    
+    def shuffled(self, difficulties=None, seed=0, position=0):
+        """
+        所选难度的句子按种子打乱后的第position个ID：同一种子和语料版本下顺序固定，依次取完全部句子不会重复
+        不生成打乱后的列表，每次按位置计算（见 permutation.py）
+        
+        Returns:
+            句子ID，position超出范围时返回None
+        """
+        groups = self.groups(difficulties)
+        total = sum(len(ids) for ids in groups)
+        if not 0 <= position < total:
+            return None
+        return self._nth(groups, SeededPermutation(total, seed)[position])
+    
+    @staticmethod
+    def position_of(groups, sentence_id):
+        """句子ID在跨难度全局位置中的位置（_nth的逆映射），不在所选难度中时返回None"""
+        offset = 0
+        for ids in groups:
+            index = bisect_left(ids, sentence_id)
+            if index < len(ids) and ids[index] == sentence_id:
+                return offset + index
+            offset += len(ids)
+        return None
+    
+    @staticmethod
+    def _nth(groups, position):
+        """把跨难度的全局位置映射为具体的句子ID"""
+        for ids in groups:
+            if position < len(ids):
+                return ids[position]
+            position -= len(ids)
+        raise IndexError(position)
@@ -0,0 +1,180 @@
+"""
+间隔重复调度：每次检查答案后按SM-2算法更新学习者对该句子的复习状态（到期时间、难易系数、间隔）
+取下一题时优先返回最早到期的句子，查询走 (learner_id, due_at) 索引，耗时与复习记录总量无关
+查询和状态计算与会话类型无关，同步（Flask）和异步（ASGI）接口共用
+"""
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from models import ReviewState, Sentence
+
+# 学习者ID：由前端生成并保存在本地，1~64位字母、数字、下划线或连字符
+LEARNER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+# SM-2参数
+DEFAULT_EASE = 2.5
+MIN_EASE = 1.3
+# 答题质量（0~5）低于该值视为遗忘，重新开始记忆
+PASSING_QUALITY = 3
+# 前两次记住后的间隔（天），之后按难易系数增长
+FIRST_INTERVAL_DAYS = 1
+SECOND_INTERVAL_DAYS = 6
+# 遗忘的句子在本次练习中稍后再出现
+RELEARN_DELAY = timedelta(minutes=10)
+
+# 没有到期的句子时，一次抽取的候选新句子数（只需一次查询排除已学过的）
+NEW_CANDIDATES = 8
+
+def is_valid_learner_id(value):
+    """学习者ID是否合法"""
+    return isinstance(value, str) and bool(LEARNER_ID_PATTERN.match(value))
+
+def answer_quality(result):
+    """把答案检查结果换算为SM-2的答题质量：完全正确为5，否则按相似度给0~4"""
+    if result['is_correct']:
+        return 5
+    return min(4, int(result['score'] * 5))
+
+def schedule(state, quality, now):
+    """按SM-2算法更新一个复习状态"""
+    if quality < PASSING_QUALITY:
+        state.repetitions = 0
+        state.lapses += 1
+        state.interval_days = 0
+        state.due_at = now + RELEARN_DELAY
+    else:
+        state.repetitions += 1
+        if state.repetitions == 1:
+            state.interval_days = FIRST_INTERVAL_DAYS
+        elif state.repetitions == 2:
+            state.interval_days = SECOND_INTERVAL_DAYS
+        else:
+            state.interval_days = round(state.interval_days * state.ease, 2)
+        state.due_at = now + timedelta(days=state.interval_days)
+    penalty = 5 - quality
+    state.ease = max(MIN_EASE, round(state.ease + 0.1 - penalty * (0.08 + penalty * 0.02), 4))
+
+def review_states_query(learner_id, sentence_ids):
+    """查询学习者在这些句子上已有的复习状态"""
+    return select(ReviewState).where(
+        ReviewState.learner_id == learner_id,
+        ReviewState.sentence_id.in_(set(sentence_ids))
+    )
+
+def apply_reviews(states, learner_id, results, now=None):
+    """
+    按答案检查结果更新复习状态（同一句子出现多次时依次更新）
+    
+    Args:
+        states: review_states_query的查询结果
+        results: 答案检查结果列表，每项需含sentence_id，带error的项跳过
+    
+    Returns:
+        {句子ID: 复习状态}，其中新建的状态需由调用方加入会话
+    """
+    now = now or datetime.now()
+    by_sentence = {state.sentence_id: state for state in states}
+    for result in results:
+        if 'error' in result:
+            continue
+        sentence_id = result['sentence_id']
+        state = by_sentence.get(sentence_id)
+        if state is None:
+            state = by_sentence[sentence_id] = ReviewState(
+                learner_id=learner_id, sentence_id=sentence_id, ease=DEFAULT_EASE,
+                interval_days=0, repetitions=0, lapses=0
+            )
+        schedule(state, answer_quality(result), now)
+        state.last_score = result['score']
+        state.last_reviewed_at = now
+    return by_sentence
+
+def record_reviews(db, learner_id, results, now=None):
+    """在同步会话中记录一批答题结果（不提交），返回 {句子ID: 复习状态}"""
+    sentence_ids = [result['sentence_id'] for result in results if 'error' not in result]
+    if not sentence_ids:
+        return {}
+    states = db.execute(review_states_query(learner_id, sentence_ids)).scalars().all()
+    updated = apply_reviews(states, learner_id, results, now)
+    db.add_all(updated.values())
+    return updated
+
+def next_review_query(learner_id, difficulties, now, due=True):
+    """
+    学习者最早到期的一个复习状态
+    
+    Args:
+        due: True取已到期（due_at <= now）中最早的，False取尚未到期中最早的
+    """
+    query = select(ReviewState).where(
+        ReviewState.learner_id == learner_id,
+        ReviewState.due_at <= now if due else ReviewState.due_at > now
+    )
+    if difficulties:
+        query = query.join(Sentence, Sentence.id == ReviewState.sentence_id).where(
+            Sentence.difficulty.in_(difficulties)
+        )
+    return query.order_by(ReviewState.due_at, ReviewState.sentence_id).limit(1)
+
+def seen_query(learner_id, sentence_ids):
+    """候选句子中学习者已学过的句子ID"""
+    return select(ReviewState.sentence_id).where(
+        ReviewState.learner_id == learner_id,
+        ReviewState.sentence_id.in_(set(sentence_ids))
+    )
+
+def new_candidates(sampler, difficulties):
+    """从抽样索引中随机取若干候选新句子ID"""
+    candidates = []
+    for _ in range(NEW_CANDIDATES):
+        sentence_id = sampler.pick(difficulties)
+        if sentence_id is None:
+            break
+        candidates.append(sentence_id)
+    return candidates
+
+def first_unseen(candidates, seen):
+    """第一个没有学过的候选句子ID，全部学过时为None"""
+    seen = set(seen)
+    return next((sentence_id for sentence_id in candidates if sentence_id not in seen), None)
+
+def pick_next(db, sampler, learner_id, difficulties, now=None):
+    """
+    选择学习者的下一题：最早到期的复习 > 没有学过的新句子 > 最早将要到期的复习
+    
+    Returns:
+        (句子ID, 复习状态)，新句子的复习状态为None；没有可用的句子时句子ID为None
+    """
+    now = now or datetime.now()
+    state = db.execute(next_review_query(learner_id, difficulties, now)).scalar()
+    if state is not None:
+        return state.sentence_id, state
+    
+    candidates = new_candidates(sampler, difficulties)
+    if candidates:
+        sentence_id = first_unseen(candidates, db.execute(seen_query(learner_id, candidates)).scalars())
+        if sentence_id is not None:
+            return sentence_id, None
+    
+    state = db.execute(next_review_query(learner_id, difficulties, now, due=False)).scalar()
+    if state is not None:
+        return state.sentence_id, state
+    # 候选句子都学过但没有复习记录可用（例如抽样索引比复习表旧），直接返回候选句子
+    return (candidates[0] if candidates else None), None
+
+def review_info(state, now=None):
+    """接口返回的复习状态摘要"""
+    if state is None:
+        return {
+            'is_new': True, 'due_at': None, 'overdue': False,
+            'interval_days': 0, 'repetitions': 0, 'ease': DEFAULT_EASE
+        }
+    now = now or datetime.now()
+    return {
+        'is_new': False,
+        'due_at': state.due_at.isoformat(timespec='seconds'),
+        'overdue': state.due_at <= now,
+        'interval_days': state.interval_days,
+        'repetitions': state.repetitions,
+        'ease': state.ease
+    }
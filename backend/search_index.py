@@ -0,0 +1,223 @@
+"""
+句子全文检索：SQLite FTS5索引，英文按porter词干匹配，中文按二元切分（bigram）匹配，结果按bm25排序
+命中过多的常见词只对前MAX_RANKED_MATCHES个命中排序，检索耗时有上限
+索引按句子id增量维护：已索引到的最大id记录在corpus_meta中，导入脚本写入句子后只索引新增的部分（句子表为AUTOINCREMENT，新句子的id总大于删除过的id）
+非SQLite数据库没有FTS5，检索退化为LIKE扫描（不排序，仅按id分页）
+
+用法: python3 search_index.py [--rebuild]
+"""
+import argparse
+import re
+import sys
+import time
+from sqlalchemy import Float, Integer, bindparam, column, func, insert, or_, select, table, text
+from models import Sentence, SEARCH_TABLE, CREATE_SEARCH_TABLE
+from migrations import get_meta, set_meta
+
+# 已建立全文索引的最大句子id在corpus_meta中的键
+SEARCH_INDEXED_KEY = 'search_indexed_id'
+
+# 建索引时每批读取的句子数
+INDEX_BATCH_SIZE = 5000
+# 参与相关度排序的最大命中数，超出时只对按id最先命中的部分排序
+MAX_RANKED_MATCHES = 5000
+
+# 中日韩统一表意文字（含扩展A和兼容区）
+CJK_CHARS = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+CJK_RUN = re.compile(f'[{CJK_CHARS}]+')
+# 检索词：连续的汉字，或连续的其他字母数字（英文单词、数字）
+QUERY_TOKEN = re.compile(f'[{CJK_CHARS}]+|[^\\W_{CJK_CHARS}]+')
+
+search_table = table(SEARCH_TABLE, column('rowid'), column('english'), column('chinese'))
+
+def cjk_bigrams(text):
+    """
+    把中文切分为相邻两字组成的词（"信用体系" -> "信用 用体 体系 系"），非中文部分原样保留
+    每段汉字的最后一个字单独成词，单字检索用前缀匹配即可覆盖所有位置
+    """
+    parts = []
+    position = 0
+    for match in CJK_RUN.finditer(text):
+        parts.append(text[position:match.start()])
+        run = match.group()
+        parts.extend(run[i:i + 2] for i in range(len(run) - 1))
+        parts.append(run[-1])
+        position = match.end()
+    parts.append(text[position:])
+    return ' '.join(part for part in parts if part.strip())
+
+def match_query(query, prefix=True):
+    """
+    把用户输入转为FTS5查询（所有词都需要匹配），用户输入中的运算符和引号不会生效
+    
+    Args:
+        prefix: 最后一个英文词按前缀匹配（边输入边检索）
+    
+    Returns:
+        FTS5 MATCH表达式，输入中没有可检索的词时返回None
+    """
+    terms = []
+    tokens = QUERY_TOKEN.findall(query)
+    for index, token in enumerate(tokens):
+        if CJK_RUN.fullmatch(token):
+            if len(token) == 1:
+                terms.append(f'chinese : "{token}"*')
+            else:
+                bigrams = ' '.join(token[i:i + 2] for i in range(len(token) - 1))
+                terms.append(f'chinese : "{bigrams}"')
+        else:
+            last = prefix and index == len(tokens) - 1
+            terms.append(f'english : "{token.lower()}"' + ('*' if last else ''))
+    return ' AND '.join(terms) if terms else None
+
+def _dialect_name(conn):
+    """连接或会话对应的数据库类型"""
+    bind = conn if hasattr(conn, 'dialect') else conn.get_bind()
+    return bind.dialect.name
+
+def create_search_index(conn):
+    """创建全文索引表（仅SQLite）"""
+    if _dialect_name(conn) == 'sqlite':
+        conn.execute(CREATE_SEARCH_TABLE)
+
+def update_search_index(conn, batch_size=INDEX_BATCH_SIZE):
+    """
+    把尚未索引的新句子加入全文索引（不提交，需与写入句子在同一事务中提交）
+    
+    Args:
+        conn: 数据库连接或会话
+    
+    Returns:
+        新索引的句子数
+    """
+    if _dialect_name(conn) != 'sqlite':
+        return 0
+    if hasattr(conn, 'flush'):
+        # 会话中尚未写入数据库的句子也要索引
+        conn.flush()
+    last_id = get_meta(conn, SEARCH_INDEXED_KEY)
+    indexed = 0
+    while True:
+        rows = conn.execute(
+            select(Sentence.id, Sentence.english, Sentence.chinese)
+            .where(Sentence.id > last_id)
+            .order_by(Sentence.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            break
+        conn.execute(insert(search_table), [
+            {'rowid': row.id, 'english': row.english, 'chinese': cjk_bigrams(row.chinese)}
+            for row in rows
+        ])
+        indexed += len(rows)
+        last_id = rows[-1].id
+    if indexed:
+        set_meta(conn, SEARCH_INDEXED_KEY, last_id)
+    return indexed
+
+def index_missing_sentences(conn, batch_size=INDEX_BATCH_SIZE):
+    """
+    把句子表中有、全文索引中没有的句子加入索引（不提交）
+    句子表改为AUTOINCREMENT之前，删除最大ID的句子后新句子会重用该ID，而ID不大于已索引的最大ID，不会被增量索引
+    
+    Returns:
+        补充索引的句子数
+    """
+    if _dialect_name(conn) != 'sqlite':
+        return 0
+    indexed_ids = select(search_table.c.rowid).where(search_table.c.rowid == Sentence.id)
+    rows = conn.execute(
+        select(Sentence.id, Sentence.english, Sentence.chinese).where(~indexed_ids.exists()).order_by(Sentence.id)
+    ).all()
+    for start in range(0, len(rows), batch_size):
+        conn.execute(insert(search_table), [
+            {'rowid': row.id, 'english': row.english, 'chinese': cjk_bigrams(row.chinese)}
+            for row in rows[start:start + batch_size]
+        ])
+    return len(rows)
+
+def remove_from_search_index(conn, sentence_ids):
+    """从全文索引中删除句子（删除句子时在同一事务中调用，不提交）"""
+    if _dialect_name(conn) != 'sqlite':
+        return
+    sentence_ids = list(sentence_ids)
+    for start in range(0, len(sentence_ids), INDEX_BATCH_SIZE):
+        batch = sentence_ids[start:start + INDEX_BATCH_SIZE]
+        conn.execute(search_table.delete().where(search_table.c.rowid.in_(batch)))
+
+def rebuild_search_index(conn):
+    """清空并重建全文索引（句子被删除或修改后使用）"""
+    if _dialect_name(conn) != 'sqlite':
+        return 0
+    create_search_index(conn)
+    conn.execute(search_table.delete())
+    set_meta(conn, SEARCH_INDEXED_KEY, 0)
+    return update_search_index(conn)
+
+def search_statement(query, difficulties=None, limit=20, offset=0, dialect='sqlite', prefix=True):
+    """
+    检索查询语句，返回 id, chinese, english, difficulty 四列；同步和异步会话都可执行
+    
+    Returns:
+        查询语句，输入中没有可检索的词时返回None
+    """
+    columns = (Sentence.id, Sentence.chinese, Sentence.english, Sentence.difficulty)
+    if dialect != 'sqlite':
+        words = QUERY_TOKEN.findall(query)
+        if not words:
+            return None
+        statement = select(*columns).order_by(Sentence.id)
+        for word in words:
+            pattern = f'%{word}%'
+            statement = statement.where(or_(Sentence.english.ilike(pattern), Sentence.chinese.like(pattern)))
+        if difficulties:
+            statement = statement.where(Sentence.difficulty.in_(difficulties))
+        return statement.limit(limit).offset(offset)
+    
+    expression = match_query(query, prefix)
+    if expression is None:
+        return None
+    # 先取出至多MAX_RANKED_MATCHES个候选再按bm25排序，常见词命中大量句子时不必为每个命中计算得分
+    sql = f'SELECT {SEARCH_TABLE}.rowid AS sentence_id, {SEARCH_TABLE}.rank AS score FROM {SEARCH_TABLE}'
+    where = f'{SEARCH_TABLE} MATCH :match'
+    params = [bindparam('match', expression), bindparam('candidates', MAX_RANKED_MATCHES)]
+    if difficulties:
+        # CROSS JOIN固定由全文索引驱动连接，否则SQLite可能先按难度扫描句子表、逐行执行全文匹配
+        sql += f' CROSS JOIN sentences ON sentences.id = {SEARCH_TABLE}.rowid'
+        where += ' AND sentences.difficulty IN :difficulties'
+        params.append(bindparam('difficulties', list(difficulties), expanding=True))
+    candidates = (
+        text(f'{sql} WHERE {where} LIMIT :candidates')
+        .bindparams(*params)
+        .columns(sentence_id=Integer, score=Float)
+        .subquery('candidates')
+    )
+    return (
+        select(*columns)
+        .join_from(candidates, Sentence.__table__, Sentence.id == candidates.c.sentence_id)
+        .order_by(candidates.c.score, Sentence.id)
+        .limit(limit)
+        .offset(offset)
+    )
+
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='建立或更新句子全文索引')
+    parser.add_argument('--rebuild', action='store_true', help='清空后重建全部索引（默认只索引新增的句子）')
+    args = parser.parse_args()
+    
+    from database import engine, init_db
+    init_db()
+    if engine.dialect.name != 'sqlite':
+        print("全文索引仅支持SQLite，其他数据库检索时使用LIKE查询")
+        sys.exit(1)
+    
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        count = rebuild_search_index(conn) if args.rebuild else update_search_index(conn)
+        total = conn.execute(select(func.count()).select_from(search_table)).scalar()
+    print(f"已索引 {count} 条句子（索引中共 {total} 条），耗时 {time.perf_counter() - started:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+流式读取上传的表格文件（.xlsx/.xls/.csv/.tsv），按块返回行数据，内存占用与文件大小无关
+每行固定返回3个单元格：中文、英文、难度（没有的列为None）
+"""
+import csv
+import io
+import os
+import zipfile
+
+# 支持的文件扩展名
+SUPPORTED_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.tsv')
+
+# 每块行数
+DEFAULT_CHUNK_SIZE = 5000
+
+# 读取的列数：中文、英文、难度
+COLUMN_COUNT = 3
+
+class SheetFormatError(ValueError):
+    """文件格式错误或超出限制，错误信息可直接返回给用户"""
+
+def iter_row_chunks(source, filename=None, chunk_size=DEFAULT_CHUNK_SIZE, max_rows=None):
+    """
+    按块迭代表格中的行
+    
+    Args:
+        source: 文件路径或二进制文件对象（如上传的文件流）
+        filename: 用于判断文件类型的文件名，source为路径时可省略
+        chunk_size: 每块的行数
+        max_rows: 最大行数，超出时抛出SheetFormatError
+    
+    Yields:
+        行列表，每行为 (中文, 英文, 难度) 三元组，单元格为原始值
+    """
+    filename = filename or source
+    ext = os.path.splitext(str(filename))[1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
+        raise SheetFormatError('只支持Excel或CSV文件(.xlsx, .xls, .csv, .tsv)')
+    
+    if ext == '.xlsx':
+        rows = _iter_xlsx(source)
+    elif ext == '.xls':
+        rows = _iter_xls(source)
+    else:
+        rows = _iter_delimited(source, '\t' if ext == '.tsv' else ',')
+    
+    chunk = []
+    row_count = 0
+    has_second_column = False
+    for row in rows:
+        row_count += 1
+        if max_rows is not None and row_count > max_rows:
+            raise SheetFormatError(f'文件行数超过上限（{max_rows}行）')
+        if not has_second_column and not is_blank(row[1]):
+            has_second_column = True
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            # 第一块就检查列数，格式不对的文件尽早拒绝
+            if not has_second_column:
+                raise SheetFormatError('文件至少需要2列（中文、英文）')
+            yield chunk
+            chunk = []
+    
+    if not has_second_column:
+        raise SheetFormatError('文件至少需要2列（中文、英文）')
+    if chunk:
+        yield chunk
+
+def is_blank(value):
+    """单元格是否为空"""
+    return value is None or str(value).strip() in ('', 'nan')
+
+def cell_text(value):
+    """单元格值转为去除首尾空白的字符串，空单元格为空字符串"""
+    return '' if is_blank(value) else str(value).strip()
+
+def _pad(row):
+    """补齐或截断为固定列数"""
+    row = tuple(row[:COLUMN_COUNT])
+    return row + (None,) * (COLUMN_COUNT - len(row))
+
+def _iter_xlsx(source):
+    """openpyxl只读模式逐行读取第一个工作表"""
+    from openpyxl import load_workbook
+    
+    if not zipfile.is_zipfile(source):
+        raise SheetFormatError('文件不是有效的.xlsx文件')
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    try:
+        workbook = load_workbook(source, read_only=True, data_only=True)
+    except Exception as e:
+        raise SheetFormatError(f'无法解析Excel文件: {e}')
+    try:
+        for row in workbook.active.iter_rows(max_col=COLUMN_COUNT, values_only=True):
+            yield _pad(row)
+    finally:
+        workbook.close()
+
+def _iter_xls(source):
+    """旧版.xls格式没有流式解析器，交给pandas整体读取（该格式最多65536行）"""
+    import pandas as pd
+    
+    try:
+        df = pd.read_excel(source, header=None, usecols=lambda col: col < COLUMN_COUNT)
+    except Exception as e:
+        raise SheetFormatError(f'无法解析Excel文件: {e}')
+    for row in df.itertuples(index=False, name=None):
+        yield _pad(row)
+
+def _iter_delimited(source, delimiter):
+    """逐行读取CSV/TSV（UTF-8编码，可带BOM）"""
+    owns_stream = isinstance(source, (str, os.PathLike))
+    if owns_stream:
+        stream = open(source, 'r', encoding='utf-8-sig', newline='')
+    else:
+        stream = io.TextIOWrapper(source, encoding='utf-8-sig', newline='')
+    try:
+        for row in csv.reader(stream, delimiter=delimiter):
+            yield _pad(row)
+    except (UnicodeDecodeError, csv.Error) as e:
+        raise SheetFormatError(f'无法解析CSV文件（需为UTF-8编码）: {e}')
+    finally:
+        if owns_stream:
+            stream.close()
+        else:
+            # 不关闭调用方传入的文件对象
+            stream.detach()
@@ -1,80 +1,74 @@
 """
-更新数据库，添加分级标记和新数据
+更新数据库：执行尚未执行的语料数据迁移（补充难度标记、添加示例句子等，见 data_migrations.py）
+全部步骤在一个事务中完成，可重复运行
+
+用法: python3 update_data.py [--redo] [--dry-run]
 """
-from database import SessionLocal, init_db
-from models import Sentence
-from init_data import CET4_SENTENCES, IELTS_SENTENCES
+import argparse
+import sys
+import time
+from database import SessionLocal, init_db, bump_corpus_version
+from data_migrations import run_data_migrations, difficulty_counts
+from init_data import DIFFICULTY_NAMES
+from search_index import update_search_index
+from corpus_snapshot import rebuild_snapshot
 
-def update_database():
-    """更新数据库：标记现有数据为cet6，添加cet4和ielts数据"""
+def update_database(redo=False, dry_run=False):
+    """
+    执行数据迁移并显示各难度的句子数
+    
+    Args:
+        redo: 重新执行全部步骤
+        dry_run: 执行后回滚，只查看每个步骤会修改的行数
+    """
     init_db()
     db = SessionLocal()
     
     try:
-        # 1. 更新现有数据的difficulty为cet6（确保所有现有数据都是cet6）
-        existing_sentences = db.query(Sentence).all()
-        updated_count = 0
-        for sentence in existing_sentences:
-            if sentence.difficulty != 'cet6':
-                sentence.difficulty = 'cet6'
-                updated_count += 1
-        
-        if updated_count > 0:
-            db.commit()
-            print(f"已更新 {updated_count} 条现有记录的difficulty为cet6")
+        started = time.perf_counter()
+        results = run_data_migrations(db, redo=redo)
+        if not results:
+            print("数据已是最新版本，没有需要执行的迁移")
         
-        # 2. 检查是否已有cet4和ielts数据
-        cet4_count = db.query(Sentence).filter(Sentence.difficulty == 'cet4').count()
-        ielts_count = db.query(Sentence).filter(Sentence.difficulty == 'ielts').count()
-        
-        if cet4_count == 0:
-            # 添加四级句子
-            for item in CET4_SENTENCES:
-                sentence = Sentence(
-                    chinese=item['chinese'],
-                    english=item['english'],
-                    difficulty='cet4'
-                )
-                db.add(sentence)
-            db.commit()
-            print(f"成功添加 {len(CET4_SENTENCES)} 条CET4句子")
+        if dry_run:
+            db.rollback()
+            print("试运行完成，已回滚")
         else:
-            print(f"数据库中已有 {cet4_count} 条CET4句子，跳过添加")
-        
-        if ielts_count == 0:
-            # 添加雅思句子
-            for item in IELTS_SENTENCES:
-                sentence = Sentence(
-                    chinese=item['chinese'],
-                    english=item['english'],
-                    difficulty='ielts'
-                )
-                db.add(sentence)
+            changed = any(changed for _, _, changed, _ in results)
+            if changed:
+                update_search_index(db)
+                bump_corpus_version(db)
             db.commit()
-            print(f"成功添加 {len(IELTS_SENTENCES)} 条IELTS句子")
-        else:
-            print(f"数据库中已有 {ielts_count} 条IELTS句子，跳过添加")
-        
-        # 3. 显示统计信息
-        total = db.query(Sentence).count()
-        cet6_count = db.query(Sentence).filter(Sentence.difficulty == 'cet6').count()
-        cet4_count = db.query(Sentence).filter(Sentence.difficulty == 'cet4').count()
-        ielts_count = db.query(Sentence).filter(Sentence.difficulty == 'ielts').count()
+            if changed:
+                rebuild_snapshot()
+        print(f"耗时: {time.perf_counter() - started:.2f}s")
         
+        # 统计信息
+        counts = difficulty_counts(db)
         print("\n数据库统计：")
-        print(f"  - CET6 (六级): {cet6_count} 条")
-        print(f"  - CET4 (四级): {cet4_count} 条")
-        print(f"  - IELTS (雅思): {ielts_count} 条")
-        print(f"总计: {total} 条")
-        
+        for difficulty, count in counts.items():
+            print(f"  - {DIFFICULTY_NAMES.get(difficulty, difficulty)}: {count} 条")
+        print(f"总计: {sum(counts.values())} 条")
+        return True
+    
     except Exception as e:
         db.rollback()
         print(f"更新数据时出错: {e}")
         import traceback
         traceback.print_exc()
+        return False
     finally:
         db.close()
 
-if __name__ == '__main__':
-    update_database()
+def main():
+    """主函数"""
+    parser = argparse.ArgumentParser(description='执行语料数据迁移')
+    parser.add_argument('--redo', action='store_true', help='重新执行全部步骤（步骤可重复执行）')
+    parser.add_argument('--dry-run', action='store_true', help='执行后回滚，只显示每个步骤会修改的行数')
+    args = parser.parse_args()
+    
+    if not update_database(redo=args.redo, dry_run=args.dry_run):
+        sys.exit(1)
 
+if __name__ == '__main__':
+    main()
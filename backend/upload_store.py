@@ -0,0 +1,195 @@
+"""
+用户自定义句子集的磁盘缓存
+按上传文件内容的SHA-256寻址，同一文件只解析一次；总行数超出上限时按最近使用时间淘汰
+"""
+import hashlib
+import re
+import sqlite3
+import time
+from contextlib import contextmanager
+from sheet_reader import iter_row_chunks, cell_text
+
+# 计算文件哈希时每次读取的字节数
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# 句子集ID格式（SHA-256十六进制）
+SET_ID_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# 最近使用时间的更新间隔（秒）：读取时只有距上次记录超过该间隔才写入，普通读取不占用写锁
+TOUCH_INTERVAL = 300
+
+def hash_upload(stream):
+    """计算上传文件内容的SHA-256，读取后把文件指针移回开头"""
+    digest = hashlib.sha256()
+    while True:
+        block = stream.read(HASH_BLOCK_SIZE)
+        if not block:
+            break
+        digest.update(block)
+    stream.seek(0)
+    return digest.hexdigest()
+
+def is_valid_set_id(set_id):
+    """句子集ID是否合法"""
+    return bool(SET_ID_PATTERN.match(set_id))
+
+def iter_upload_sentences(source, filename, max_rows=None):
+    """流式解析上传文件，逐条产出句子（ID为文件中的行号）"""
+    row_number = 0
+    for chunk in iter_row_chunks(source, filename, max_rows=max_rows):
+        for row in chunk:
+            row_number += 1
+            chinese = cell_text(row[0])
+            english = cell_text(row[1])
+            
+            # 跳过空行
+            if not chinese or not english:
+                continue
+            
+            yield {
+                'id': row_number,
+                'chinese': chinese,
+                'english': english
+            }
+
+class UploadStore:
+    """以SQLite文件保存解析后的句子集，每次操作使用独立连接，可在多线程/多进程下共用"""
+    
+    def __init__(self, path, max_rows=1000000):
+        """
+        Args:
+            path: 缓存数据库文件路径
+            max_rows: 所有句子集的总行数上限
+        """
+        self.path = path
+        self.max_rows = max_rows
+        with self._connect() as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS upload_sets (
+                    set_id TEXT PRIMARY KEY,
+                    total INTEGER NOT NULL,
+                    last_used REAL NOT NULL
+                )
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS upload_sentences (
+                    set_id TEXT NOT NULL,
+                    position INTEGER NOT NULL,
+                    id INTEGER NOT NULL,
+                    chinese TEXT NOT NULL,
+                    english TEXT NOT NULL,
+                    PRIMARY KEY (set_id, position)
+                ) WITHOUT ROWID
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_upload_sentences_id ON upload_sentences (set_id, id)')
+    
+    @contextmanager
+    def _connect(self):
+        """打开连接并开启事务，退出时提交（异常时回滚）并关闭连接"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+    
+    def get_total(self, set_id):
+        """返回句子集的句子数，未缓存时返回None；最近使用时间超过TOUCH_INTERVAL秒未更新时顺便更新"""
+        with self._connect() as conn:
+            row = conn.execute('SELECT total, last_used FROM upload_sets WHERE set_id = ?', (set_id,)).fetchone()
+            if row is None:
+                return None
+            total, last_used = row
+            now = time.time()
+            if now - last_used >= TOUCH_INTERVAL:
+                conn.execute('UPDATE upload_sets SET last_used = ? WHERE set_id = ?', (now, set_id))
+            return total
+    
+    def put(self, set_id, sentences):
+        """
+        保存句子集（在一个事务中流式写入，不在内存中汇总）
+        
+        Args:
+            set_id: 文件内容哈希
+            sentences: 句子字典的可迭代对象，含 id, chinese, english
+        
+        Returns:
+            句子数
+        """
+        with self._connect() as conn:
+            conn.execute('DELETE FROM upload_sentences WHERE set_id = ?', (set_id,))
+            conn.executemany(
+                'INSERT INTO upload_sentences (set_id, position, id, chinese, english) VALUES (?, ?, ?, ?, ?)',
+                ((set_id, position, s['id'], s['chinese'], s['english']) for position, s in enumerate(sentences))
+            )
+            total = conn.execute(
+                'SELECT COUNT(*) FROM upload_sentences WHERE set_id = ?', (set_id,)
+            ).fetchone()[0]
+            conn.execute(
+                'INSERT OR REPLACE INTO upload_sets (set_id, total, last_used) VALUES (?, ?, ?)',
+                (set_id, total, time.time())
+            )
+            self._evict(conn, keep=set_id)
+        return total
+    
+    def page(self, set_id, offset=0, limit=200):
+        """按上传顺序取一页句子"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                'SELECT id, chinese, english FROM upload_sentences '
+                'WHERE set_id = ? AND position >= ? ORDER BY position LIMIT ?',
+                (set_id, offset, limit)
+            ).fetchall()
+        return [self._to_dict(row) for row in rows]
+    
+    def sentence_at(self, set_id, position):
+        """按位置取句子，超出范围时返回None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT id, chinese, english FROM upload_sentences WHERE set_id = ? AND position = ?',
+                (set_id, position)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+    
+    def get_sentence(self, set_id, sentence_id):
+        """按句子ID（上传文件中的行号）取句子，不存在时返回None"""
+        with self._connect() as conn:
+            row = conn.execute(
+                'SELECT id, chinese, english FROM upload_sentences WHERE set_id = ? AND id = ?',
+                (set_id, sentence_id)
+            ).fetchone()
+        return self._to_dict(row) if row else None
+    
+    def _evict(self, conn, keep):
+        """总行数超出上限时，从最久未使用的句子集开始删除"""
+        stored = conn.execute('SELECT COALESCE(SUM(total), 0) FROM upload_sets').fetchone()[0]
+        if stored <= self.max_rows:
+            return
+        candidates = conn.execute(
+            'SELECT set_id, total FROM upload_sets WHERE set_id != ? ORDER BY last_used',
+            (keep,)
+        ).fetchall()
+        for set_id, total in candidates:
+            if stored <= self.max_rows:
+                break
+            conn.execute('DELETE FROM upload_sentences WHERE set_id = ?', (set_id,))
+            conn.execute('DELETE FROM upload_sets WHERE set_id = ?', (set_id,))
+            stored -= total
+    
+    @staticmethod
+    def _to_dict(row):
+        return {
+            'id': row[0],
+            'chinese': row[1],
+            'english': row[2],
+            'difficulty': 'custom'
+        }
+
+def parse_upload_file(path, filename, set_id, store_path, max_rows, store_max_rows):
+    """
+    解析磁盘上的上传文件并写入缓存，返回句子数
+    只使用可序列化的参数，可以在进程池中执行（异步接口把解析交给子进程，不阻塞事件循环）
+    """
+    store = UploadStore(store_path, max_rows=store_max_rows)
+    return store.put(set_id, iter_upload_sentences(path, filename, max_rows=max_rows))
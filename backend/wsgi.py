@@ -0,0 +1,9 @@
+"""
+生产环境WSGI入口: gunicorn -c gunicorn.conf.py wsgi:app
+配置中开启了preload_app，本模块只在主进程导入一次，数据库结构初始化不会在每个worker中重复执行
+"""
+from database import init_db
+
+init_db()
+
+from app import app  # noqa: E402
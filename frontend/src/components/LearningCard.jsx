@@ -1,7 +1,29 @@
 import React, { useState, useEffect, useRef, useCallback } from 'react';
-import { getRandomSentence, getSentencesList, checkAnswer } from '../services/api';
+import {
+  getPrefetchedSentence,
+  getSentence,
+  getNextSentence,
+  startPracticeSession,
+  nextPracticeSentence,
+  previousPracticeSentence,
+  answerPracticeSentence,
+  checkAnswer
+} from '../services/api';
 import './LearningCard.css';
 
+// 随机播放时排除最近出现过的句子数量
+const RECENT_EXCLUDE_SIZE = 20;
+
+// 由服务端练习会话推进的播放模式（乱序播放：按会话的种子打乱，一轮内不重复）
+const SESSION_PLAY_MODES = ['sequential', 'shuffle'];
+
+// 顺序/乱序播放和上传句子集的练习由服务端会话推进（可在刷新后继续）；
+// 内置句子的随机播放（本地预取）、智能复习和未上传的临时句子在本地推进
+const usesPracticeSession = (settings) => (
+  settings.playMode !== 'review' &&
+  (settings.customSentences ? Boolean(settings.customSetId) : SESSION_PLAY_MODES.includes(settings.playMode))
+);
+
 const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
   const [sentence, setSentence] = useState(null);
   const [userAnswer, setUserAnswer] = useState('');
@@ -12,8 +34,9 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
   const [isPlaying, setIsPlaying] = useState(false); // 语音播放状态
   const [history, setHistory] = useState([]); // 历史记录（存储句子ID）
   const [historyIndex, setHistoryIndex] = useState(-1); // 当前在历史记录中的位置
-  const [sentenceList, setSentenceList] = useState([]); // 顺序播放时的句子列表
-  const [currentIndex, setCurrentIndex] = useState(0); // 顺序播放时的当前索引
+  const [sentenceList, setSentenceList] = useState([]); // 临时句子列表
+  const [currentIndex, setCurrentIndex] = useState(0); // 临时句子顺序播放时的当前索引
+  const [practiceSession, setPracticeSession] = useState(null); // 服务端练习会话 { id, hasPrevious }
   const [currentFocusIndex, setCurrentFocusIndex] = useState(0); // 当前聚焦的输入位置
   const [lockedChars, setLockedChars] = useState([]); // 已锁定的正确字符位置（布尔数组）
   const inputRef = useRef(null);
@@ -38,71 +61,57 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
     }
   }, []);
 
-  // 初始化：如果是顺序播放，先加载句子列表
+  // 初始化：顺序/乱序播放和上传的句子集由服务端练习会话出题，其余模式在本地出题
   useEffect(() => {
     if (!settings) return;
+    let cancelled = false;
+    setPracticeSession(null);
     
-    // 如果使用自定义数据
-    if (settings.customSentences) {
-      const sentences = settings.customSentences;
-      setSentenceList(sentences);
-      
-      if (settings.playMode === 'sequential') {
-        setCurrentIndex(0);
-        if (sentences.length > 0) {
-          loadSentence(sentences[0]);
-          setHistory([sentences[0].id]);
-          setHistoryIndex(0);
-          if (onProgressChange) {
-            onProgressChange({
-              current: 1,
-              total: sentences.length
-            });
-          }
-        }
-      } else {
-        // 随机播放
-        const randomSentence = sentences[Math.floor(Math.random() * sentences.length)];
-        loadSentence(randomSentence);
-        setHistory([randomSentence.id]);
-        setHistoryIndex(0);
-        if (onProgressChange) {
-          onProgressChange(null);
-        }
-      }
-    } else if (settings.playMode === 'sequential') {
-      const loadSentenceList = async () => {
+    if (usesPracticeSession(settings)) {
+      // 同一练习范围的会话ID保存在本地，刷新页面后从上次的位置继续
+      const openPracticeSession = async () => {
         try {
-          const response = await getSentencesList(settings.difficulties);
-          setSentenceList(response.sentences);
-          setCurrentIndex(0);
-          // 加载第一个句子
-          if (response.sentences.length > 0) {
-            await loadSentence(response.sentences[0]);
-            setHistory([response.sentences[0].id]);
-            setHistoryIndex(0);
-            // 更新进度信息
-            if (onProgressChange) {
-              onProgressChange({
-                current: 1,
-                total: response.sentences.length
-              });
-            }
-          }
+          const state = await startPracticeSession({
+            mode: SESSION_PLAY_MODES.includes(settings.playMode) ? settings.playMode : 'random',
+            difficulties: settings.difficulties,
+            setId: settings.customSetId
+          });
+          if (cancelled) return;
+          await applySessionState(state);
         } catch (error) {
-          console.error('加载句子列表失败:', error);
-          alert('加载句子列表失败，请稍后重试');
+          console.error('加载句子失败:', error);
+          alert('加载句子失败，请稍后重试');
         }
       };
-      loadSentenceList();
-    } else if (settings) {
-      // 随机播放模式
+      openPracticeSession();
+    } else if (settings.customSentences) {
+      // 未上传到服务端的临时句子全部在本地
+      const sentences = settings.customSentences;
+      setSentenceList(sentences);
+      setCurrentIndex(0);
+      if (sentences.length > 0) {
+        const first = settings.playMode === 'sequential'
+          ? sentences[0]
+          : sentences[Math.floor(Math.random() * sentences.length)];
+        loadSentence(first);
+        setHistory([first.id]);
+        setHistoryIndex(0);
+      }
+      if (onProgressChange) {
+        onProgressChange(settings.playMode === 'sequential' ? { current: 1, total: sentences.length } : null);
+      }
+    } else {
+      // 内置句子的随机播放和智能复习模式
       loadNewSentence();
-      // 随机播放模式不显示进度
+      // 随机播放和智能复习模式不显示进度
       if (onProgressChange) {
         onProgressChange(null);
       }
     }
+    
+    return () => {
+      cancelled = true;
+    };
     // eslint-disable-next-line react-hooks/exhaustive-deps
   }, [settings]);
 
@@ -317,19 +326,37 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
     }
   }, []);
 
+  // 应用服务端返回的练习会话状态：显示当前题目并更新进度
+  const applySessionState = useCallback(async (state) => {
+    setPracticeSession({ id: state.session_id, hasPrevious: state.has_previous });
+    if (onProgressChange) {
+      onProgressChange(state.progress);
+    }
+    if (state.sentence) {
+      await loadSentence(state.sentence);
+    }
+  }, [loadSentence, onProgressChange]);
+
   const loadNewSentence = useCallback(async () => {
     if (!settings) return;
     
     try {
+      // 切换设置后的首次调用中practiceSession仍是上一次练习的会话，需同时判断当前设置
+      if (practiceSession && usesPracticeSession(settings)) {
+        // 由服务端按会话的顺序或随机模式出下一题
+        await applySessionState(await nextPracticeSentence(practiceSession.id));
+        return;
+      }
+      
       let data;
       
-      // 如果使用自定义数据
+      // 未上传的临时句子
       if (settings.customSentences) {
+        if (sentenceList.length === 0) {
+          alert('没有可用的句子');
+          return;
+        }
         if (settings.playMode === 'sequential') {
-          if (sentenceList.length === 0) {
-            alert('没有可用的句子');
-            return;
-          }
           const nextIndex = (currentIndex + 1) % sentenceList.length;
           data = sentenceList[nextIndex];
           setCurrentIndex(nextIndex);
@@ -341,27 +368,15 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
           }
         } else {
           // 随机播放
-          data = settings.customSentences[Math.floor(Math.random() * settings.customSentences.length)];
-        }
-      } else if (settings.playMode === 'sequential') {
-        // 顺序播放：取下一个句子
-        if (sentenceList.length === 0) {
-          alert('没有可用的句子');
-          return;
-        }
-        const nextIndex = (currentIndex + 1) % sentenceList.length;
-        data = sentenceList[nextIndex];
-        setCurrentIndex(nextIndex);
-        // 更新进度信息
-        if (onProgressChange) {
-          onProgressChange({
-            current: nextIndex + 1,
-            total: sentenceList.length
-          });
+          data = sentenceList[Math.floor(Math.random() * sentenceList.length)];
         }
+      } else if (settings.playMode === 'review') {
+        // 智能复习：由服务端按复习计划选择下一题
+        data = await getNextSentence(settings.difficulties);
       } else {
-        // 随机播放
-        data = await getRandomSentence(settings.difficulties);
+        // 随机播放（从预取的句子中取，排除最近出现过的句子）
+        const recentIds = history.slice(0, historyIndex + 1).slice(-RECENT_EXCLUDE_SIZE);
+        data = await getPrefetchedSentence(settings.difficulties, recentIds);
       }
       
       await loadSentence(data);
@@ -378,16 +393,26 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
       console.error('加载句子失败:', error);
       alert('加载句子失败，请稍后重试');
     }
-  }, [settings, loadSentence, historyIndex, sentenceList, currentIndex, onProgressChange]);
+  }, [settings, practiceSession, applySessionState, loadSentence, history, historyIndex, sentenceList, currentIndex, onProgressChange]);
 
   // 加载上一题
   const loadPreviousSentence = useCallback(async () => {
+    if (practiceSession) {
+      if (!practiceSession.hasPrevious) return;
+      try {
+        await applySessionState(await previousPracticeSentence(practiceSession.id));
+      } catch (error) {
+        console.error('加载上一题失败:', error);
+        alert('加载上一题失败，请稍后重试');
+      }
+      return;
+    }
     if (historyIndex > 0) {
       const previousId = history[historyIndex - 1];
       try {
         let data;
         
-        // 如果是自定义数据，从sentenceList中查找
+        // 如果是临时句子，从sentenceList中查找
         if (settings && settings.customSentences) {
           data = sentenceList.find(s => s.id === previousId);
           if (!data) {
@@ -395,12 +420,8 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
             return;
           }
         } else {
-          // 从API获取
-          const response = await fetch(`/api/sentence/${previousId}`);
-          if (!response.ok) {
-            throw new Error('获取句子失败');
-          }
-          data = await response.json();
+          // 最近出现过的句子直接从本地读取，否则从API获取
+          data = await getSentence(previousId);
         }
         
         await loadSentence(data);
@@ -424,7 +445,7 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
         alert('加载上一题失败，请稍后重试');
       }
     }
-  }, [history, historyIndex, loadSentence, settings, sentenceList, onProgressChange]);
+  }, [practiceSession, applySessionState, history, historyIndex, loadSentence, settings, sentenceList, onProgressChange]);
 
   const handleSubmit = async () => {
     // 从字符数组构建答案字符串（按顺序，只包括字母）
@@ -456,87 +477,13 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
     try {
       setLoading(true);
       
-      // 获取正确答案
-      let correctAnswer = '';
-      if (settings && settings.customSentences) {
-        correctAnswer = sentence.english.trim();
-      } else {
-        // 使用API检查答案
-        const checkResult = await checkAnswer(sentence.id, submittedAnswer);
-        correctAnswer = checkResult.correct_answer || sentence.english.trim();
-      }
-      
-      // 检查答案是否正确（先不锁定，只显示结果）
-      // 按单词比较，检查是否全部正确
-      const letterPositions = charPositions.filter(p => p.type === 'letter');
-      
-      // 将字符位置按单词分组
-      const words = [];
-      let currentWord = [];
-      
-      for (let i = 0; i < charPositions.length; i++) {
-        const pos = charPositions[i];
-        if (pos.type === 'letter') {
-          const charIdx = letterPositions.findIndex(p => p === pos);
-          currentWord.push({
-            posIndex: i,
-            charIndex: charIdx,
-            correctChar: pos.char
-          });
-        } else if (pos.type === 'spacing' || pos.type === 'space' || pos.type === 'punctuation') {
-          // 遇到分隔符，结束当前单词
-          if (currentWord.length > 0) {
-            words.push([...currentWord]);
-            currentWord = [];
-          }
-        }
-      }
-      // 添加最后一个单词
-      if (currentWord.length > 0) {
-        words.push(currentWord);
-      }
-      
-      // 检查是否所有单词都正确
-      let allCorrect = true;
-      for (const word of words) {
-        // 检查这个单词是否已经全部锁定
-        const isWordLocked = word.every(w => lockedChars[w.charIndex]);
-        if (isWordLocked) {
-          continue; // 已锁定的单词跳过
-        }
-        
-        // 构建用户输入的单词和正确答案的单词
-        let userWord = '';
-        let correctWord = '';
-        let allFilled = true;
-        
-        for (const w of word) {
-          const userChar = answerChars[w.charIndex] || '';
-          if (!userChar) {
-            allFilled = false;
-            allCorrect = false;
-            break;
-          }
-          userWord += userChar.toLowerCase();
-          correctWord += w.correctChar.toLowerCase();
-        }
-        
-        // 如果单词填写完整，检查是否正确
-        if (allFilled && userWord !== correctWord) {
-          allCorrect = false;
-        }
-      }
-      
-      // 检查是否所有位置都已锁定（全部正确）
-      const allLocked = lockedChars.every(locked => locked);
-      const finalCorrect = allLocked || allCorrect;
+      // 由服务端逐词比对；练习会话的答案同时记入会话历史
+      const checkResult = practiceSession
+        ? await answerPracticeSentence(practiceSession.id, sentence.id, submittedAnswer)
+        : await checkAnswer(sentence.id, submittedAnswer);
+      const correctAnswer = checkResult.correct_answer || sentence.english.trim();
       
       // 设置结果（只显示，不锁定）
-      const checkResult = {
-        is_correct: finalCorrect,
-        correct_answer: correctAnswer,
-        user_answer: submittedAnswer
-      };
       setResult(checkResult);
       
       // 显示结果后重新朗读正确答案
@@ -726,49 +673,33 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
       words.push(currentWord);
     }
     
-    // 逐个单词比较
-    for (const word of words) {
-      // 检查这个单词是否已经全部锁定
-      const isWordLocked = word.every(w => lockedChars[w.charIndex]);
-      if (isWordLocked) {
-        continue; // 已锁定的单词跳过
+    // 服务端比对结果中正确答案的第n个单词，就是格子中的第n个单词
+    const wordOps = ((result && result.diff) || []).filter(d => d.expected !== null && d.type === 'word');
+    
+    words.forEach((word, wordIdx) => {
+      // 已锁定的单词跳过
+      if (word.every(w => lockedChars[w.charIndex])) {
+        return;
       }
-      
-      // 构建用户输入的单词和正确答案的单词
-      let userWord = '';
-      let correctWord = '';
-      let allFilled = true;
-      
-      for (const w of word) {
-        const userChar = answerChars[w.charIndex] || '';
-        if (!userChar) {
-          allFilled = false;
-        }
-        userWord += userChar.toLowerCase();
-        correctWord += w.correctChar.toLowerCase();
+      // 如果单词没有任何输入，不做任何处理，保持为空
+      if (!word.some(w => answerChars[w.charIndex])) {
+        return;
       }
       
-      // 检查单词是否有任何输入
-      const hasAnyInput = word.some(w => answerChars[w.charIndex]);
-      
-      if (hasAnyInput) {
-        // 如果用户填写了完整的单词，进行比较
-        if (allFilled && userWord === correctWord) {
-          // 整个单词正确，锁定该单词的所有字符
-          for (const w of word) {
-            newLockedChars[w.charIndex] = true;
-            // 确保使用正确的字符（保持大小写）
-            newAnswerChars[w.charIndex] = w.correctChar;
-          }
-        } else {
-          // 整个单词错误或未填完整，清空该单词的所有字符
-          for (const w of word) {
-            newAnswerChars[w.charIndex] = '';
-          }
+      if (wordOps[wordIdx] && wordOps[wordIdx].op === 'equal') {
+        // 整个单词正确，锁定该单词的所有字符
+        for (const w of word) {
+          newLockedChars[w.charIndex] = true;
+          // 确保使用正确的字符（保持大小写）
+          newAnswerChars[w.charIndex] = w.correctChar;
+        }
+      } else {
+        // 整个单词错误或未填完整，清空该单词的所有字符
+        for (const w of word) {
+          newAnswerChars[w.charIndex] = '';
         }
       }
-      // 如果单词没有任何输入，不做任何处理，保持为空
-    }
+    });
     
     setLockedChars(newLockedChars);
     setAnswerChars(newAnswerChars);
@@ -794,7 +725,7 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
         inputRef.current.focus();
       }
     }, 100);
-  }, [answerChars, lockedChars, charPositions]);
+  }, [answerChars, lockedChars, charPositions, result]);
 
   // 全局键盘事件监听
   useEffect(() => {
@@ -998,7 +929,7 @@ const LearningCard = ({ settings, onBackToSettings, onProgressChange }) => {
             <button 
               className="prev-btn" 
               onClick={loadPreviousSentence}
-              disabled={loading || historyIndex <= 0}
+              disabled={loading || (practiceSession ? !practiceSession.hasPrevious : historyIndex <= 0)}
             >
               上一题
             </button>
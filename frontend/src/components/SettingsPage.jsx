@@ -9,10 +9,10 @@ const SettingsPage = ({ onStart }) => {
     ielts: false,
     custom: false
   });
-  const [playMode, setPlayMode] = useState('random'); // 'random' or 'sequential'
+  const [playMode, setPlayMode] = useState('random'); // 'random', 'sequential', 'shuffle' or 'review'
   const [customFile, setCustomFile] = useState(null);
   const [uploading, setUploading] = useState(false);
-  const [customSentences, setCustomSentences] = useState(null);
+  const [customSet, setCustomSet] = useState(null); // 服务端解析后的句子集（set_id、第一页句子、总数）
 
   const handleDifficultyChange = (difficulty) => {
     // 如果是选择自定义，取消其他选项
@@ -25,7 +25,7 @@ const SettingsPage = ({ onStart }) => {
       });
       if (!difficulties.custom) {
         setCustomFile(null);
-        setCustomSentences(null);
+        setCustomSet(null);
       }
     } else {
       // 如果选择其他选项，取消自定义
@@ -35,7 +35,7 @@ const SettingsPage = ({ onStart }) => {
         custom: false
       }));
       setCustomFile(null);
-      setCustomSentences(null);
+      setCustomSet(null);
     }
   };
 
@@ -48,7 +48,7 @@ const SettingsPage = ({ onStart }) => {
       custom: false
     });
     setCustomFile(null);
-    setCustomSentences(null);
+    setCustomSet(null);
   };
 
   const handleFileChange = async (e) => {
@@ -56,8 +56,9 @@ const SettingsPage = ({ onStart }) => {
     if (!file) return;
     
     // 检查文件类型
-    if (!file.name.endsWith('.xlsx') && !file.name.endsWith('.xls')) {
-      alert('请上传Excel文件（.xlsx或.xls格式）');
+    const lowerName = file.name.toLowerCase();
+    if (!['.xlsx', '.xls', '.csv', '.tsv'].some(ext => lowerName.endsWith(ext))) {
+      alert('请上传Excel或CSV文件（.xlsx、.xls、.csv或.tsv格式）');
       return;
     }
     
@@ -66,12 +67,12 @@ const SettingsPage = ({ onStart }) => {
     
     try {
       const result = await uploadExcel(file);
-      setCustomSentences(result.sentences);
+      setCustomSet(result);
       alert(`成功解析 ${result.total} 条句子！`);
     } catch (error) {
       alert(`解析文件失败: ${error.message}`);
       setCustomFile(null);
-      setCustomSentences(null);
+      setCustomSet(null);
     } finally {
       setUploading(false);
     }
@@ -80,15 +81,19 @@ const SettingsPage = ({ onStart }) => {
   const handleStart = () => {
     // 如果选择了自定义
     if (difficulties.custom) {
-      if (!customSentences || customSentences.length === 0) {
+      if (!customSet || customSet.total === 0) {
         alert('请先上传Excel文件');
         return;
       }
       
       onStart({
         difficulties: ['custom'],
-        playMode: playMode,
-        customSentences: customSentences
+        // 上传的句子不参与智能复习，按随机播放处理
+        playMode: playMode === 'review' ? 'random' : playMode,
+        // 只携带第一页，后续句子按需从服务端获取
+        customSetId: customSet.set_id,
+        customSentences: customSet.sentences,
+        customTotal: customSet.total
       });
       return;
     }
@@ -112,7 +117,7 @@ const SettingsPage = ({ onStart }) => {
   const standardDifficulties = ['cet4', 'cet6', 'ielts'];
   const allSelected = standardDifficulties.every(key => difficulties[key]);
   const someSelected = standardDifficulties.some(key => difficulties[key]) || 
-                       (difficulties.custom && customSentences);
+                       (difficulties.custom && customSet);
 
   return (
     <div className="settings-page">
@@ -179,7 +184,7 @@ const SettingsPage = ({ onStart }) => {
               <label className="file-upload-label">
                 <input
                   type="file"
-                  accept=".xlsx,.xls"
+                  accept=".xlsx,.xls,.csv,.tsv"
                   onChange={handleFileChange}
                   className="file-input"
                   disabled={uploading}
@@ -188,9 +193,9 @@ const SettingsPage = ({ onStart }) => {
                   {uploading ? '解析中...' : (customFile ? customFile.name : '选择Excel文件')}
                 </span>
               </label>
-              {customSentences && (
+              {customSet && (
                 <div className="file-info">
-                  已加载 {customSentences.length} 条句子
+                  已加载 {customSet.total} 条句子
                 </div>
               )}
               <div className="file-format-hint">
@@ -226,13 +231,38 @@ const SettingsPage = ({ onStart }) => {
               />
               <span className="radio-text">顺序播放</span>
             </label>
+            
+            <label className="radio-label">
+              <input
+                type="radio"
+                name="playMode"
+                value="shuffle"
+                checked={playMode === 'shuffle'}
+                onChange={(e) => setPlayMode(e.target.value)}
+                className="radio-input"
+              />
+              <span className="radio-text">乱序播放</span>
+            </label>
+            
+            <label className="radio-label">
+              <input
+                type="radio"
+                name="playMode"
+                value="review"
+                checked={playMode === 'review'}
+                onChange={(e) => setPlayMode(e.target.value)}
+                disabled={difficulties.custom}
+                className="radio-input"
+              />
+              <span className="radio-text">智能复习</span>
+            </label>
           </div>
         </div>
 
         <button 
           className="start-button"
           onClick={handleStart}
-          disabled={!someSelected || (difficulties.custom && !customSentences)}
+          disabled={!someSelected || (difficulties.custom && !customSet)}
         >
           开始学习
         </button>
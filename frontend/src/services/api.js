@@ -1,10 +1,25 @@
 const API_BASE_URL = '/api';
+const LEARNER_ID_KEY = 'learnerId';
 
-export const getRandomSentence = async (difficulties = []) => {
+// 学习者ID：首次使用时生成并保存在本地，服务端据此记录每个句子的复习状态
+export const getLearnerId = () => {
+  let learnerId = localStorage.getItem(LEARNER_ID_KEY);
+  if (!learnerId) {
+    learnerId = Date.now().toString(36) + '-' + Math.random().toString(36).slice(2, 12);
+    localStorage.setItem(LEARNER_ID_KEY, learnerId);
+  }
+  return learnerId;
+};
+
+export const getRandomSentence = async (difficulties = [], exclude = []) => {
   const params = new URLSearchParams();
   if (difficulties.length > 0) {
     params.append('difficulties', difficulties.join(','));
   }
+  // 排除最近出现过的句子，减少重复
+  if (exclude.length > 0) {
+    params.append('exclude', exclude.join(','));
+  }
   const url = `${API_BASE_URL}/sentence/random${params.toString() ? '?' + params.toString() : ''}`;
   const response = await fetch(url);
   if (!response.ok) {
@@ -13,11 +28,182 @@ export const getRandomSentence = async (difficulties = []) => {
   return response.json();
 };
 
-export const getSentencesList = async (difficulties = []) => {
+// 批量获取句子：随机抽取count个不重复的句子，或传入ids按顺序获取（不存在的句子会被跳过）
+export const getSentencesBatch = async ({ difficulties = [], count, exclude = [], ids } = {}) => {
+  const params = new URLSearchParams();
+  if (ids) {
+    params.append('ids', ids.join(','));
+  } else {
+    if (difficulties.length > 0) {
+      params.append('difficulties', difficulties.join(','));
+    }
+    if (count) {
+      params.append('n', count);
+    }
+    if (exclude.length > 0) {
+      params.append('exclude', exclude.join(','));
+    }
+  }
+  const response = await fetch(`${API_BASE_URL}/sentences/batch?${params.toString()}`);
+  if (!response.ok) {
+    throw new Error('获取句子失败');
+  }
+  return (await response.json()).sentences;
+};
+
+// 固定容量的环形缓冲区，写满后覆盖最早的元素
+class RingBuffer {
+  constructor(capacity) {
+    this.items = new Array(capacity);
+    this.start = 0;
+    this.length = 0;
+  }
+
+  push(item) {
+    const capacity = this.items.length;
+    this.items[(this.start + this.length) % capacity] = item;
+    if (this.length < capacity) {
+      this.length += 1;
+    } else {
+      this.start = (this.start + 1) % capacity;
+    }
+  }
+
+  shift() {
+    if (this.length === 0) {
+      return undefined;
+    }
+    const item = this.items[this.start];
+    this.items[this.start] = undefined;
+    this.start = (this.start + 1) % this.items.length;
+    this.length -= 1;
+    return item;
+  }
+
+  find(predicate) {
+    for (let i = 0; i < this.length; i++) {
+      const item = this.items[(this.start + i) % this.items.length];
+      if (predicate(item)) {
+        return item;
+      }
+    }
+    return undefined;
+  }
+
+  toArray() {
+    return Array.from({ length: this.length }, (_, i) => this.items[(this.start + i) % this.items.length]);
+  }
+
+  clear() {
+    this.items.fill(undefined);
+    this.start = 0;
+    this.length = 0;
+  }
+}
+
+// 预取的随机句子数量，剩余不足PREFETCH_LOW_WATER时在后台补充
+const PREFETCH_SIZE = 10;
+const PREFETCH_LOW_WATER = 3;
+// 最近取到的句子数量（上一题直接从这里读取）
+const RECENT_SENTENCE_SIZE = 100;
+
+const prefetched = new RingBuffer(PREFETCH_SIZE);
+const recentSentences = new RingBuffer(RECENT_SENTENCE_SIZE);
+let prefetchKey = null;
+let prefetchRequest = null;
+
+const rememberSentences = (sentences) => {
+  sentences.forEach(sentence => recentSentences.push(sentence));
+};
+
+// 补充预取缓冲，同一时刻只有一个请求；难度变化后旧请求的结果被丢弃
+const refillPrefetch = (difficulties, exclude) => {
+  if (prefetchRequest) {
+    return prefetchRequest;
+  }
+  const key = difficulties.join(',');
+  const buffered = prefetched.toArray().map(s => s.id);
+  prefetchRequest = getSentencesBatch({
+    difficulties,
+    count: PREFETCH_SIZE - prefetched.length,
+    exclude: exclude.concat(buffered),
+  }).then(sentences => {
+    if (key === prefetchKey) {
+      sentences.forEach(sentence => prefetched.push(sentence));
+      rememberSentences(sentences);
+    }
+  }).finally(() => {
+    prefetchRequest = null;
+  });
+  return prefetchRequest;
+};
+
+// 随机播放的下一题：优先从预取缓冲中取（跳过最近出现过的句子），缓冲快用完时在后台补充
+export const getPrefetchedSentence = async (difficulties = [], exclude = []) => {
+  const key = difficulties.join(',');
+  if (key !== prefetchKey) {
+    prefetchKey = key;
+    prefetched.clear();
+  }
+  const excluded = new Set(exclude);
+  for (let attempt = 0; attempt < 3; attempt++) {
+    let sentence = prefetched.shift();
+    while (sentence && excluded.has(sentence.id)) {
+      sentence = prefetched.shift();
+    }
+    if (sentence) {
+      if (prefetched.length < PREFETCH_LOW_WATER) {
+        refillPrefetch(difficulties, exclude).catch(error => console.error('预取句子失败:', error));
+      }
+      return sentence;
+    }
+    // 缓冲为空（首次使用或预取未完成），等待补充
+    await refillPrefetch(difficulties, exclude);
+  }
+  // 可选句子都被排除时退回单个随机句子
+  const sentence = await getRandomSentence(difficulties, exclude);
+  rememberSentences([sentence]);
+  return sentence;
+};
+
+// 按ID获取句子（上一题）：最近取到的句子不再请求网络
+export const getSentence = async (sentenceId) => {
+  const cached = recentSentences.find(s => s.id === sentenceId);
+  if (cached) {
+    return cached;
+  }
+  const response = await fetch(`${API_BASE_URL}/sentence/${sentenceId}`);
+  if (!response.ok) {
+    throw new Error('获取句子失败');
+  }
+  return response.json();
+};
+
+// 智能复习：获取最早到期需要复习的句子，没有到期的句子时返回新句子
+export const getNextSentence = async (difficulties = []) => {
+  const params = new URLSearchParams({ learner_id: getLearnerId() });
+  if (difficulties.length > 0) {
+    params.append('difficulties', difficulties.join(','));
+  }
+  const response = await fetch(`${API_BASE_URL}/sentence/next?${params.toString()}`);
+  if (!response.ok) {
+    throw new Error('获取句子失败');
+  }
+  return response.json();
+};
+
+export const getSentencesList = async (difficulties = [], { afterId, limit } = {}) => {
   const params = new URLSearchParams();
   if (difficulties.length > 0) {
     params.append('difficulties', difficulties.join(','));
   }
+  // 游标分页：返回id大于afterId的前limit条
+  if (afterId !== undefined && afterId !== null) {
+    params.append('after_id', afterId);
+  }
+  if (limit) {
+    params.append('limit', limit);
+  }
   const url = `${API_BASE_URL}/sentences/list${params.toString() ? '?' + params.toString() : ''}`;
   const response = await fetch(url);
   if (!response.ok) {
@@ -43,7 +229,104 @@ export const uploadExcel = async (file) => {
   return response.json();
 };
 
-export const checkAnswer = async (sentenceId, answer) => {
+// 上传句子集：分页获取句子
+export const getUploadSetPage = async (setId, offset = 0, limit) => {
+  const params = new URLSearchParams({ offset });
+  if (limit) {
+    params.append('limit', limit);
+  }
+  const response = await fetch(`${API_BASE_URL}/upload-sets/${setId}/sentences?${params.toString()}`);
+  if (!response.ok) {
+    throw new Error('获取句子列表失败');
+  }
+  return response.json();
+};
+
+// 上传句子集：按ID获取句子（用于上一题）
+export const getUploadSetSentence = async (setId, sentenceId) => {
+  const response = await fetch(`${API_BASE_URL}/upload-sets/${setId}/sentence/${sentenceId}`);
+  if (!response.ok) {
+    throw new Error('获取句子失败');
+  }
+  return response.json();
+};
+
+// 上传句子集：随机获取句子
+export const getUploadSetRandom = async (setId, exclude = []) => {
+  const params = new URLSearchParams();
+  if (exclude.length > 0) {
+    params.append('exclude', exclude.join(','));
+  }
+  const url = `${API_BASE_URL}/upload-sets/${setId}/random${params.toString() ? '?' + params.toString() : ''}`;
+  const response = await fetch(url);
+  if (!response.ok) {
+    throw new Error('获取句子失败');
+  }
+  return response.json();
+};
+
+// 练习会话：服务端保存练习范围、顺序练习的位置和答题历史，会话ID按练习范围保存在本地，刷新页面后继续
+const SESSION_KEY_PREFIX = 'practiceSession:';
+
+const practiceSessionKey = ({ mode, difficulties = [], setId }) => (
+  SESSION_KEY_PREFIX + mode + ':' + (setId ? `set:${setId}` : [...difficulties].sort().join(','))
+);
+
+const postSession = async (url, body = {}) => {
+  const response = await fetch(url, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify(body),
+  });
+  if (!response.ok) {
+    const error = await response.json().catch(() => ({}));
+    throw new Error(error.error || '练习会话请求失败');
+  }
+  return response.json();
+};
+
+// 开始练习：本地保存过同一练习范围的会话时继续该会话，否则创建新会话
+// 返回会话状态 { session_id, sentence, progress, has_previous, ... }
+export const startPracticeSession = async ({ mode, difficulties = [], setId }) => {
+  const key = practiceSessionKey({ mode, difficulties, setId });
+  const savedId = localStorage.getItem(key);
+  if (savedId) {
+    const response = await fetch(`${API_BASE_URL}/sessions/${savedId}`);
+    if (response.ok) {
+      return response.json();
+    }
+    // 会话已被清理或句子集已过期，重新创建
+    localStorage.removeItem(key);
+  }
+  const session = await postSession(`${API_BASE_URL}/sessions`, {
+    learner_id: getLearnerId(),
+    mode,
+    ...(setId ? { set_id: setId } : { difficulties }),
+  });
+  localStorage.setItem(key, session.session_id);
+  return session;
+};
+
+// 练习会话：下一题 / 上一题，返回新的会话状态
+export const nextPracticeSentence = (sessionId) => postSession(`${API_BASE_URL}/sessions/${sessionId}/next`);
+
+export const previousPracticeSentence = (sessionId) => postSession(`${API_BASE_URL}/sessions/${sessionId}/prev`);
+
+// 练习会话：检查当前题目的答案并记入会话历史，返回结果与checkAnswer相同
+export const answerPracticeSentence = (sessionId, sentenceId, answer, { ignorePunctuation } = {}) => (
+  postSession(`${API_BASE_URL}/sessions/${sessionId}/answer`, {
+    sentence_id: sentenceId,
+    answer: answer,
+    ...(ignorePunctuation ? { ignore_punctuation: true } : {}),
+  })
+);
+
+// 检查答案：返回是否正确、相似度score和逐词比对结果diff
+// setId为上传句子集ID（检查上传的句子时传入），ignorePunctuation为true时不比较标点
+// 内置句子的答题结果按学习者ID记录，用于安排复习
+export const checkAnswer = async (sentenceId, answer, { setId, ignorePunctuation } = {}) => {
   const response = await fetch(`${API_BASE_URL}/check`, {
     method: 'POST',
     headers: {
@@ -52,6 +335,28 @@ export const checkAnswer = async (sentenceId, answer) => {
     body: JSON.stringify({
       sentence_id: sentenceId,
       answer: answer,
+      ...(setId ? { set_id: setId } : { learner_id: getLearnerId() }),
+      ...(ignorePunctuation ? { ignore_punctuation: true } : {}),
+    }),
+  });
+  if (!response.ok) {
+    throw new Error('检查答案失败');
+  }
+  return response.json();
+};
+
+// 批量检查答案（答题模式、离线同步）：answers为 [{ sentenceId, answer }]，结果按顺序返回
+export const checkAnswersBatch = async (answers) => {
+  const response = await fetch(`${API_BASE_URL}/check/batch`, {
+    method: 'POST',
+    headers: {
+      'Content-Type': 'application/json',
+    },
+    body: JSON.stringify({
+      answers: answers.map(({ sentenceId, answer }) => ({
+        sentence_id: sentenceId,
+        answer: answer,
+      })),
     }),
   });
   if (!response.ok) {